@@ -48,6 +48,7 @@ import default_config
 import app_utils
 from common import CancelException
 from db_intf import DBCache
+from tx_cache_db import TxCacheDB, TX_CACHE_DB_FILE_NAME
 from encrypted_files import read_file_encrypted, write_file_encrypted, NotConnectedToHardwareWallet
 from hw_common import HwSessionInfo
 from wnd_utils import WndUtils
@@ -56,6 +57,7 @@ from wnd_utils import WndUtils
 CURRENT_CFG_FILE_VERSION = 5
 CACHE_ITEM_LOGGERS_LOGLEVEL = 'LoggersLogLevel'
 CACHE_ITEM_LOG_FORMAT = 'LogFormat'
+DEFAULT_RPC_MAX_CONNECTIONS = 4  # default number of keep-alive HTTP connections kept open to a single RPC node
 
 
 DMN_ROLE_OWNER = 0x1
@@ -182,6 +184,7 @@ class AppConfig(QObject):
         self.modified = False
         self.cache_dir = ''
         self.tx_cache_dir = ''
+        self.tx_cache_db = None
         self.app_config_file_name = ''
         self.log_dir = ''
         self.log_file = ''
@@ -438,6 +441,8 @@ class AppConfig(QObject):
         self.save_loggers_config()
         app_cache.finish()
         self.db_intf.close()
+        if self.tx_cache_db:
+            self.tx_cache_db.close()
 
     def save_cache_settings(self):
         if self.feature_register_dmn_automatic.get_value() is not None:
@@ -508,6 +513,23 @@ class AppConfig(QObject):
                 except Exception as e:
                     logging.exception(str(e))
 
+        tx_cache_db_file_name = os.path.join(self.tx_cache_dir, TX_CACHE_DB_FILE_NAME)
+        if not self.tx_cache_db or self.tx_cache_db.db_file_name != tx_cache_db_file_name:
+            if self.tx_cache_db:
+                self.tx_cache_db.close()
+            else:
+                self.tx_cache_db = TxCacheDB()
+            try:
+                self.tx_cache_db.open(tx_cache_db_file_name)
+                # import the json files created by the previous cache implementation; mainnet files could have
+                # been left in the main cache directory
+                import_dirs = [self.tx_cache_dir]
+                if not self.is_testnet():
+                    import_dirs.append(self.cache_dir)
+                self.tx_cache_db.import_json_cache_files(import_dirs, self.is_testnet())
+            except Exception as e:
+                logging.exception('Transaction cache initialization error')
+
         new_db_cache_file_name = os.path.join(self.cache_dir, db_cache_file_name)
         if self.db_intf:
             if self.db_cache_file_name != new_db_cache_file_name:
@@ -801,6 +823,11 @@ class AppConfig(QObject):
                                                                            fallback='').strip()
 
                             cfg.testnet = self.value_to_bool(config.get(section, 'testnet', fallback='0'))
+                            try:
+                                cfg.max_connections = config.get(section, 'max_connections',
+                                                                 fallback=str(DEFAULT_RPC_MAX_CONNECTIONS)).strip()
+                            except Exception as e:
+                                logging.warning('Invalid max_connections value in section ' + section + ': ' + str(e))
                             skip_adding = False
 
                             if cfg.host.lower() == 'test.stats.dash.org':
@@ -1021,6 +1048,7 @@ class AppConfig(QObject):
                 # SSH password is not saved until HW encrypting feature will be finished
             config.set(section, 'testnet', '1' if cfg.testnet else '0')
             config.set(section, 'rpc_encryption_pubkey', cfg.get_rpc_encryption_pubkey_str('DER'))
+            config.set(section, 'max_connections', str(cfg.max_connections))
 
         # ret_info = {}
         # read_file_encrypted(file_name, ret_info, hw_session)
@@ -1855,6 +1883,7 @@ class DashNetworkConnectionCfg(object):
         self.__testnet = False
         self.__rpc_encryption_pubkey_der = ''
         self.__rpc_encryption_pubkey_object = None
+        self.__max_connections = DEFAULT_RPC_MAX_CONNECTIONS
 
     def get_description(self):
         if self.__use_ssh_tunnel:
@@ -1894,7 +1923,8 @@ class DashNetworkConnectionCfg(object):
                                          self.ssh_conn_cfg.auth_method == cfg2.ssh_conn_cfg.auth_method and
                                          self.ssh_conn_cfg.private_key_path == cfg2.ssh_conn_cfg.private_key_path)) \
                and self.testnet == cfg2.testnet and \
-            self.__rpc_encryption_pubkey_der == cfg2.__rpc_encryption_pubkey_der
+            self.__rpc_encryption_pubkey_der == cfg2.__rpc_encryption_pubkey_der and \
+            self.max_connections == cfg2.max_connections
 
     def __deepcopy__(self, memodict):
         newself = DashNetworkConnectionCfg(self.method)
@@ -1914,6 +1944,7 @@ class DashNetworkConnectionCfg(object):
         self.use_ssl = cfg2.use_ssl
         self.testnet = cfg2.testnet
         self.enabled = cfg2.enabled
+        self.max_connections = cfg2.max_connections
         if self.use_ssh_tunnel:
             self.ssh_conn_cfg.host = cfg2.ssh_conn_cfg.host
             self.ssh_conn_cfg.port = cfg2.ssh_conn_cfg.port
@@ -2054,6 +2085,19 @@ class DashNetworkConnectionCfg(object):
             raise Exception('Ivalid type of "testnet" argument')
         self.__testnet = testnet
 
+    @property
+    def max_connections(self):
+        """Maximum number of concurrent (keep-alive) HTTP connections opened to the RPC node."""
+        return self.__max_connections
+
+    @max_connections.setter
+    def max_connections(self, max_connections):
+        if isinstance(max_connections, str):
+            max_connections = int(max_connections)
+        if not isinstance(max_connections, int) or max_connections < 1:
+            raise Exception('Invalid value of "max_connections" argument')
+        self.__max_connections = max_connections
+
     def set_rpc_encryption_pubkey(self, key: str):
         """
         AES public key for additional RPC encryption, dedicated for calls transmitting sensitive information
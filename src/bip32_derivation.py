@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Created on: 2026-10
+import hashlib
+import hmac
+import struct
+from typing import Dict, Iterable
+from bip32utils import BIP32Key
+from dash_utils import pubkey_to_address
+
+try:
+    # libsecp256k1 bindings - much faster than the pure-python EC arithmetic used by bip32utils
+    import coincurve
+except ImportError:
+    coincurve = None
+
+
+def derive_child_pubkeys(parent_key: BIP32Key, indexes: Iterable[int]) -> Dict[int, bytes]:
+    """
+    Derives (non-hardened) child public keys of a given parent key.
+    :return: dict child index -> compressed public key
+    """
+    ret = {}
+    indexes = list(indexes)
+    if coincurve is not None:
+        parent_pubkey = parent_key.PublicKey()
+        parent_point = coincurve.PublicKey(parent_pubkey)
+        for index in indexes:
+            if index >= 0x80000000:
+                raise Exception('Cannot derive hardened child key from public key')
+            i = hmac.new(parent_key.C, parent_pubkey + struct.pack('>L', index), hashlib.sha512).digest()
+            try:
+                ret[index] = parent_point.add(i[:32]).format(compressed=True)
+            except ValueError:
+                # invalid tweak (practically impossible); let bip32utils handle the case
+                ret[index] = parent_key.ChildKey(index).PublicKey()
+    else:
+        for index in indexes:
+            ret[index] = parent_key.ChildKey(index).PublicKey()
+    return ret
+
+
+def derive_child_addresses(parent_key: BIP32Key, indexes: Iterable[int], dash_network: str) -> Dict[int, str]:
+    """
+    Derives a batch of child addresses of a given parent (i.e. account's change level) key.
+    :return: dict child index -> address
+    """
+    pubkeys = derive_child_pubkeys(parent_key, indexes)
+    return {index: pubkey_to_address(pubkey.hex(), dash_network) for index, pubkey in pubkeys.items()}
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 # Author: Bertrand256
 # Created on: 2018-07
+import concurrent.futures
 import threading
 import time
 import datetime
@@ -9,13 +10,15 @@ import logging
 from functools import partial
 
 from PyQt5 import QtCore
-from typing import List, Dict, Tuple, Optional, Any, Generator, NamedTuple, Callable, ByteString, Union
+from typing import List, Dict, Tuple, Optional, Any, Generator, NamedTuple, Callable, ByteString, Union, Set
 from PyQt5.QtCore import QObject, Qt
+from bip32utils import BIP32Key
 import app_utils
 import hw_intf
 from common import CancelException
 from dash_utils import bip32_path_string_to_n, pubkey_to_address, bip32_path_n_to_string, bip32_path_string_append_elem
 from dashd_intf import DashdInterface
+from bip32_derivation import derive_child_addresses
 from hw_common import HwSessionInfo, HWNotConnectedException
 from db_intf import DBCache
 from thread_fun_dlg import CtrlObject
@@ -33,6 +36,10 @@ UNCONFIRMED_TX_PURGE_SECONDS = 3600
 UNCONFIRMED_TX_BLOCK_HEIGHT = 99999999
 DEFAULT_TX_FETCH_PRIORITY = 1  # the higher the number to higher the priority
 ADDR_BALANCE_CONSISTENCY_CHECK_SECONDS = 3600
+TX_PREFETCH_CHUNK_SIZE = 50  # number of transactions fetched from the network in a single batch request
+ADDRESS_DERIVATION_CHUNK_SIZE = 20  # number of addresses derived from an xpub in a single batch
+TX_LIST_PAGE_SIZE = 200  # number of transaction history entries read from the db in a single query
+TX_FETCH_MAX_WORKERS = 4  # max number of account chains (receive/change) scanned concurrently
 
 log = logging.getLogger('dmt.bip44_wallet')
 
@@ -50,6 +57,16 @@ class SwitchedHDIdentityException(Exception):
             Exception.__init__(self, "SwitchedHDIdentityException")
 
 
+class AddressesTxsData(object):
+    """ Network data of a group of addresses read during the transaction scan. """
+    def __init__(self):
+        self.last_block_height = 0  # the block height the addresses' scan starts from
+        self.txids: List[Dict] = []  # address deltas and mempool entries
+        self.tx_jsons: Dict[str, Dict] = {}  # prefetched transactions
+        self.processed_txids: Set[str] = set()  # transactions that have already been processed (not fetched)
+        self.used_addresses: Set[str] = set()  # addresses having transactions in the scanned block range
+
+
 class Bip44Wallet(QObject):
     blockheight_changed = QtCore.pyqtSignal(int)
 
@@ -71,6 +88,14 @@ class Bip44Wallet(QObject):
         self.__waiting_tx_fetch_priority = None
         self.__tx_fetch_end_event = threading.Event()
 
+        # threads reading network data of the next address chunk while the current chunk is being saved to the db
+        # (they are kept until the wallet is closed, so that their read-only db connections are reused)
+        self.__addr_scan_executor = concurrent.futures.ThreadPoolExecutor(max_workers=TX_FETCH_MAX_WORKERS,
+                                                                          thread_name_prefix='addr_scan')
+        # threads scanning account chains concurrently within fetch_all_accounts_txs
+        self.__tx_fetch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=TX_FETCH_MAX_WORKERS,
+                                                                         thread_name_prefix='tx_fetch')
+
         # list of accounts retrieved while calling self.list_accounts
         self.account_by_id: Dict[int, Bip44AccountType] = {}
         self.account_by_bip32_path: Dict[str, Bip44AccountType] = {}
@@ -109,6 +134,10 @@ class Bip44Wallet(QObject):
         # before they get confirmed
         self.__txs_in_mempool: Dict[str, str] = {}
 
+        # addresses verified against the hw account xpubs, per hd identity: {tree ident: {bip32 path: address}}
+        self.__verified_addr_by_bip32_path: Dict[str, Dict[str, str]] = {}
+        self.__account_xpub_by_bip32_path: Dict[str, Dict[str, str]] = {}
+
         self.subscribed_addrs_lock = EnhRLock()
 
         self.purge_unconf_txs_called = False
@@ -121,6 +150,15 @@ class Bip44Wallet(QObject):
         self.on_address_loaded_callback: Callable[[Bip44AddressType], None] = None
         self.on_fetch_account_txs_feedback: Callable[[int], None] = None  # args: number of txses fetched each call
 
+    def close(self):
+        """
+        Shuts down the worker threads of the wallet and closes their read-only db connections. Has to be called by
+        the owner of the object when it's no longer needed.
+        """
+        self.__addr_scan_executor.shutdown(wait=True)
+        self.__tx_fetch_executor.shutdown(wait=True)
+        self.db_intf.release_finished_threads_read_conns()
+
     def signal_account_added(self, account: Bip44AccountType):
         if self.on_account_added_callback and account and self.__tree_id == account.tree_id and \
                 self.__tree_id is not None:
@@ -399,8 +437,10 @@ class Bip44Wallet(QObject):
         db_cursor.executemany(f'insert into temp_ids{tab_sufix}(id) values(?)',
                               [(id,) for id in ids])
 
-    def _get_child_address(self, parent_key_entry: Bip44Entry, child_addr_index: int) -> Bip44AddressType:
+    def _get_child_address(self, parent_key_entry: Bip44Entry, child_addr_index: int,
+                           derived_address: Optional[str] = None) -> Bip44AddressType:
         """
+        :param derived_address: address for the child index if it has already been derived by the caller
         :return: Tuple[int <id db>, str <address>, int <balance in duffs>]
         """
         if parent_key_entry.id is None:
@@ -418,9 +458,12 @@ class Bip44Wallet(QObject):
                                   (parent_key_entry.id, child_addr_index))
                 row = db_cursor.fetchone()
                 if not row:
-                    parent_key = parent_key_entry.get_bip32key()
-                    key = parent_key.ChildKey(child_addr_index)
-                    address = pubkey_to_address(key.PublicKey().hex(), self.dash_network)
+                    if derived_address:
+                        address = derived_address
+                    else:
+                        parent_key = parent_key_entry.get_bip32key()
+                        key = parent_key.ChildKey(child_addr_index)
+                        address = pubkey_to_address(key.PublicKey().hex(), self.dash_network)
                     if not parent_key_entry.bip32_path:
                         raise Exception('BIP32 path of the parent key not set')
                     bip32_path = bip32_path_string_append_elem(parent_key_entry.bip32_path, child_addr_index)
@@ -516,14 +559,41 @@ class Bip44Wallet(QObject):
     def _get_key_entry_by_xpub(self, xpub: str) -> Bip44Entry:
         raise Exception('ToDo')
 
+    def _derive_missing_child_addresses(self, parent_key_entry: Bip44Entry, start_index: int, end_index: int) -> \
+            Dict[int, str]:
+        """
+        Derives in one batch the addresses from the index range [start_index, end_index) which don't exist in
+        the cache yet (derived addresses are saved in the address table by _get_child_address).
+        :return: dict address index -> address
+        """
+        indexes = [idx for idx in range(start_index, end_index) if idx not in parent_key_entry.child_entries]
+        if indexes and parent_key_entry.id is not None:
+            db_cursor = self.db_intf.get_read_cursor()
+            try:
+                db_cursor.execute('select address_index from address where parent_id=? and address_index>=? and '
+                                  'address_index<?', (parent_key_entry.id, start_index, end_index))
+                existing = set(row[0] for row in db_cursor.fetchall())
+            finally:
+                self.db_intf.release_read_cursor()
+            indexes = [idx for idx in indexes if idx not in existing]
+
+        if indexes:
+            return derive_child_addresses(parent_key_entry.get_bip32key(), indexes, self.dash_network)
+        return {}
+
     def _list_child_addresses(self, key_entry: Bip44Entry, addr_start_index: int, addr_count: int,
                               account: Bip44AccountType) -> Generator[Bip44AddressType, None, None]:
 
         tm_begin = time.time()
         try:
             count = 0
+            derived_addresses = {}
             for idx in range(addr_start_index, addr_start_index + addr_count):
-                addr_info = self._get_child_address(key_entry, idx)
+                if (idx - addr_start_index) % ADDRESS_DERIVATION_CHUNK_SIZE == 0:
+                    chunk_end = min(idx + ADDRESS_DERIVATION_CHUNK_SIZE, addr_start_index + addr_count)
+                    derived_addresses = self._derive_missing_child_addresses(key_entry, idx, chunk_end)
+
+                addr_info = self._get_child_address(key_entry, idx, derived_addresses.get(idx))
                 if account:
                     is_new, updated, addr_index, addr = account.add_address(addr_info)
                     if is_new:
@@ -701,54 +771,63 @@ class Bip44Wallet(QObject):
             finally:
                 self.db_intf.release_cursor()
 
-        empty_addresses = 0
-        addresses = []
-        for addr_info in self._list_child_addresses(key_entry, 0, MAX_ADDRESSES_TO_SCAN, account):
-            addresses.append(addr_info)
-
-            if len(addresses) >= TX_QUERY_ADDR_CHUNK_SIZE:
-
-                if check_break_process_fun and check_break_process_fun():
-                    break
-                total_addr_count += len(addresses)
-                self._check_terminate_tx_fetch()
-
-                self._process_addresses_txs(addresses, cur_block_height, check_break_process_fun)
+        def address_chunks():
+            chunk = []
+            for addr_info in self._list_child_addresses(key_entry, 0, MAX_ADDRESSES_TO_SCAN, account):
+                chunk.append(addr_info)
+                if len(chunk) >= TX_QUERY_ADDR_CHUNK_SIZE:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        # the scan is pipelined: network data of the next address chunk is read in a background thread while
+        # the current chunk is being saved to the db
+        executor = self.__addr_scan_executor
+        fetch_future = None
+        try:
+            chunks = address_chunks()
+            addresses = next(chunks, None)
+            fetch_future = executor.submit(self._read_addresses_txs, addresses, cur_block_height) \
+                if addresses else None
+            empty_addresses = 0
 
+            while addresses:
                 if check_break_process_fun and check_break_process_fun():
                     break
                 self._check_terminate_tx_fetch()
+                addrs_txs = fetch_future.result()
 
-                # count the number of addresses with no associated transactions starting from the end
+                # count the number of addresses with no associated transactions starting from the end; "used"
+                # addresses are determined from memory: the addresses' received value and the data just read
                 _empty_addresses = 0
-                db_cursor = self.db_intf.get_cursor()
-                try:
-                    for addr_info in reversed(addresses):
-                        addr_id = addr_info.id
-
-                        # check if there was no transactions for the address
-                        if not self.addr_bal_updated.get(addr_id):
-                            db_cursor.execute('select 1 from tx_output where address_id=?', (addr_id,))
-                            if db_cursor.fetchone():
-                                break
-                        else:
-                            break
-                        _empty_addresses += 1
-                finally:
-                    self.db_intf.release_cursor()
-
-                addresses.clear()
+                for addr_info in reversed(addresses):
+                    if addr_info.received or addr_info.address in addrs_txs.used_addresses or \
+                       self.addr_bal_updated.get(addr_info.id):
+                        break
+                    _empty_addresses += 1
 
-                if _empty_addresses < TX_QUERY_ADDR_CHUNK_SIZE:
+                if _empty_addresses < len(addresses):
                     empty_addresses = _empty_addresses
                 else:
                     empty_addresses += _empty_addresses
 
-                if empty_addresses >= ADDRESS_SCAN_GAP_LIMIT:
-                    break
+                if empty_addresses < ADDRESS_SCAN_GAP_LIMIT:
+                    next_addresses = next(chunks, None)
+                    fetch_future = executor.submit(self._read_addresses_txs, next_addresses, cur_block_height) \
+                        if next_addresses else None
+                else:
+                    next_addresses = None
+                    fetch_future = None
 
-        if len(addresses):
-            self._process_addresses_txs(addresses, cur_block_height, check_break_process_fun)
+                total_addr_count += len(addresses)
+                self._process_addresses_txs(addresses, cur_block_height, check_break_process_fun, addrs_txs)
+                addresses = next_addresses
+        finally:
+            if fetch_future:
+                # don't leave the background read running when the scan has been interrupted
+                fetch_future.cancel()
+                concurrent.futures.wait([fetch_future])
 
     def fetch_addresses_txs(self, addr_info_list: List[Bip44AddressType], check_break_process_fun: Callable):
         tm_begin = time.time()
@@ -778,15 +857,100 @@ class Bip44Wallet(QObject):
 
         log.debug(f'fetch_addresses_txs exec time: {time.time() - tm_begin}s')
 
+    def _read_addresses_txs(self, addr_info_list: List[Bip44AddressType], max_block_height: int) -> \
+            'AddressesTxsData':
+        """
+        Reads from the network (without modifying the db) the transactions of the addresses, that appeared since
+        the last scan, and prefetches the data of those transactions that haven't been processed yet.
+        It's thread-safe with regard to the db write session, so it can be executed in a background thread.
+        """
+        ret = AddressesTxsData()
+        ret.last_block_height = max_block_height
+        addresses = []
+        addr_ids = []
+        for addr_info in addr_info_list:
+            if addr_info.address:
+                addresses.append(addr_info.address)
+                addr_ids.append(addr_info.id)
+
+        db_cursor = self.db_intf.get_read_cursor()
+        try:
+            db_cursor.execute(f'select min(last_scan_block_height) from address where id in '
+                              f'({",".join(["?"] * len(addr_ids))})', addr_ids)
+            row = db_cursor.fetchone()
+            if row and row[0] is not None:
+                ret.last_block_height = row[0]
+        finally:
+            self.db_intf.release_read_cursor()
+
+        if ret.last_block_height < max_block_height:
+            log.debug(f'getaddressdeltas for {addresses}, start: {ret.last_block_height + 1}, end: {max_block_height}')
+            ret.txids = self.dashd_intf.getaddressdeltas({'addresses': addresses,
+                                                         'start': ret.last_block_height + 1,
+                                                         'end': max_block_height})
+
+        try:
+            mempool_entries = self.dashd_intf.getaddressmempool(addresses)
+            mempool_entries_verified = []
+            for me_tx in mempool_entries:
+                me_txid = me_tx.get('txid')
+                if me_txid not in self.__txs_in_mempool:
+                    mempool_entries_verified.append(me_tx)
+                    self.__txs_in_mempool[me_txid] = me_txid
+            if mempool_entries_verified:
+                ret.txids.extend(mempool_entries_verified)
+        except Exception as e:
+            log.warning('Error querying mempool: ' + str(e))
+
+        tx_hashes = []
+        tx_hashes_dict = {}
+        for tx_entry in ret.txids:
+            ret.used_addresses.add(tx_entry.get('address'))
+            txhash = tx_entry.get('txid')
+            if txhash not in tx_hashes_dict:
+                tx_hashes_dict[txhash] = txhash
+                tx_hashes.append(txhash)
+
+        for idx in range(0, len(tx_hashes), TX_PREFETCH_CHUNK_SIZE):
+            chunk = tx_hashes[idx: idx + TX_PREFETCH_CHUNK_SIZE]
+            db_cursor = self.db_intf.get_read_cursor()
+            try:
+                processed = self._get_processed_tx_hashes(db_cursor, chunk)
+            finally:
+                self.db_intf.release_read_cursor()
+            ret.tx_jsons.update(self._getrawtransactions([h for h in chunk if h not in processed]))
+            ret.processed_txids.update(processed)
+        return ret
+
     def _process_addresses_txs(self, addr_info_list: List[Bip44AddressType], max_block_height: int,
-                               check_break_process_fun: Callable = None):
+                               check_break_process_fun: Callable = None,
+                               addrs_txs: Optional['AddressesTxsData'] = None):
+        """
+        :param addrs_txs: network data of the addresses read in advance by _read_addresses_txs
+        """
 
-        def process_txes(txids: List[Dict]):
+        def process_txes(txids: List[Dict], tx_jsons: Dict[str, Dict], processed_txids: Set[str]):
             log.debug('starting process_txes - tx count: %s', len(txids))
             last_time_checked = time.time()
             last_nr = 0
-            for nr, tx_entry in enumerate(txids):
-                self._process_tx(db_cursor, tx_entry.get('txid'))
+            tx_hashes = []
+            tx_hashes_dict = {}
+            for tx_entry in txids:
+                txhash = tx_entry.get('txid')
+                if txhash not in tx_hashes_dict:
+                    tx_hashes_dict[txhash] = txhash
+                    tx_hashes.append(txhash)
+
+            for nr, txhash in enumerate(tx_hashes):
+                if txhash not in tx_jsons and txhash not in processed_txids:
+                    # fetch the next chunk of transactions in a single network round trip, skipping those
+                    # which have already been processed
+                    chunk = [h for h in tx_hashes[nr: nr + TX_PREFETCH_CHUNK_SIZE]
+                             if h not in tx_jsons and h not in processed_txids]
+                    processed = self._get_processed_tx_hashes(db_cursor, chunk)
+                    tx_jsons.update(self._getrawtransactions([h for h in chunk if h not in processed]))
+                    processed_txids.update(processed)
+                self._process_tx(db_cursor, txhash, None if txhash in processed_txids else tx_jsons.get(txhash))
                 if time.time() - last_time_checked > 1:  # feedback every 1s
                     if check_break_process_fun and check_break_process_fun():
                         break
@@ -798,49 +962,15 @@ class Bip44Wallet(QObject):
 
         log.debug('_process_addresses_txs, addr count: %s', len(addr_info_list))
         tm_begin = time.time()
-        addrinfo_by_address = {}
-        addresses = []
-        addr_ids = []
-        last_block_height = max_block_height
-
-        for addr_info in addr_info_list:
-            if addr_info.address:
-                addrinfo_by_address[addr_info.address] = addr_info
-                addresses.append(addr_info.address)
-                addr_ids.append(addr_info.id)
+        if addrs_txs is None:
+            addrs_txs = self._read_addresses_txs(addr_info_list, max_block_height)
+        last_block_height = addrs_txs.last_block_height
+        txids = addrs_txs.txids
 
         db_cursor = self.db_intf.get_cursor()
         try:
-            self._fill_temp_ids_table(addr_ids, db_cursor)
-            db_cursor.execute('select min(last_scan_block_height) from address where id in (select id from temp_ids)')
-            row = db_cursor.fetchone()
-            if row:
-                if row[0] is not None:
-                    last_block_height = row[0]
-
-            if last_block_height < max_block_height:
-                log.debug(f'getaddressdeltas for {addresses}, start: {last_block_height + 1}, end: {max_block_height}')
-                txids = self.dashd_intf.getaddressdeltas({'addresses': addresses,
-                                                         'start': last_block_height + 1,
-                                                         'end': max_block_height})
-            else:
-                txids = []
-
-            try:
-                mempool_entries = self.dashd_intf.getaddressmempool(addresses)
-                mempool_entries_verified = []
-                for me_tx in mempool_entries:
-                    me_txid = me_tx.get('txid')
-                    if me_txid not in self.__txs_in_mempool:
-                        mempool_entries_verified.append(me_tx)
-                        self.__txs_in_mempool[me_txid] = me_txid
-                if mempool_entries_verified:
-                    txids.extend(mempool_entries_verified)
-            except Exception as e:
-                log.warning('Error querying mempool: ' + str(e))
-
             if txids:
-                process_txes(txids)
+                process_txes(txids, addrs_txs.tx_jsons, addrs_txs.processed_txids)
 
                 # update the last scan block height info for each of the addresses
                 if last_block_height != max_block_height:
@@ -873,16 +1003,14 @@ class Bip44Wallet(QObject):
                                                                       'start': 0,
                                                                       'end': max_block_height})
 
-                            process_txes(txids)
-
-                            if a.id in self.addr_bal_updated:
-                                addr_ids_to_update_balance.append(a.id)
+                            process_txes(txids, {}, set())
+                            addr_ids_to_update_balance.append(a.id)
                     except Exception as e:
                         log.error('Address balance check error: %s', str(e))
                     log.debug('Finished verifying address balance consistency. Id: %s', a.id)
 
             if addr_ids_to_update_balance:
-                self._update_addr_balances(account=None, addr_ids=addr_ids_to_update_balance)
+                self._update_addr_balances(account=None, addr_ids=addr_ids_to_update_balance, verify=True)
 
         finally:
             if db_cursor.connection.total_changes > 0:
@@ -906,6 +1034,44 @@ class Bip44Wallet(QObject):
             del self.__txs_in_mempool[txhash]
         return tx
 
+    def _getrawtransactions(self, txhashes: List[str]) -> Dict[str, Dict]:
+        """
+        Fetches a list of transactions in a batch, together with the headers of the blocks they are included in.
+        Transactions that couldn't be fetched are skipped in the result (they are fetched again individually
+        by the _getrawtransaction method when processed).
+        """
+        txs = {}
+        try:
+            block_heights = []
+            for txhash, tx in self.dashd_intf.getrawtransactions(txhashes, 1).items():
+                if isinstance(tx, Exception):
+                    log.warning('Error fetching transaction %s: %s', txhash, str(tx))
+                    continue
+                if txhash in self.__txs_in_mempool and tx.get('height'):
+                    del self.__txs_in_mempool[txhash]
+                if tx.get('height'):
+                    block_heights.append(tx.get('height'))
+                txs[txhash] = tx
+
+            # warm up the cache of block headers used for reading transactions' timestamps
+            if block_heights:
+                self.dashd_intf.getblockheaders_by_height(block_heights)
+        except Exception as e:
+            log.warning('Error while fetching transactions in a batch: %s', str(e))
+        return txs
+
+    def _get_processed_tx_hashes(self, db_cursor, txhashes: List[str]) -> Dict[str, str]:
+        """ Returns hashes of transactions from the list, which are confirmed and have already been processed. """
+        ret = {}
+        if txhashes:
+            db_cursor.execute('select tx_hash from tx where processed=1 and block_height<? and tx_hash in (' +
+                              ','.join(['?'] * len(txhashes)) + ')',
+                              [UNCONFIRMED_TX_BLOCK_HEIGHT] + [self._wrap_txid(h) for h in txhashes])
+            for tx_hash, in db_cursor.fetchall():
+                h = self._unwrap_txid(tx_hash)
+                ret[h] = h
+        return ret
+
     def _get_tx_db_id(self, db_cursor, txhash: str, tx_json: Dict = None, create=True) -> Tuple[int, Optional[Dict]]:
         """
         :param tx_entry:
@@ -914,7 +1080,7 @@ class Bip44Wallet(QObject):
         """
         tx_hash = self._wrap_txid(txhash)
 
-        db_cursor.execute('select id, block_height from tx where tx_hash=?', (tx_hash,))
+        db_cursor.execute('select id, block_height, processed from tx where tx_hash=?', (tx_hash,))
         row = db_cursor.fetchone()
         if not row:
             if create:
@@ -950,6 +1116,10 @@ class Bip44Wallet(QObject):
             height = row[1]
             is_unconfirmed = True if height >= UNCONFIRMED_TX_BLOCK_HEIGHT else False
 
+            if not is_unconfirmed and row[2]:
+                # confirmed transactions whose inputs and outputs have already been processed won't change
+                return tx_id, tx_json
+
             if not tx_json:
                 tx_json = self._getrawtransaction(txhash)
 
@@ -966,8 +1136,7 @@ class Bip44Wallet(QObject):
                     self.db_intf.commit()
 
                     # list utxos for this transaction and signal they got confirmed
-                    db_cursor.execute('select id from main.tx_output where tx_id=? and (spent_tx_id is null '
-                                      'or spent_input_index is null) and address_id is not null', (tx_id,))
+                    db_cursor.execute('select id from utxo where tx_id=?', (tx_id,))
                     for utxo_id, in db_cursor.fetchall():
                         utxo = self.utxos_by_id.get(utxo_id)
                         if utxo:
@@ -981,6 +1150,9 @@ class Bip44Wallet(QObject):
             for index, vin in enumerate(tx_json.get('vin', [])):
                 self._process_tx_input_entry(db_cursor, tx_id, tx_hash, index, tx_json)
 
+            if tx_id and tx_json.get('height') and tx_json.get('confirmations'):
+                db_cursor.execute('update tx set processed=1 where id=?', (tx_id,))
+
         return tx_id, tx_json
 
     def _process_tx_output_entry(self, db_cursor, tx_id: Optional[int], txhash: str, tx_index: int,
@@ -1148,20 +1320,42 @@ class Bip44Wallet(QObject):
         self.__cur_tx_fetch_prioriry = new_priority
 
     def fetch_all_accounts_txs(self, check_break_process_fun: Callable, priority: int = DEFAULT_TX_FETCH_PRIORITY):
+        """
+        Fetches transactions of all accounts of the current hd tree. The receive and change chains of the accounts
+        are scanned concurrently in the pool of TX_FETCH_MAX_WORKERS threads; the db session is held by the pool
+        threads only while saving data, so the calling thread must not hold it.
+        """
+        scan_break_event = threading.Event()
 
-        def scan_account_txs(account, db_cursor):
-            for change in (0, 1):
-                if check_break_process_fun and check_break_process_fun():
-                    break
+        def check_break_scan():
+            # break all the account scans if one of them failed or the caller requested the process to stop
+            return scan_break_event.is_set() or (check_break_process_fun and check_break_process_fun())
 
+        def scan_account_chain(account: Bip44AccountType, change: int):
+            if check_break_scan():
+                return
+            db_cursor = self.db_intf.get_cursor()
+            try:
                 change_level_node = account.get_child_entry(change)
                 change_level_node.read_from_db(db_cursor, create=True)
                 change_level_node.evaluate_address_if_null(db_cursor, self.dash_network)
-                self._fetch_child_addrs_txs(change_level_node, account, check_break_process_fun)
-            self._update_addr_balances(account)
-            account.read_from_db(db_cursor)
-            account.evaluate_address_if_null(db_cursor, self.dash_network)
-            self._process_addresses_created(db_cursor)
+                self.db_intf.commit()
+            finally:
+                self.db_intf.release_cursor()
+            self._fetch_child_addrs_txs(change_level_node, account, check_break_scan)
+
+        def finish_account_scan(account: Bip44AccountType, futures: List[concurrent.futures.Future]):
+            for f in futures:
+                f.result()  # re-raise exceptions of the chain scans in the calling thread
+            db_cursor = self.db_intf.get_cursor()
+            try:
+                self._update_addr_balances(account, None, db_cursor)
+                account.read_from_db(db_cursor)
+                account.evaluate_address_if_null(db_cursor, self.dash_network)
+                self._process_addresses_created(db_cursor)
+                self.db_intf.commit()
+            finally:
+                self.db_intf.release_cursor()
 
         log.debug('Starting fetching transactions for all accounts.')
         self._wait_for_tx_fetch_terminate(priority)
@@ -1169,33 +1363,58 @@ class Bip44Wallet(QObject):
             self.validate_hd_tree()
             self.addr_ids_created.clear()
             self.increase_ext_call_level()
-            db_cursor = self.db_intf.get_cursor()
+            scans_pending: List[Tuple[Bip44AccountType, List[concurrent.futures.Future]]] = []
+
+            def start_account_scan(account: Bip44AccountType):
+                scans_pending.append((account, [self.__tx_fetch_executor.submit(scan_account_chain, account, change)
+                                                for change in (0, 1)]))
+
+            def finish_account_scans():
+                while scans_pending:
+                    finish_account_scan(*scans_pending[0])
+                    del scans_pending[0]
 
             try:
                 account_ids_scanned = []
 
                 for idx in range(MAX_BIP44_ACCOUNTS):
-                    if check_break_process_fun and check_break_process_fun():
+                    if check_break_scan():
                         break
 
                     account_address_index = 0x80000000 + idx
-                    account = self._get_account_by_index(account_address_index, db_cursor)
+                    db_cursor = self.db_intf.get_cursor()
+                    try:
+                        account = self._get_account_by_index(account_address_index, db_cursor)
+                        self.db_intf.commit()
+                    finally:
+                        self.db_intf.release_cursor()
+
                     if account.status != 2:
-                        scan_account_txs(account, db_cursor)
+                        start_account_scan(account)
                         account_ids_scanned.append(account.id)
+                        if not account.received:
+                            # the account hasn't been used so far according to the cached data; whether the
+                            # discovery should be continued depends on the result of its scan
+                            finish_account_scans()
                     if not account.received:
                         break
 
-                for acc_id in self.account_by_id:
+                for acc_id in list(self.account_by_id):
                     account = self.account_by_id[acc_id]
                     if account.id not in account_ids_scanned and account.status != 2:
-                        scan_account_txs(account, db_cursor)
+                        start_account_scan(account)
                         account_ids_scanned.append(account.id)
 
+                finish_account_scans()
             finally:
-                if db_cursor.connection.total_changes > 0:
-                    self.db_intf.commit()
-                self.db_intf.release_cursor()
+                if scans_pending:
+                    # an error occurred or the process has been interrupted: stop the remaining scans and wait
+                    # for them to finish before releasing the fetch priority
+                    scan_break_event.set()
+                    futures = [f for _, account_futures in scans_pending for f in account_futures]
+                    for f in futures:
+                        f.cancel()
+                    concurrent.futures.wait(futures)
                 self.decrease_ext_call_level()
 
         finally:
@@ -1242,6 +1461,63 @@ class Bip44Wallet(QObject):
 
         log.debug(f'fetch_account_xpub_txs exec time: {time.time() - tm_begin}s')
 
+    def get_addresses_for_bip32_paths(self, bip32_paths: List[str], hw_get_address_fun: Callable[[str], str]) -> \
+            Dict[str, str]:
+        """
+        Returns addresses for BIP32 paths of the current hd identity, derived locally from the account xpubs obtained
+        from the hardware wallet. The hardware wallet is asked for the account xpub only if the account hasn't
+        been loaded yet (one call per account) and for the address itself only for paths not following the
+        account/change/address_index schema. Results are cached per hd identity.
+        :param hw_get_address_fun: function returning address for a BIP32 path read from the hardware wallet
+        :return: dict bip32 path -> address
+        """
+        self.validate_hd_tree()
+        verified = self.__verified_addr_by_bip32_path.setdefault(self.__tree_ident, {})
+        account_xpubs = self.__account_xpub_by_bip32_path.setdefault(self.__tree_ident, {})
+        ret = {}
+
+        paths_by_account: Dict[str, List[Tuple[str, List[int]]]] = {}
+        for bip32_path in bip32_paths:
+            if bip32_path in ret:
+                continue
+            addr = verified.get(bip32_path)
+            if addr:
+                ret[bip32_path] = addr
+                continue
+
+            path_n = bip32_path_string_to_n(bip32_path)
+            if len(path_n) > 3 and all(e >= 0x80000000 for e in path_n[:3]) and \
+               all(e < 0x80000000 for e in path_n[3:]):
+                account_path = bip32_path_n_to_string(path_n[:3])
+                paths_by_account.setdefault(account_path, []).append((bip32_path, path_n[3:]))
+            else:
+                addr = hw_get_address_fun(bip32_path)
+                verified[bip32_path] = addr
+                ret[bip32_path] = addr
+
+        for account_path, paths in paths_by_account.items():
+            xpub = account_xpubs.get(account_path)
+            if not xpub:
+                acc = self.account_by_bip32_path.get(account_path)
+                if acc and acc.xpub:
+                    xpub = acc.xpub
+                else:
+                    xpub = hw_intf.get_xpub(self.hw_session, account_path)
+                account_xpubs[account_path] = xpub
+
+            # keys of the intermediate levels (i.e. the change level) are derived once per account
+            keys_by_subpath = {(): BIP32Key.fromExtendedKey(xpub)}
+            for bip32_path, subpath_n in paths:
+                for level in range(1, len(subpath_n) + 1):
+                    subpath = tuple(subpath_n[:level])
+                    if subpath not in keys_by_subpath:
+                        keys_by_subpath[subpath] = keys_by_subpath[subpath[:-1]].ChildKey(subpath[-1])
+                key = keys_by_subpath[tuple(subpath_n)]
+                addr = pubkey_to_address(key.PublicKey().hex(), self.dash_network)
+                verified[bip32_path] = addr
+                ret[bip32_path] = addr
+        return ret
+
     def find_xpub_first_unused_address(self, account: Union[Bip44AccountType, str], change: int) -> \
             Optional[Bip44AddressType]:
 
@@ -1343,9 +1619,14 @@ class Bip44Wallet(QObject):
             if release_cursor:
                 self.db_intf.release_cursor()
 
-    def _update_addr_balances(self, account: Optional[Bip44AccountType], addr_ids: List[int]=None, db_cursor=None):
+    def _update_addr_balances(self, account: Optional[Bip44AccountType], addr_ids: List[int]=None, db_cursor=None,
+                              verify: bool = False):
         """ Update the 'balance' and 'received' fields of all addresses belonging to a given
         bip44 account (account_id) or of all addresses whose ids has been passed in addr_ids list.
+        The db values are maintained incrementally by triggers as transaction outputs/inputs are saved, so by default
+        they are only propagated to the cached address/account objects (and UI).
+        :param verify: consistency-check mode: the values are recomputed from the transaction outputs/inputs
+            and corrected in the db if they differ.
         """
 
         if not db_cursor:
@@ -1358,83 +1639,108 @@ class Bip44Wallet(QObject):
             accounts_to_update = []
             cur_tree_id = self.get_tree_id()
 
+            if verify:
+                self._verify_addr_balances(account, addr_ids, db_cursor)
+
             if addr_ids:
-                # update balances for specific addresses
                 self._fill_temp_ids_table(addr_ids, db_cursor)
-
                 db_cursor.execute(
-                    "select id, account_id, real_received, "
-                    "real_spent + real_received real_balance, tree_id from (select a.id id, aa.id account_id, "
-                    "a.received, (select ifnull(sum(satoshis), 0) from tx_output o where o.address_id = a.id) "
-                    "real_received, a.balance, (select ifnull(sum(satoshis), 0) "
-                    "from tx_input o where o.src_address_id = a.id) real_spent, aa.tree_id tree_id from address a "
+                    "select a.id, aa.id account_id, a.received, a.balance from address a "
                     "left join address ca on ca.id = a.parent_id left join address aa on aa.id = ca.parent_id "
-                    "where a.id in (select id from temp_ids)) "
-                    "where received <> real_received or balance <> real_received + real_spent")
+                    "where a.id in (select id from temp_ids)")
             elif account:
                 account.last_verify_balance_ts = int(time.time())
                 db_cursor.execute(
-                   "select id, account_id, real_received, real_spent + real_received real_balance, "
-                   "tree_id from (select a.id id, ca.id change_id, aa.id account_id, "
-                   "a.received, (select ifnull(sum(satoshis), 0) from tx_output o where o.address_id = a.id) "
-                   "real_received, a.balance, (select ifnull(sum(satoshis), 0) "
-                   "from tx_input o where o.src_address_id = a.id) real_spent, aa.tree_id tree_id from address a "
-                   "join address ca on ca.id = a.parent_id join address aa on aa.id = ca.parent_id where aa.id=?) "
-                   "where received <> real_received or balance <> real_received + real_spent", (account.id,))
+                    "select a.id, aa.id account_id, a.received, a.balance from address a "
+                    "join address ca on ca.id = a.parent_id join address aa on aa.id = ca.parent_id where aa.id=?",
+                    (account.id,))
             else:
                 raise Exception('Both arguments account_id and addr_ids are empty')
 
-            for addr_id, acc_id, real_received, real_balance, tree_id in db_cursor.fetchall():
+            for addr_id, acc_id, received, balance in db_cursor.fetchall():
+                if account:
+                    address = account.address_by_id(addr_id)
+                    addr_account = account
+                else:
+                    address, addr_account = self._find_address_item_in_cache_by_id(addr_id)
+
                 if acc_id is not None and acc_id not in accounts_to_update:
-                    # after updating balances of the addresses, update balance the related accounts
                     accounts_to_update.append(acc_id)
-
-                db_cursor.execute('update address set balance=?, received=? where id=?',
-                                  (real_balance, real_received, addr_id))
-
-                if self.on_address_data_changed_callback:
-                    if account:
-                        address = account.address_by_id(addr_id)
-                    else:
-                        address, account = self._find_address_item_in_cache_by_id(addr_id)
-
-                    if address:
-                        address.balance = real_balance
-                        address.received = real_received
-                        self.signal_address_data_changed(account, address)
+                if address and address.update_from_args(balance=balance, received=received):
+                    self.signal_address_data_changed(addr_account, address)
 
             if account and account.id not in accounts_to_update:
                 accounts_to_update.append(account.id)
 
             self._fill_temp_ids_table(accounts_to_update, db_cursor)
+            db_cursor.execute("select id, tree_id, balance, received from address "
+                              "where id in (select id from temp_ids)")
+
+            for acc_id, acc_tree_id, balance, received in db_cursor.fetchall():
+                if cur_tree_id and acc_tree_id == cur_tree_id:
+                    acc = self._get_account_by_id(acc_id, db_cursor)
+                    if acc and (acc.balance != balance or acc.received != received):
+                        acc.balance = balance
+                        acc.received = received
+                        self.signal_account_data_changed(acc)
+        finally:
+            if db_cursor.connection.total_changes > 0:
+                self.db_intf.commit()
+            if release_cursor:
+                self.db_intf.release_cursor()
+
+    def _verify_addr_balances(self, account: Optional[Bip44AccountType], addr_ids: Optional[List[int]], db_cursor):
+        """ Recomputes the balances of the addresses (and their accounts) from the transaction outputs/inputs and
+        corrects the values stored in the db if they are inconsistent.
+        """
+        if addr_ids:
+            self._fill_temp_ids_table(addr_ids, db_cursor)
+            db_cursor.execute(
+                "select id, account_id, real_received, "
+                "real_spent + real_received real_balance from (select a.id id, aa.id account_id, "
+                "a.received, (select ifnull(sum(satoshis), 0) from tx_output o where o.address_id = a.id) "
+                "real_received, a.balance, (select ifnull(sum(satoshis), 0) "
+                "from tx_input o where o.src_address_id = a.id) real_spent from address a "
+                "left join address ca on ca.id = a.parent_id left join address aa on aa.id = ca.parent_id "
+                "where a.id in (select id from temp_ids)) "
+                "where received <> real_received or balance <> real_received + real_spent")
+        elif account:
+            db_cursor.execute(
+               "select id, account_id, real_received, real_spent + real_received real_balance "
+               "from (select a.id id, aa.id account_id, "
+               "a.received, (select ifnull(sum(satoshis), 0) from tx_output o where o.address_id = a.id) "
+               "real_received, a.balance, (select ifnull(sum(satoshis), 0) "
+               "from tx_input o where o.src_address_id = a.id) real_spent from address a "
+               "join address ca on ca.id = a.parent_id join address aa on aa.id = ca.parent_id where aa.id=?) "
+               "where received <> real_received or balance <> real_received + real_spent", (account.id,))
+        else:
+            raise Exception('Both arguments account_id and addr_ids are empty')
+
+        accounts_to_verify = [account.id] if account else []
+        for addr_id, acc_id, real_received, real_balance in db_cursor.fetchall():
+            log.warning('Inconsistent balance of address %s fixed.', addr_id)
+            if acc_id is not None and acc_id not in accounts_to_verify:
+                accounts_to_verify.append(acc_id)
+            db_cursor.execute('update address set balance=?, received=? where id=?',
+                              (real_balance, real_received, addr_id))
+
+        if accounts_to_verify:
+            self._fill_temp_ids_table(accounts_to_verify, db_cursor)
             db_cursor.execute(
-                "select balance, real_balance, received, real_received, id, tree_id from ("
-                "  select aa.id, aa.tree_id, aa.balance,"
+                "select id, real_balance, real_received from ("
+                "  select aa.id, aa.balance,"
                 "       (select ifnull(sum(a.balance),0) from address ca join address a"
                 "            on a.parent_id=ca.id where ca.parent_id=aa.id) real_balance,"
                 "       aa.received,"
                 "       (select ifnull(sum(a.received),0) from address ca join address a "
                 "           on a.parent_id=ca.id where ca.parent_id=aa.id) real_received "
-                "from address aa where aa.id in (select id from temp_ids)) " 
+                "from address aa where aa.id in (select id from temp_ids)) "
                 "where balance<>real_balance or received<>real_received")
-
-            for balance, real_balance, received, real_received, acc_id, acc_tree_id in db_cursor.fetchall():
+            for acc_id, real_balance, real_received in db_cursor.fetchall():
+                log.warning('Inconsistent balance of account %s fixed.', acc_id)
                 db_cursor.execute('update address set balance=?, received=? where id=?',
                                   (real_balance, real_received, acc_id))
 
-                if cur_tree_id and acc_tree_id == cur_tree_id:
-                    account = self._get_account_by_id(acc_id, db_cursor, force_reload=True)
-                    if account:
-                        account.balance = real_balance
-                        account.received = real_received
-                        self.signal_account_data_changed(account)
-
-        finally:
-            if db_cursor.connection.total_changes > 0:
-                self.db_intf.commit()
-            if release_cursor:
-                self.db_intf.release_cursor()
-
     def _wrap_txid(self, txid: str):
         # base64 format takes less space in the db than hex string
         # return base64.b64encode(bytes.fromhex(txid))
@@ -1465,39 +1771,53 @@ class Bip44Wallet(QObject):
         utxo.get_cur_block_height_fun = self.get_block_height_nofetch
         return utxo
 
+    @staticmethod
+    def _get_utxos_page_sql(start_after: Optional[UtxoType], max_count: Optional[int], params: List) -> str:
+        """ Returns the ordering (newest first) and keyset pagination part of the utxo list query. """
+        sql_text = ''
+        if start_after:
+            sql_text += ' and (u.block_height, u.id) < (?,?)'
+            params.extend([start_after.block_height, start_after.id])
+        sql_text += ' order by u.block_height desc, u.id desc'
+        if max_count is not None:
+            sql_text += ' limit ?'
+            params.append(max_count)
+        return sql_text
+
     def list_utxos_for_account(self, account_id: Optional[int], only_new = False,
-                               filter_by_satoshis: Optional[int] = None) -> Generator[UtxoType, None, None]:
+                               filter_by_satoshis: Optional[int] = None, start_after: Optional[UtxoType] = None,
+                               max_count: Optional[int] = None) -> Generator[UtxoType, None, None]:
         """
         :param account_id: database id of the account's record or None if listing for all accounts of the current
           hd tree if.
+        :param start_after: if not None, the utxos following this one are listed (keyset pagination)
+        :param max_count: max number of utxos to be returned (all if None)
         """
         tm_begin = time.time()
         self.validate_hd_tree()
-        db_cursor = self.db_intf.get_cursor()
+        db_cursor = self.db_intf.get_read_cursor()
         try:
-            sql_text = "select o.id, tx.block_height, tx.coinbase, tx.block_timestamp," \
-                       "tx.tx_hash, o.output_index, o.satoshis, o.address_id from tx_output o " \
-                       "join address a on a.id=o.address_id join address cha on cha.id=a.parent_id join address aca " \
-                       "on aca.id=cha.parent_id join tx on tx.id=o.tx_id where (spent_tx_id is null " \
-                       "or spent_input_index is null)"
+            # the utxo table is an index of unspent outputs maintained by db triggers
+            sql_text = "select u.id, u.block_height, u.coinbase, u.block_timestamp, u.tx_hash, u.output_index, " \
+                       "u.satoshis, u.address_id from utxo u where "
 
             params = []
             if account_id:
-                sql_text += ' and aca.id=?'
+                sql_text += 'u.account_id=?'
                 params.append(account_id)
             else:
-                sql_text += ' and aca.tree_id=?'
+                sql_text += 'u.account_id in (select id from address where parent_id is null and tree_id=?)'
                 params.append(self.__tree_id)
 
             if filter_by_satoshis:
-                sql_text += ' and o.satoshis=?'
+                sql_text += ' and u.satoshis=?'
                 params.append(filter_by_satoshis)
 
             if only_new:
                 # limit returned utxos only to those existing in the self.utxos_added list
                 self._fill_temp_ids_table([id for id in self.utxos_added], db_cursor)
-                sql_text += ' and o.id in (select id from temp_ids)'
-            sql_text += " order by tx.block_height desc"
+                sql_text += ' and u.id in (select id from temp_ids)'
+            sql_text += self._get_utxos_page_sql(start_after, max_count, params)
 
             t = time.time()
             db_cursor.execute(sql_text, params)
@@ -1510,21 +1830,18 @@ class Bip44Wallet(QObject):
                                       block_timestamp, coinbase)
                 yield utxo
         finally:
-            if db_cursor.connection.total_changes > 0:
-                self.db_intf.commit()
-            self.db_intf.release_cursor()
+            self.db_intf.release_read_cursor()
 
         diff = time.time() - tm_begin
         log.debug('list_utxos_for_account exec time: %ss', diff)
 
     def list_utxos_for_addresses(self, address_ids: List[int], only_new = False,
-                                 filter_by_satoshis: Optional[int] = None) -> Generator[UtxoType, None, None]:
-        db_cursor = self.db_intf.get_cursor()
+                                 filter_by_satoshis: Optional[int] = None, start_after: Optional[UtxoType] = None,
+                                 max_count: Optional[int] = None) -> Generator[UtxoType, None, None]:
+        db_cursor = self.db_intf.get_read_cursor()
         try:
-            sql_text = "select o.id, tx.block_height, tx.coinbase,tx.block_timestamp, tx.tx_hash, o.output_index, " \
-                       "o.satoshis, o.address_id from tx_output o join address a" \
-                       " on a.id=o.address_id join tx on tx.id=o.tx_id where (spent_tx_id is null " \
-                       " or spent_input_index is null) and a.id in (select id from temp_ids2)"
+            sql_text = "select u.id, u.block_height, u.coinbase, u.block_timestamp, u.tx_hash, u.output_index, " \
+                       "u.satoshis, u.address_id from utxo u where u.address_id in (select id from temp_ids2)"
 
             params = []
             self._fill_temp_ids_table(address_ids, db_cursor, tab_sufix='2')
@@ -1532,13 +1849,13 @@ class Bip44Wallet(QObject):
             if only_new:
                 # limit returned utxos only to those existing in the self.utxos_added list
                 self._fill_temp_ids_table([id for id in self.utxos_added], db_cursor)
-                sql_text += ' and o.id in (select id from temp_ids)'
+                sql_text += ' and u.id in (select id from temp_ids)'
 
             if filter_by_satoshis:
-                sql_text += ' and o.satoshis=?'
+                sql_text += ' and u.satoshis=?'
                 params.append(filter_by_satoshis)
 
-            sql_text += " order by tx.block_height desc"
+            sql_text += self._get_utxos_page_sql(start_after, max_count, params)
 
             db_cursor.execute(sql_text, params)
 
@@ -1551,20 +1868,16 @@ class Bip44Wallet(QObject):
                 yield utxo
 
         finally:
-            if db_cursor.connection.total_changes > 0:
-                self.db_intf.commit()
-            self.db_intf.release_cursor()
+            self.db_intf.release_read_cursor()
 
     def list_utxos_for_ids(self, utxo_ids: List[int]) -> Generator[UtxoType, None, None]:
-        db_cursor = self.db_intf.get_cursor()
+        db_cursor = self.db_intf.get_read_cursor()
         try:
             self._fill_temp_ids_table(utxo_ids, db_cursor)
 
-            sql_text = "select o.id, tx.block_height, tx.coinbase,tx.block_timestamp, tx.tx_hash, o.output_index, " \
-                       "o.satoshis, o.address_id from tx_output o join address a" \
-                       " on a.id=o.address_id join tx on tx.id=o.tx_id where (spent_tx_id is null " \
-                       " or spent_input_index is null) and o.id in (select id from temp_ids) " \
-                       " order by tx.block_height desc"
+            sql_text = "select u.id, u.block_height, u.coinbase, u.block_timestamp, u.tx_hash, u.output_index, " \
+                       "u.satoshis, u.address_id from utxo u where u.id in (select id from temp_ids) " \
+                       "order by u.block_height desc"
 
             db_cursor.execute(sql_text)
 
@@ -1577,134 +1890,178 @@ class Bip44Wallet(QObject):
                 yield utxo
 
         finally:
-            if db_cursor.connection.total_changes > 0:
-                self.db_intf.commit()
-            self.db_intf.release_cursor()
+            self.db_intf.release_read_cursor()
 
-    def _prepare_cursor_for_txs_list(self, db_cursor, account_id: Optional[int], address_ids: Optional[List[int]]):
+    @staticmethod
+    def get_tx_list_key(tx: TxType) -> Tuple[int, int, int, int]:
+        """
+        Returns the position of the transaction entry in the history list (block height, tx db id, direction,
+        output db id), used for the keyset pagination in list_txs.
+        """
+        tx_id, output_id, direction = [int(elem) for elem in tx.id.split(':')]
+        return tx.block_height, tx_id, direction, output_id
 
+    def _read_txs_list_page(self, db_cursor, account_id: Optional[int], address_ids: Optional[List[int]],
+                            start_after_key: Optional[Tuple[int, int, int, int]], max_count: int) -> List[TxType]:
+        """
+        Reads one page of the transaction history entries from the tx_summary table. If address_ids is used
+        to limit the entries, the ids have to be already placed in the temp_ids table.
+        """
         if account_id is not None:
-            condition = ' join address ach on ach.id=a.parent_id join address aca on aca.id=ach.parent_id where ' \
-                        'aca.id=? '
+            scope_condition = 's.account_id=?'
+            scope_params = [account_id]
         elif address_ids:
-            condition = ' where a.id in (select id from temp_ids) '
-            self._fill_temp_ids_table(address_ids, db_cursor)
+            scope_condition = 's.address_id in (select id from temp_ids)'
+            scope_params = []
         else:
-            condition = ''
-
-        sql_text = """
-            select -1 type,
-                   group_concat(DISTINCT a.id) src_addr_ids,
-                   (select group_concat(DISTINCT ifnull(o.address_id,'')||':'||o.address||':'||output_index||':'||o.satoshis) 
-                    from tx_output o where o.tx_id=t.id) rcp_addresses,
-                   sum(i.satoshis),
-                   t.id,
-                   t.tx_hash,
-                   t.block_height,
-                   t.block_timestamp,
-                   0 is_coinbase,
-                   -1
-            from tx_input i join tx t on t.id=i.tx_id join address a on a.id=i.src_address_id """ + \
-            condition + \
-            """ group by t.id
-            union
-            select 1 type,
-                   group_concat(DISTINCT ifnull(src_address_id,'')||':'||i.src_address),
-                   ifnull(o.address_id,'')||':'||o.address||':'||o.output_index||':'||o.satoshis,
-                   o.satoshis,
-                   t.id,
-                   t.tx_hash,
-                   t.block_height,
-                   t.block_timestamp, max(i.coinbase) is_coinbase,
-                   o.id
-            from tx_output o join tx t on t.id=o.tx_id join address a on a.id=o.address_id 
-            join tx_input i on i.tx_id=t.id """ + \
-            condition + \
-            """ group by o.id
-            order by block_height desc, type desc"""
-
-        t = time.time()
-        db_cursor.execute(sql_text, (account_id, account_id) if account_id else ())
-        log.debug('SQL exec time: %s', time.time() - t)
-
-    def _parse_addrs_str_gen(self, addrs_str: str) -> Generator[Union[Bip44AddressType, str], None, None]:
-        """addrs_str: address:address_id:tx_index:amount """
-        if addrs_str:
-            for addr_str in addrs_str.split(','):
-                elems = addr_str.split(':')
-                id = None
-                if len(elems):
-                    id = elems.pop(0)
-                if len(elems):
-                    addr_str = elems.pop(0)
-                if id:
-                    id = int(id)
-                    a = self.addresses_by_id.get(id)
-                    if a:
-                        yield a
-                else:
-                    yield addr_str
-
-    def list_txs(self, account_id: Optional[int], address_ids: Optional[List[int]], only_new = False) -> \
+            scope_condition = '1=1'
+            scope_params = []
+
+        condition = scope_condition
+        params = list(scope_params)
+        if start_after_key:
+            condition += ' and (s.block_height, s.tx_id, s.direction, s.output_id) < (?,?,?,?)'
+            params.extend(start_after_key)
+
+        db_cursor.execute(
+            "select s.direction, s.tx_id, s.output_id, sum(s.satoshis), s.block_height, s.block_timestamp, "
+            "max(s.coinbase), tx.tx_hash from tx_summary s join tx on tx.id=s.tx_id where " + condition +
+            " group by s.block_height, s.tx_id, s.direction, s.output_id "
+            "order by s.block_height desc, s.tx_id desc, s.direction desc, s.output_id desc limit ?",
+            params + [max_count])
+
+        txs = []
+        incoming_by_output_id: Dict[int, TxType] = {}
+        incoming_by_tx_id: Dict[int, List[TxType]] = {}
+        outgoing_by_tx_id: Dict[int, TxType] = {}
+        for direction, tx_id, output_id, satoshis, bh, bts, is_coinbase, tx_hash in db_cursor.fetchall():
+            tx = TxType()
+            tx.id = str(tx_id) + ':' + str(output_id) + ':' + str(direction)
+            tx.tx_hash = tx_hash
+            tx.is_coinbase = is_coinbase
+            tx.satoshis = satoshis
+            tx.direction = direction
+            tx.block_height = bh
+            tx.block_timestamp = bts
+            tx.block_time_str = app_utils.to_string(datetime.datetime.fromtimestamp(bts))
+            txs.append(tx)
+            if direction == 1:
+                incoming_by_output_id[output_id] = tx
+                incoming_by_tx_id.setdefault(tx_id, []).append(tx)
+            else:
+                outgoing_by_tx_id[tx_id] = tx
+
+        def add_addr(addr_list: List[Union[Bip44AddressType, str]], address_id: Optional[int], address: str):
+            if address_id:
+                a = self.addresses_by_id.get(address_id)
+                if a and not any(a is x for x in addr_list):
+                    addr_list.append(a)
+            elif address and address not in addr_list:
+                addr_list.append(address)
+
+        if txs:
+            # counterparties of the entries: the senders of an incoming entry are the source addresses of all the
+            # transaction inputs; the senders of an outgoing entry are the listed wallet addresses and its
+            # recipients are all the transaction outputs
+            self._fill_temp_ids_table(list(incoming_by_tx_id.keys()) + list(outgoing_by_tx_id.keys()), db_cursor,
+                                      tab_sufix='2')
+
+            if incoming_by_tx_id:
+                db_cursor.execute('select tx_id, src_address_id, src_address from tx_input '
+                                  'where tx_id in (select id from temp_ids2) order by tx_id, input_index')
+                for tx_id, address_id, address in db_cursor.fetchall():
+                    for tx in incoming_by_tx_id.get(tx_id, []):
+                        add_addr(tx.sender_addrs, address_id, address)
+
+            db_cursor.execute('select tx_id, id, address_id, address from tx_output '
+                              'where tx_id in (select id from temp_ids2) order by tx_id, output_index')
+            for tx_id, output_id, address_id, address in db_cursor.fetchall():
+                tx = incoming_by_output_id.get(output_id)
+                if tx:
+                    add_addr(tx.recipient_addrs, address_id, address)
+                tx = outgoing_by_tx_id.get(tx_id)
+                if tx:
+                    add_addr(tx.recipient_addrs, address_id, address)
+
+            if outgoing_by_tx_id:
+                db_cursor.execute('select s.tx_id, s.address_id from tx_summary s where s.direction=-1 and '
+                                  's.tx_id in (select id from temp_ids2) and ' + scope_condition, scope_params)
+                for tx_id, address_id in db_cursor.fetchall():
+                    tx = outgoing_by_tx_id.get(tx_id)
+                    if tx:
+                        add_addr(tx.sender_addrs, address_id, '')
+        return txs
+
+    def list_txs(self, account_id: Optional[int], address_ids: Optional[List[int]], only_new = False,
+                 start_after: Optional[TxType] = None, max_count: Optional[int] = None) -> \
             Generator[TxType, None, None]:
+        """
+        Lists the transaction history entries (newest first) of an account or a list of addresses.
+        :param start_after: if not None, the entries following this one are listed (keyset pagination)
+        :param max_count: max number of entries to be returned (all if None)
+        """
 
         tm_begin = time.time()
         if account_id:
             self.validate_hd_tree()  # we don't need a hw connection when scanning specific addresses
-        db_cursor = self.db_intf.get_cursor()
+        db_cursor = self.db_intf.get_read_cursor()
         try:
-            self._prepare_cursor_for_txs_list(db_cursor, account_id, address_ids)
-
-            for type, snd_addrs, rcp_addrs, satoshis, tx_id, tx_hash, bh, bts, is_coinbase, output_id \
-                    in db_cursor.fetchall():
-
-                tx = TxType()
-                tx.id = str(tx_id) + ':' + str(output_id) + ':' + str(type)
-                tx.tx_hash = tx_hash
-                tx.is_coinbase = is_coinbase
-                tx.satoshis = satoshis
-                tx.direction = type
-                tx.block_height = bh
-                tx.block_timestamp = bts
-                tx.block_time_str = app_utils.to_string(datetime.datetime.fromtimestamp(bts))
-                for a in self._parse_addrs_str_gen(snd_addrs):
-                    tx.sender_addrs.append(a)
-                for a in self._parse_addrs_str_gen(rcp_addrs):
-                    tx.recipient_addrs.append(a)
-                yield tx
+            if account_id is None and address_ids:
+                self._fill_temp_ids_table(address_ids, db_cursor)
+            start_after_key = self.get_tx_list_key(start_after) if start_after else None
+            count = 0
+
+            while max_count is None or count < max_count:
+                page_size = TX_LIST_PAGE_SIZE if max_count is None else min(TX_LIST_PAGE_SIZE, max_count - count)
+                txs = self._read_txs_list_page(db_cursor, account_id, address_ids, start_after_key, page_size)
+                for tx in txs:
+                    yield tx
+                count += len(txs)
+                if len(txs) < page_size:
+                    break
+                start_after_key = self.get_tx_list_key(txs[-1])
         finally:
-            if db_cursor.connection.total_changes > 0:
-                self.db_intf.commit()
-            self.db_intf.release_cursor()
+            self.db_intf.release_read_cursor()
 
         diff = time.time() - tm_begin
-        log.debug('list_utxos_for_account exec time: %ss', diff)
+        log.debug('list_txs exec time: %ss', diff)
 
     def list_accounts(self) -> Generator[Bip44AccountType, None, None]:
         tm_begin = time.time()
         self.validate_hd_tree()
         self.addr_ids_created.clear()
-        db_cursor = self.db_intf.get_cursor()
-        try:
-            tree_id = self.get_tree_id()
+        tree_id = self.get_tree_id()
 
-            db_cursor.execute("select id from address where parent_id is null and xpub_hash is not null and tree_id=? "
-                              "order by address_index",
-                              (tree_id,))
+        # the account ids are read from a snapshot, so listing accounts doesn't wait for the tx fetch process
+        # holding the write session; the write session is acquired only for accounts not loaded yet
+        db_read_cursor = self.db_intf.get_read_cursor()
+        try:
+            db_read_cursor.execute("select id from address where parent_id is null and xpub_hash is not null and "
+                                   "tree_id=? order by address_index", (tree_id,))
+            account_ids = [id for id, in db_read_cursor.fetchall()]
+        finally:
+            self.db_intf.release_read_cursor()
 
-            for id, in db_cursor.fetchall():
-                acc = self._get_account_by_id(id, db_cursor)
+        db_cursor = None
+        try:
+            for id in account_ids:
+                acc = self.account_by_id.get(id)
+                if not acc or not acc.xpub or not acc.last_verify_balance_ts:
+                    if not db_cursor:
+                        db_cursor = self.db_intf.get_cursor()
+                    acc = self._get_account_by_id(id, db_cursor)
 
-                if not acc.last_verify_balance_ts:
-                    self._update_addr_balances(acc, None, db_cursor)
+                    if not acc.last_verify_balance_ts:
+                        self._update_addr_balances(acc, None, db_cursor)
 
                 yield acc
         finally:
-            self._process_addresses_created(db_cursor)
+            if db_cursor:
+                self._process_addresses_created(db_cursor)
 
-            if db_cursor.connection.total_changes > 0:
-                self.db_intf.commit()
-            self.db_intf.release_cursor()
+                if db_cursor.connection.total_changes > 0:
+                    self.db_intf.commit()
+                self.db_intf.release_cursor()
         diff = time.time() - tm_begin
         log.debug(f'Accounts read time: {diff}s')
 
@@ -2,9 +2,11 @@
 # -*- coding: utf-8 -*-
 # Author: Bertrand256
 # Created on: 2017-03
+import base64
 import decimal
 import functools
 import json
+import urllib.parse
 
 import os
 import re
@@ -20,7 +22,7 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from paramiko import AuthenticationException, PasswordRequiredException, SSHException
 from paramiko.ssh_exception import NoValidConnectionsError, BadAuthenticationType
-from typing import List, Dict, Union, Callable, Optional
+from typing import List, Dict, Union, Optional, Tuple, Any
 import app_cache
 from app_config import AppConfig
 from random import randint
@@ -44,6 +46,12 @@ except ImportError:
 # features
 MASTERNODES_CACHE_VALID_SECONDS = 60 * 60  # 60 minutes
 PROTX_CACHE_VALID_SECONDS = 3 * 60 * 60  # 60 minutes
+RPC_BATCH_MAX_CALLS = 100  # max number of calls sent to an RPC node in a single JSON-RPC batch request
+DASH_BLOCK_TIME_SECONDS = 2.5 * 60
+# max age of the masternode list synchronized incrementally (with 'protx diff'); after that time the whole list
+# is reloaded from the network
+MASTERNODES_FULL_RELOAD_SECONDS = 60 * 60
+MASTERNODES_DIFF_MAX_BLOCKS = 200  # for larger block ranges the whole list is reloaded instead of applying a diff
 
 
 class ForwardServer (socketserver.ThreadingTCPServer):
@@ -376,6 +384,78 @@ class DashdSSH(object):
             self.connected = False
 
 
+class RpcConnection(object):
+    """
+    Single HTTP(S) connection to an RPC node together with the AuthServiceProxy object using it. Instances are
+    kept in the connection pool of DashdInterface and leased to threads for the duration of an RPC call.
+    """
+    def __init__(self, rpc_url: str, http_conn: httplib.HTTPConnection, generation: int):
+        self.http_conn = http_conn
+        self.proxy = AuthServiceProxy(rpc_url, timeout=1000, connection=http_conn)
+        # value of DashdInterface.conn_generation at the moment of creating the connection; connections from
+        # older generations (created before reconnecting or switching to another node) are discarded
+        self.generation = generation
+        self.url = urllib.parse.urlparse(rpc_url)
+        user = urllib.parse.unquote(self.url.username or '')
+        password = urllib.parse.unquote(self.url.password or '')
+        self.auth_header = b'Basic ' + base64.b64encode((user + ':' + password).encode('utf8'))
+
+    def batch(self, calls: List[Tuple]) -> List[Any]:
+        """
+        Sends a list of RPC calls in a single HTTP request (JSON-RPC batch).
+        :param calls: list of tuples: (command, arg1, arg2, ...)
+        :return: list of results in the order of the calls; a call that failed on the node side is represented by
+            a JSONRPCException object
+        """
+        postdata = json.dumps([{'version': '1.1', 'method': c[0], 'params': list(c[1:]), 'id': idx}
+                               for idx, c in enumerate(calls)], default=EncodeDecimal)
+        self.http_conn.request('POST', self.url.path or '/', postdata,
+                               {'Host': self.url.hostname,
+                                'User-Agent': 'AuthServiceProxy/0.1',
+                                'Authorization': self.auth_header,
+                                'Content-type': 'application/json'})
+        http_response = self.http_conn.getresponse()
+        if http_response is None:
+            raise JSONRPCException({'code': -342, 'message': 'missing HTTP response from server'})
+        content_type = http_response.getheader('Content-Type')
+        if content_type != 'application/json':
+            raise JSONRPCException({
+                'code': -342, 'message': 'non-JSON HTTP response with \'%i %s\' from server' %
+                                         (http_response.status, http_response.reason)})
+        responses = json.loads(http_response.read().decode('utf8'), parse_float=decimal.Decimal)
+        if isinstance(responses, dict):
+            # the whole batch has been rejected
+            raise JSONRPCException(responses.get('error') or {'code': -343, 'message': 'invalid batch response'})
+
+        response_by_id = {}
+        for r in responses:
+            response_by_id[r.get('id')] = r
+        results = []
+        for idx in range(len(calls)):
+            r = response_by_id.get(idx)
+            if r is None or ('result' not in r and r.get('error') is None):
+                results.append(JSONRPCException({'code': -343, 'message': 'missing JSON-RPC result'}))
+            elif r.get('error') is not None:
+                results.append(JSONRPCException(r['error']))
+            else:
+                results.append(r['result'])
+        return results
+
+    def close(self):
+        try:
+            self.http_conn.close()
+        except Exception:
+            log.exception('Exception while closing RPC connection')
+
+
+class RpcCallContext(threading.local):
+    """Per-thread state of the RPC calls being currently executed by the thread."""
+    def __init__(self):
+        self.depth = 0  # nesting level of control_rpc_call decorated functions
+        self.conn: Optional[RpcConnection] = None  # connection leased by the thread from the pool
+        self.starting_conn = None
+
+
 class DashdIndexException(JSONRPCException):
     """
     Exception for notifying, that dash daemon should have indexing option tuned on
@@ -405,37 +485,18 @@ def control_rpc_call(_func=None, *, encrypt_rpc_arguments=False, allow_switching
             ret = None
             last_exception = None
             self = args[0]
-            self.mark_call_begin()
+            call_ctx = self.call_ctx
+            if call_ctx.depth == 0:
+                self.mark_call_begin()
+            call_ctx.depth += 1
             try:
-                self.http_lock.acquire()
                 last_conn_reset_time = None
                 for try_nr in range(1, 5):
+                    conn_generation = self.conn_generation
                     try:
                         try:
                             if encrypt_rpc_arguments:
-                                if self.cur_conn_def:
-                                    pubkey = self.cur_conn_def.get_rpc_encryption_pubkey_object()
-                                else:
-                                    pubkey = None
-
-                                if pubkey:
-                                    args_str = json.dumps(args[1:])
-                                    max_chunk_size = int(pubkey.key_size / 8) - 75
-
-                                    encrypted_parts = []
-                                    while args_str:
-                                        data_chunk = args_str[:max_chunk_size]
-                                        args_str = args_str[max_chunk_size:]
-                                        ciphertext = pubkey.encrypt(data_chunk.encode('ascii'),
-                                                                    padding.OAEP(
-                                                                        mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                                                                        algorithm=hashes.SHA256(),
-                                                                        label=None))
-                                        encrypted_parts.append(ciphertext.hex())
-                                    args = (args[0], 'DMTENCRYPTEDV1') + tuple(encrypted_parts)
-                                    log.info(
-                                        'Arguments of the "%s" call have been encrypted with the RSA public key of '
-                                        'the RPC node.', func.__name__)
+                                args = (args[0],) + self.encrypt_rpc_args(func.__name__, args[1:])
 
                             ret = func(*args, **kwargs)
 
@@ -465,7 +526,8 @@ def control_rpc_call(_func=None, *, encrypt_rpc_arguments=False, allow_switching
                         except JSONRPCException as e:
                             log.error('Error while calling of "' + str(func) + ' (2)". Details: ' + str(e))
                             err_message = e.error.get('message','').lower()
-                            self.http_conn.close()
+                            if self.http_conn:
+                                self.http_conn.close()
                             if e.code == -5 and e.message == 'No information available for address':
                                 raise DashdIndexException(e)
                             elif err_message.find('502 bad gateway') >= 0 or err_message.find('unknown error') >= 0:
@@ -477,16 +539,24 @@ def control_rpc_call(_func=None, *, encrypt_rpc_arguments=False, allow_switching
                         # try another net config if possible
                         log.error('Error while calling of "' + str(func) + '" (4). Details: ' + str(e))
 
-                        if not allow_switching_conns or not self.switch_to_next_config():
-                            self.last_error_message = str(e.org_exception)
-                            raise e.org_exception  # couldn't use another conn config, raise last exception
-                        else:
-                            try_nr -= 1  # another config retries do not count
-                            last_exception = e.org_exception
+                        with self.http_lock:
+                            if conn_generation != self.conn_generation:
+                                # another thread has already reconnected or switched to another config while
+                                # this call was being processed; just retry with the current one
+                                last_exception = e.org_exception
+                            elif not allow_switching_conns or not self.switch_to_next_config():
+                                self.last_error_message = str(e.org_exception)
+                                raise e.org_exception  # couldn't use another conn config, raise last exception
+                            else:
+                                try_nr -= 1  # another config retries do not count
+                                last_exception = e.org_exception
                     except Exception:
                         raise
             finally:
-                self.http_lock.release()
+                call_ctx.depth -= 1
+                if call_ctx.depth == 0 and call_ctx.conn is not None:
+                    self.release_rpc_connection(call_ctx.conn)
+                    call_ctx.conn = None
 
             if last_exception:
                 raise last_exception
@@ -526,44 +596,44 @@ class Masternode(AttrsProtected):
         super().__setattr__(name, value)
 
 
-def json_cache_wrapper(func, intf, cache_file_ident, skip_cache=False,
-                       accept_cache_data_fun: Optional[Callable[[Dict], bool]]=None):
+class MasternodePaymentQueue(object):
     """
-    Wrapper for saving/restoring rpc-call results inside cache files.
-    :param accept_cache_data_fun: reference to an external function verifying whether data read from cache
-        can be accepted; if not, a normal call to an rpc node will be executed
+    Masternode payment queue: positions of the ENABLED masternodes in the order they will be paid.
+    The object is rebuilt as a whole after each masternode list read, so readers can query it without
+    locking.
     """
-    def json_call_wrapper(*args, **kwargs):
-        nonlocal skip_cache, cache_file_ident, intf, func
-
-        fname = '/insight_dash_'
-        if intf.app_config.is_testnet():
-            fname += 'testnet_'
-
-        cache_file = intf.app_config.tx_cache_dir + fname + cache_file_ident + '.json'
-        if not skip_cache:
-            try:  # looking into cache first
-                with open(cache_file) as fp:
-                    j = json.load(fp, parse_float=decimal.Decimal)
-                log.debug('Loaded data from existing cache file: ' + cache_file)
-
-                if accept_cache_data_fun is None or accept_cache_data_fun(j):
-                    return j
-            except:
-                pass
 
-        # if not found in cache, call the original function
-        j = func(*args, **kwargs)
+    def __init__(self, idents: Optional[List[str]] = None, block_height: Optional[int] = None,
+                 timestamp: Optional[int] = None):
+        self.idents: List[str] = idents if idents is not None else []  # position -> masternode ident
+        self.position_by_ident: Dict[str, int] = {ident: pos for pos, ident in enumerate(self.idents)}
+        # the block height the queue has been computed for and the time of the computation; both projections
+        # (payment block and payment time) are based on them
+        self.block_height = block_height
+        self.timestamp = timestamp if timestamp is not None else int(time.time())
 
-        try:
-            with open(cache_file, 'w') as fp:
-                json.dump(j, fp, default=EncodeDecimal)
-        except Exception as e:
-            log.exception('Cannot save data to a cache file')
-            pass
-        return j
+    def __len__(self):
+        return len(self.idents)
+
+    def get_position(self, mn_ident: str) -> Optional[int]:
+        return self.position_by_ident.get(mn_ident)
+
+    def get_ident(self, position: int) -> Optional[str]:
+        if 0 <= position < len(self.idents):
+            return self.idents[position]
+        return None
+
+    def get_projected_payment_block(self, mn_ident: str) -> Optional[int]:
+        pos = self.position_by_ident.get(mn_ident)
+        if pos is not None and self.block_height is not None:
+            return self.block_height + pos + 1
+        return None
 
-    return json_call_wrapper
+    def get_projected_payment_time(self, mn_ident: str) -> Optional[int]:
+        pos = self.position_by_ident.get(mn_ident)
+        if pos is not None:
+            return int(self.timestamp + (pos + 1) * DASH_BLOCK_TIME_SECONDS)
+        return None
 
 
 class DashdInterface(WndUtils):
@@ -580,28 +650,40 @@ class DashdInterface(WndUtils):
         self.cur_conn_index = 0
         self.cur_conn_def: Optional['DashNetworkConnectionCfg'] = None
 
-        # below is the connection with which particular RPC call has started; if connection is switched because of
-        # problems with some nodes, switching stops if we close round and return to the starting connection
-        self.starting_conn = None
-
         self.masternodes = []  # cached list of all masternodes (Masternode object)
         self.masternodes_by_ident = {}
         self.masternodes_by_ip_port = {}
         self.protx_by_mn_ident: Dict[str, Dict] = {}
+        self.payment_queue = MasternodePaymentQueue()
+        self.mn_list_sync_block: Optional[Tuple[int, str]] = None  # (height, hash) the cached list is in sync with
+        self.mn_list_full_read_time = 0
 
         self.ssh = None
         self.window = window
         self.active = False
         self.rpc_url = None
-        self.proxy = None
-        self.http_conn = None  # HTTPConnection object passed to the AuthServiceProxy (for convinient connection reset)
+        self.rpc_host = None
+        self.rpc_port = None
+        self.rpc_use_ssl = False
         self.on_connection_initiated_callback = on_connection_initiated_callback
         self.on_connection_failed_callback = on_connection_failed_callback
         self.on_connection_successful_callback = on_connection_successful_callback
         self.on_connection_disconnected_callback = on_connection_disconnected_callback
         self.last_error_message = None
         self.mempool_txes:Dict[str, Dict] = {}
+        # protects the masternode list data and mempool_txes, which are read and updated from different threads;
+        # it's not held during RPC calls, so that they can still be executed concurrently
+        self.data_lock = threading.RLock()
+
+        # RPC calls from different threads are executed concurrently, each over its own HTTP connection leased
+        # from the pool below; http_lock protects the connection state (opening, switching between configs and
+        # the pool itself)
         self.http_lock = threading.RLock()
+        self.conn_released_cond = threading.Condition(self.http_lock)
+        self.idle_conns: List[RpcConnection] = []
+        self.conns_in_use = 0
+        self.conn_generation = 0  # incremented each time the existing RPC connections become obsolete
+        self.call_ctx = RpcCallContext()
 
     def initialize(self, config: AppConfig, connection=None, for_testing_connections_only=False):
         self.app_config = config
@@ -627,59 +709,65 @@ class DashdInterface(WndUtils):
             self.load_data_from_db_cache()
 
     def load_data_from_db_cache(self):
-        self.masternodes.clear()
-        self.masternodes_by_ident.clear()
-        self.masternodes_by_ip_port.clear()
-        cur = self.db_intf.get_cursor()
-        cur2 = self.db_intf.get_cursor()
-        db_modified = False
-        try:
-            tm_start = time.time()
-            db_correction_duration = 0.0
-            log.debug("Reading masternodes' data from DB")
-            cur.execute("SELECT id, ident, status, payee, last_seen, active_seconds,"
-                        " last_paid_time, last_paid_block, IP, queue_position from MASTERNODES where dmt_active=1")
-            for row in cur.fetchall():
-                db_id = row[0]
-                ident = row[1]
-
-                # correct duplicated masternodes issue
-                mn_first = self.masternodes_by_ident.get(ident)
-                if mn_first is not None:
-                    continue
-
-                # delete duplicated (caused by breaking the app while loading)
-                tm_start_1 = time.time()
-                cur2.execute('DELETE from MASTERNODES where ident=? and id<>?', (ident, db_id))
-                if cur2.rowcount > 0:
-                    db_modified = True
-                db_correction_duration += (time.time() - tm_start_1)
-
-                mn = Masternode()
-                mn.db_id = db_id
-                mn.ident = ident
-                mn.status = row[2]
-                mn.payee = row[3]
-                mn.lastseen = row[4]
-                mn.activeseconds = row[5]
-                mn.lastpaidtime = row[6]
-                mn.lastpaidblock = row[7]
-                mn.ip = row[8]
-                mn.queue_position = row[9]
-                self.masternodes.append(mn)
-                self.masternodes_by_ident[mn.ident] = mn
-                self.masternodes_by_ip_port[mn.ip] = mn
-
-            tm_diff = time.time() - tm_start
-            log.info('DB read time of %d MASTERNODES: %s s, db fix time: %s' %
-                         (len(self.masternodes), str(tm_diff), str(db_correction_duration)))
-        except Exception as e:
-            log.exception('SQLite initialization error')
-        finally:
-            if db_modified:
-                self.db_intf.commit()
-            self.db_intf.release_cursor()
-            self.db_intf.release_cursor()
+        with self.data_lock:
+            self.mn_list_sync_block = None
+            self.masternodes = []
+            self.masternodes_by_ident = {}
+            self.masternodes_by_ip_port = {}
+            cur = self.db_intf.get_cursor()
+            try:
+                tm_start = time.time()
+                log.debug("Reading masternodes' data from DB")
+                cur.execute("SELECT id, ident, status, payee, last_seen, active_seconds,"
+                            " last_paid_time, last_paid_block, IP, queue_position, protx_hash, registered_height "
+                            "from MASTERNODES where dmt_active=1")
+                for row in cur.fetchall():
+                    db_id = row[0]
+                    ident = row[1]
+
+                    # duplicated records have been removed by the db migration and the unique index prevents creating
+                    # them again, but let's be defensive here
+                    if ident in self.masternodes_by_ident:
+                        continue
+
+                    mn = Masternode()
+                    mn.db_id = db_id
+                    mn.ident = ident
+                    mn.status = row[2]
+                    mn.payee = row[3]
+                    mn.lastseen = row[4]
+                    mn.activeseconds = row[5]
+                    mn.lastpaidtime = row[6]
+                    mn.lastpaidblock = row[7]
+                    mn.ip = row[8]
+                    mn.queue_position = row[9]
+                    mn.protx_hash = row[10]
+                    mn.registered_height = row[11]
+                    self.masternodes.append(mn)
+                    self.masternodes_by_ident[mn.ident] = mn
+                    self.masternodes_by_ip_port[mn.ip] = mn
+
+                if self.masternodes:
+                    # the block the cached list is in sync with, to continue the incremental synchronization
+                    sync_block = app_cache.get_value(f'MasternodesSyncBlock_{self.app_config.dash_network}', [], list)
+                    if len(sync_block) == 2:
+                        self.mn_list_sync_block = (int(sync_block[0]), str(sync_block[1]))
+                        self.mn_list_full_read_time = app_cache.get_value(
+                            f'MasternodesFullReadTime_{self.app_config.dash_network}', 0, int)
+
+                queued_mns = sorted([mn for mn in self.masternodes if mn.queue_position is not None],
+                                    key=lambda x: x.queue_position)
+                self.payment_queue = MasternodePaymentQueue(
+                    [mn.ident for mn in queued_mns],
+                    self.mn_list_sync_block[0] if self.mn_list_sync_block else None,
+                    app_cache.get_value(f'MasternodesLastReadTime_{self.app_config.dash_network}', 0, int))
+
+                tm_diff = time.time() - tm_start
+                log.info('DB read time of %d MASTERNODES: %s s' % (len(self.masternodes), str(tm_diff)))
+            except Exception as e:
+                log.exception('SQLite initialization error')
+            finally:
+                self.db_intf.release_cursor()
 
     def reload_configuration(self):
         """Called after modification of connections' configuration or changes having impact on the file name
@@ -696,18 +784,140 @@ class DashdInterface(WndUtils):
             self.cur_conn_def = None
 
     def disconnect(self):
-        if self.active:
-            log.debug('Disconnecting')
-            if self.ssh:
-                self.ssh.disconnect()
-                del self.ssh
-                self.ssh = None
-            self.active = False
-            if self.on_connection_disconnected_callback:
-                self.on_connection_disconnected_callback()
+        with self.http_lock:
+            if self.active:
+                log.debug('Disconnecting')
+                self.drop_rpc_connections()
+                if self.ssh:
+                    self.ssh.disconnect()
+                    del self.ssh
+                    self.ssh = None
+                self.active = False
+                if self.on_connection_disconnected_callback:
+                    self.on_connection_disconnected_callback()
+
+    @property
+    def starting_conn(self):
+        """
+        The connection config with which the current thread's RPC call has started; if connection is switched because
+        of problems with some nodes, switching stops if we close round and return to the starting connection.
+        """
+        return self.call_ctx.starting_conn
 
     def mark_call_begin(self):
-        self.starting_conn = self.cur_conn_def
+        self.call_ctx.starting_conn = self.cur_conn_def
+
+    @property
+    def proxy(self) -> AuthServiceProxy:
+        """AuthServiceProxy object of the RPC connection leased by the calling thread."""
+        return self.get_thread_rpc_connection().proxy
+
+    @property
+    def http_conn(self) -> Optional[httplib.HTTPConnection]:
+        """HTTP connection leased by the calling thread (if any) - used for convenient connection reset."""
+        conn = self.call_ctx.conn
+        if conn:
+            return conn.http_conn
+        return None
+
+    def get_max_rpc_connections(self) -> int:
+        if self.cur_conn_def:
+            return self.cur_conn_def.max_connections
+        return 1
+
+    def create_rpc_connection(self) -> RpcConnection:
+        if self.rpc_use_ssl:
+            http_conn = httplib.HTTPSConnection(self.rpc_host, self.rpc_port, timeout=20,
+                                                context=ssl._create_unverified_context())
+        else:
+            http_conn = httplib.HTTPConnection(self.rpc_host, self.rpc_port, timeout=20)
+        return RpcConnection(self.rpc_url, http_conn, self.conn_generation)
+
+    def acquire_rpc_connection(self) -> RpcConnection:
+        """
+        Leases a connection from the pool; if all of the allowed connections for the current config are in use,
+        waits for one of them to be released.
+        """
+        with self.http_lock:
+            while True:
+                if not self.open():
+                    raise Exception('Not connected')
+                if self.idle_conns:
+                    conn = self.idle_conns.pop()
+                elif self.conns_in_use < self.get_max_rpc_connections():
+                    conn = self.create_rpc_connection()
+                else:
+                    self.conn_released_cond.wait()
+                    continue
+                self.conns_in_use += 1
+                return conn
+
+    def release_rpc_connection(self, conn: RpcConnection):
+        with self.http_lock:
+            self.conns_in_use -= 1
+            if self.active and conn.generation == self.conn_generation and \
+               len(self.idle_conns) < self.get_max_rpc_connections():
+                self.idle_conns.append(conn)
+            else:
+                conn.close()
+            self.conn_released_cond.notify()
+
+    def drop_rpc_connections(self):
+        """
+        Makes all the existing RPC connections obsolete: idle ones are closed immediately, those currently used by
+        other threads are closed when released.
+        """
+        with self.http_lock:
+            self.conn_generation += 1
+            for conn in self.idle_conns:
+                conn.close()
+            self.idle_conns.clear()
+            self.conn_released_cond.notify_all()
+
+    def get_thread_rpc_connection(self) -> RpcConnection:
+        """
+        Returns the connection leased by the calling thread, leasing one from the pool if needed. The connection
+        is returned to the pool when the outermost control_rpc_call decorated function finishes.
+        """
+        ctx = self.call_ctx
+        if ctx.depth == 0:
+            raise Exception('RPC connection can only be used inside a control_rpc_call decorated function')
+        if ctx.conn is not None and ctx.conn.generation != self.conn_generation:
+            self.release_rpc_connection(ctx.conn)
+            ctx.conn = None
+        if ctx.conn is None:
+            ctx.conn = self.acquire_rpc_connection()
+        return ctx.conn
+
+    def encrypt_rpc_args(self, command: str, args: Tuple) -> Tuple:
+        """
+        Encrypts arguments of an RPC call with the RSA public key of the current RPC node (if configured).
+        :return: encrypted arguments, prefixed with the encryption marker or the original arguments if the current
+            connection has no RPC encryption key configured
+        """
+        if self.cur_conn_def:
+            pubkey = self.cur_conn_def.get_rpc_encryption_pubkey_object()
+        else:
+            pubkey = None
+
+        if pubkey:
+            args_str = json.dumps(args)
+            max_chunk_size = int(pubkey.key_size / 8) - 75
+
+            encrypted_parts = []
+            while args_str:
+                data_chunk = args_str[:max_chunk_size]
+                args_str = args_str[max_chunk_size:]
+                ciphertext = pubkey.encrypt(data_chunk.encode('ascii'),
+                                            padding.OAEP(
+                                                mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                                                algorithm=hashes.SHA256(),
+                                                label=None))
+                encrypted_parts.append(ciphertext.hex())
+            args = ('DMTENCRYPTEDV1',) + tuple(encrypted_parts)
+            log.info('Arguments of the "%s" call have been encrypted with the RSA public key of the RPC node.',
+                     command)
+        return args
 
     def switch_to_next_config(self):
         """
@@ -715,26 +925,27 @@ class DashdInterface(WndUtils):
         with current connection config.
         :return: True if successfully switched or False if there was no another config
         """
-        if self.cur_conn_def:
-            self.app_config.conn_cfg_failure(self.cur_conn_def)  # mark connection as defective
-        if self.cur_conn_index < len(self.connections)-1:
-            idx = self.cur_conn_index + 1
-        else:
-            idx = 0
-
-        conn = self.connections[idx]
-        if conn != self.starting_conn and conn != self.cur_conn_def:
-            log.debug("Trying to switch to another connection: %s" % conn.get_description())
-            self.disconnect()
-            self.cur_conn_index = idx
-            self.cur_conn_def = conn
-            if not self.open():
-                return self.switch_to_next_config()
+        with self.http_lock:
+            if self.cur_conn_def:
+                self.app_config.conn_cfg_failure(self.cur_conn_def)  # mark connection as defective
+            if self.cur_conn_index < len(self.connections)-1:
+                idx = self.cur_conn_index + 1
             else:
-                return True
-        else:
-            log.warning('Failed to connect: no another connection configurations.')
-            return False
+                idx = 0
+
+            conn = self.connections[idx]
+            if conn != self.starting_conn and conn != self.cur_conn_def:
+                log.debug("Trying to switch to another connection: %s" % conn.get_description())
+                self.disconnect()
+                self.cur_conn_index = idx
+                self.cur_conn_def = conn
+                if not self.open():
+                    return self.switch_to_next_config()
+                else:
+                    return True
+            else:
+                log.warning('Failed to connect: no another connection configurations.')
+                return False
 
     def mark_cur_conn_cfg_is_ok(self):
         if self.cur_conn_def:
@@ -746,30 +957,33 @@ class DashdInterface(WndUtils):
         :return: True if successfully connected, False if user cancelled the operation. If all of the attempts 
             fail, then appropriate exception will be raised.
         """
-        try:
-            if not self.cur_conn_def:
-                raise Exception('There is no connections to Dash network enabled in the configuration.')
+        if self.active:
+            return True
+        with self.http_lock:
+            try:
+                if not self.cur_conn_def:
+                    raise Exception('There is no connections to Dash network enabled in the configuration.')
 
-            while True:
-                try:
-                    if self.open_internal():
-                        break
-                    else:
+                while True:
+                    try:
+                        if self.open_internal():
+                            break
+                        else:
+                            if not self.switch_to_next_config():
+                                return False
+                    except CancelException:
+                        return False
+                    except (socket.gaierror, ConnectionRefusedError, TimeoutError, socket.timeout,
+                            NoValidConnectionsError) as e:
+                        # exceptions raised by not likely functioning dashd node; try to switch to another node
+                        # if there is any in the config
                         if not self.switch_to_next_config():
-                            return False
-                except CancelException:
-                    return False
-                except (socket.gaierror, ConnectionRefusedError, TimeoutError, socket.timeout,
-                        NoValidConnectionsError) as e:
-                    # exceptions raised by not likely functioning dashd node; try to switch to another node
-                    # if there is any in the config
-                    if not self.switch_to_next_config():
-                        raise e  # couldn't use another conn config, raise exception
-                    else:
-                        break
-        except Exception as e:
-            self.last_error_message = str(e)
-            raise
+                            raise e  # couldn't use another conn config, raise exception
+                        else:
+                            break
+            except Exception as e:
+                self.last_error_message = str(e)
+                raise
 
         return True
 
@@ -779,12 +993,15 @@ class DashdInterface(WndUtils):
         (if used) and HTTP connection object to prepare for another try.
         :return:
         """
-        if self.active:
-            if self.http_conn:
-                self.http_conn.close()
-            if self.ssh:
-                self.ssh.disconnect()
-                self.active = False
+        with self.http_lock:
+            if self.active:
+                if self.http_conn:
+                    self.http_conn.close()
+                if self.ssh:
+                    # the tunnel is shared by all of the pooled connections, so all of them have to be recreated
+                    self.drop_rpc_connections()
+                    self.ssh.disconnect()
+                    self.active = False
 
     def open_internal(self):
         """
@@ -855,18 +1072,22 @@ class DashdInterface(WndUtils):
 
             if self.cur_conn_def.use_ssl:
                 self.rpc_url = 'https://'
-                self.http_conn = httplib.HTTPSConnection(rpc_host, rpc_port, timeout=5, context=ssl._create_unverified_context())
             else:
                 self.rpc_url = 'http://'
-                self.http_conn = httplib.HTTPConnection(rpc_host, rpc_port, timeout=5)
+            self.rpc_use_ssl = self.cur_conn_def.use_ssl
+            self.rpc_host = rpc_host
+            self.rpc_port = rpc_port
 
             self.rpc_url += rpc_user + ':' + rpc_password + '@' + rpc_host + ':' + str(rpc_port)
             log.debug('AuthServiceProxy configured to: %s' % self.rpc_url)
-            self.proxy = AuthServiceProxy(self.rpc_url, timeout=1000, connection=self.http_conn)
+            self.drop_rpc_connections()
+            conn = self.create_rpc_connection()
+            # timeout is initially set to 5 seconds to perform 'quick' connection test
+            conn.http_conn.timeout = 5
 
             try:
                 # check the connection
-                self.http_conn.connect()
+                conn.http_conn.connect()
                 log.debug('Successfully connected AuthServiceProxy')
 
                 try:
@@ -892,11 +1113,11 @@ class DashdInterface(WndUtils):
                 raise
             finally:
                 log.debug('http_conn.close()')
-                self.http_conn.close()
-                # timeout hase been initially set to 5 seconds to perform 'quick' connection test
-                self.http_conn.timeout = 20
+                conn.http_conn.close()
+                conn.http_conn.timeout = 20
 
             self.active = True
+            self.idle_conns.append(conn)
         return self.active
 
     def get_active_conn_description(self):
@@ -961,59 +1182,161 @@ class DashdInterface(WndUtils):
         else:
             raise Exception('Not connected')
 
+    @staticmethod
+    def get_protx_cache_entry(protx: Dict) -> Tuple[str, Dict]:
+        """
+        Converts protx data returned by 'protx list/info' to the format kept in protx_by_mn_ident.
+        :return: tuple (masternode ident, protx cache entry)
+        """
+        ident = protx.get('collateralHash') + '-' + str(protx.get('collateralIndex'))
+        s = protx.get('state', {})
+        p = {
+            'protx_hash': protx.get('proTxHash'),
+            'registered_height': s.get('registeredHeight'),
+            'pose_pelanlty': s.get('PoSePenalty'),
+            'pose_received_height': s.get('PoSeRevivedHeight'),
+            'pose_ban_height': s.get('PoSeBanHeight'),
+            'pose_revived_height': s.get('PoSeRevivedHeight', 0)
+        }
+        return ident, p
+
     def read_protx_list(self):
         last_read_time = app_cache.get_value(f'ProtxLastReadTime_{self.app_config.dash_network}', 0, int)
 
         if not self.protx_by_mn_ident or (int(time.time()) - last_read_time) >= PROTX_CACHE_VALID_SECONDS:
 
-            self.protx_by_mn_ident.clear()
+            protx_by_mn_ident = {}
             protx_list = self.proxy.protx('list', 'registered', True)
             for protx in protx_list:
-                ident = protx.get('collateralHash') + '-' + str(protx.get('collateralIndex'))
-                s = protx.get('state',{})
-                p = {
-                    'protx_hash': protx.get('proTxHash'),
-                    'registered_height': s.get('registeredHeight'),
-                    'pose_pelanlty': s.get('PoSePenalty'),
-                    'pose_received_height': s.get('PoSeRevivedHeight'),
-                    'pose_ban_height': s.get('PoSeBanHeight'),
-                    'pose_revived_height': s.get('PoSeRevivedHeight', 0)
-                }
-                self.protx_by_mn_ident[ident] = p
+                ident, p = self.get_protx_cache_entry(protx)
+                protx_by_mn_ident[ident] = p
+            with self.data_lock:
+                self.protx_by_mn_ident = protx_by_mn_ident
         return self.protx_by_mn_ident
 
-    def update_mn_queue_values(self, masternodes: List[Masternode]):
+    def read_masternode_list_diff(self) -> Optional[Tuple[List[Masternode], Tuple[int, str]]]:
         """
-        Updates masternode payment queue order values.
+        Reads changes of the deterministic masternode list since the block the cached list was synchronized with
+        ('protx diff' + payments made in the new blocks) and applies them to the cached masternode data. Only
+        masternodes that changed are read from the network (with 'protx info').
+        :return: tuple (masternode list, (block height, block hash) of the new synchronization point) or None if
+            the incremental synchronization is not possible and the whole list needs to be reloaded
         """
+        with self.data_lock:
+            if not self.mn_list_sync_block or not self.masternodes or \
+               int(time.time()) - self.mn_list_full_read_time >= MASTERNODES_FULL_RELOAD_SECONDS:
+                return None
+            base_height, base_hash = self.mn_list_sync_block
 
-        payment_queue = []
+        try:
+            # protx data is needed for the payment queue calculation (it's not kept in the db cache)
+            self.read_protx_list()
+            tip_height = self.proxy.getblockcount()
+            if tip_height < base_height or tip_height - base_height > MASTERNODES_DIFF_MAX_BLOCKS:
+                return None
+            tip_hash = self.proxy.getblockhash(tip_height)
+            if tip_height == base_height:
+                if tip_hash != base_hash:
+                    return None
+                with self.data_lock:
+                    return list(self.masternodes), (base_height, base_hash)
+
+            diff = self.proxy.protx('diff', base_height, tip_height)
+            if diff.get('baseBlockHash') != base_hash:
+                # chain reorganization
+                return None
+
+            deleted_protx = set(diff.get('deletedMNs', []))
+            changed_protx = set(e.get('proRegTxHash') for e in diff.get('mnList', []))
+
+            # 'lastPaidHeight' is not a part of the simplified masternode list used by 'protx diff', so masternodes
+            # paid in the new blocks are treated as changed
+            payments = self.proxy.masternode('payments', tip_hash, -(tip_height - base_height))
+            for block in payments:
+                for mn_payment in block.get('masternodes', []):
+                    changed_protx.add(mn_payment.get('proTxHash'))
+            changed_protx.difference_update(deleted_protx)
+            changed_protx.discard(None)
+
+            protx_infos = self.rpc_call_batch(False, False, [('protx', 'info', h) for h in changed_protx])
+            for protx in protx_infos:
+                if isinstance(protx, Exception):
+                    raise protx
+
+            paid_heights = set(p.get('state', {}).get('lastPaidHeight', 0) for p in protx_infos)
+            paid_heights.discard(0)
+            headers = self.getblockheaders_by_height(list(paid_heights)) if paid_heights else {}
+        except Exception as e:
+            log.warning('Incremental masternode list synchronization failed, reloading the whole list. '
+                        'Details: ' + str(e))
+            return None
+
+        with self.data_lock:
+            mns_by_protx = {mn.protx_hash: mn for mn in self.masternodes if mn.protx_hash}
+            changed_mns = {}
+            for protx in protx_infos:
+                ident, p = self.get_protx_cache_entry(protx)
+                self.protx_by_mn_ident[ident] = p
+                s = protx.get('state', {})
+
+                mn = Masternode()
+                existing_mn = mns_by_protx.get(protx.get('proTxHash'))
+                if existing_mn:
+                    mn.lastseen = existing_mn.lastseen
+                    mn.activeseconds = existing_mn.activeseconds
+                else:
+                    mn.lastseen = 0
+                    mn.activeseconds = 0
+                mn.ident = ident
+                mn.status = 'POSE_BANNED' if s.get('PoSeBanHeight', -1) > 0 else 'ENABLED'
+                mn.payee = s.get('payoutAddress')
+                mn.ip = s.get('service')
+                mn.lastpaidblock = s.get('lastPaidHeight', 0)
+                header = headers.get(mn.lastpaidblock)
+                mn.lastpaidtime = header.get('time', 0) if isinstance(header, dict) else 0
+                mn.protx_hash = p.get('protx_hash')
+                mn.registered_height = p.get('registered_height')
+                changed_mns[mn.protx_hash] = mn
+
+            mns = []
+            for mn in self.masternodes:
+                if mn.protx_hash in deleted_protx:
+                    self.protx_by_mn_ident.pop(mn.ident, None)
+                elif mn.protx_hash not in changed_mns:
+                    mns.append(mn)
+            mns.extend(changed_mns.values())
+            return mns, (tip_height, tip_hash)
+
+    def get_mn_payment_queue(self, masternodes: List[Masternode], block_height: int) -> MasternodePaymentQueue:
+        """
+        Computes the payment queue of the masternode list being in sync with the block of 'block_height'. The
+        masternode objects are not modified: the queue positions are assigned to them by the caller, after the list
+        has been saved to the db cache.
+        """
+
+        queue_keys = []
         for mn in masternodes:
             if mn.status == 'ENABLED':
                 protx = self.protx_by_mn_ident.get(mn.ident)
 
                 if mn.lastpaidblock > 0:
-                    mn.queue_position = mn.lastpaidblock
+                    key = mn.lastpaidblock
                 else:
                     if protx:
-                        mn.queue_position = protx.get('registered_height')
+                        key = protx.get('registered_height')
                     else:
-                        mn.queue_position = None
+                        key = None
 
                 if protx:
                     pose_revived_height = protx.get('pose_revived_height', 0)
                     if pose_revived_height > 0 and pose_revived_height > mn.lastpaidblock:
-                        mn.queue_position = pose_revived_height
+                        key = pose_revived_height
 
-                payment_queue.append(mn)
-            else:
-                mn.queue_position = None
+                # masternodes with unknown queue key go to the end of the queue
+                queue_keys.append((key is None, key or 0, mn))
 
-        payment_queue.sort(key=lambda x: x.queue_position, reverse=False)
-
-        for mn in masternodes:
-            if mn.status == 'ENABLED':
-                mn.queue_position = payment_queue.index(mn)
+        queue_keys.sort(key=lambda x: (x[0], x[1]))
+        return MasternodePaymentQueue([mn.ident for _, _, mn in queue_keys], block_height)
 
     @control_rpc_call
     def get_masternodelist(self, *args, data_max_age=MASTERNODES_CACHE_VALID_SECONDS,
@@ -1057,96 +1380,141 @@ class DashdInterface(WndUtils):
         if self.open():
 
             if len(args) == 1 and args[0] == 'json':
-                last_read_time = app_cache.get_value(f'MasternodesLastReadTime_{self.app_config.dash_network}', 0, int)
-
-                if self.masternodes and data_max_age > 0 and \
-                   int(time.time()) - last_read_time < data_max_age:
-                    return self.masternodes
+                with self.data_lock:
+                    last_read_time = app_cache.get_value(f'MasternodesLastReadTime_{self.app_config.dash_network}',
+                                                         0, int)
+                    if self.masternodes and data_max_age > 0 and \
+                       int(time.time()) - last_read_time < data_max_age:
+                        return self.masternodes
+                    prev_sync_block = self.mn_list_sync_block
+
+                # the network data is read without holding the data lock
+                ret = self.read_masternode_list_diff()
+                full_read_time = None
+                if ret:
+                    mns, sync_block = ret
                 else:
+                    sync_height = self.proxy.getblockcount()
+                    sync_block = (sync_height, self.proxy.getblockhash(sync_height))
                     mns = self.proxy.masternodelist(*args)
                     mns = parse_mns(mns)
-                    self.update_mn_queue_values(mns)
-
-                    # mark already cached masternodes to identify those to delete
-                    for mn in self.masternodes:
-                        mn.marker = False
-
-                    # save masternodes to the db cache
-                    db_modified = False
-                    cur = None
-                    try:
-                        if self.db_intf.db_active:
-                            cur = self.db_intf.get_cursor()
-
-                        for mn in mns:
-                            # check if newly-read masternode already exists in the cache
-                            existing_mn = self.masternodes_by_ident.get(mn.ident)
-                            if not existing_mn:
-                                mn.marker = True
-                                self.masternodes.append(mn)
-                                self.masternodes_by_ident[mn.ident] = mn
-                                self.masternodes_by_ip_port[mn.ip] = mn
-
-                                if self.db_intf.db_active:
-                                    cur.execute(
-                                        "INSERT INTO MASTERNODES(ident, status, payee, last_seen,"
-                                        " active_seconds, last_paid_time, last_paid_block, ip, protx_hash, "
-                                        " registered_height, dmt_active, dmt_create_time, queue_position) "
-                                        "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
-                                        (mn.ident, mn.status, mn.payee, mn.lastseen,
-                                         mn.activeseconds, mn.lastpaidtime, mn.lastpaidblock, mn.ip, mn.protx_hash,
-                                         mn.registered_height, 1, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                                         mn.queue_position))
-                                    mn.db_id = cur.lastrowid
-                                    db_modified = True
-                            else:
-                                existing_mn.marker = True
-                                existing_mn.modified = False
-                                existing_mn.monitor_changes = True
-                                existing_mn.ident = mn.ident
-                                existing_mn.status = mn.status
-                                existing_mn.payee = mn.payee
-                                existing_mn.lastseen = mn.lastseen
-                                existing_mn.activeseconds = mn.activeseconds
-                                existing_mn.lastpaidtime = mn.lastpaidtime
-                                existing_mn.lastpaidblock = mn.lastpaidblock
-                                existing_mn.ip = mn.ip
-                                existing_mn.protx_hash = mn.protx_hash
-                                existing_mn.registered_height = mn.registered_height
-                                existing_mn.queue_position = mn.queue_position
-
-                                # ... and finally update MN db record
-                                if existing_mn.modified:
-                                    cur.execute(
-                                        "UPDATE MASTERNODES set ident=?, status=?, payee=?, last_seen=?, "
-                                        "active_seconds=?, last_paid_time=?, last_paid_block=?, ip=?, protx_hash=?, "
-                                        "registered_height=?, queue_position=? WHERE id=?",
-                                        (mn.ident, mn.status, mn.payee, mn.lastseen, mn.activeseconds,
-                                         mn.lastpaidtime, mn.lastpaidblock, mn.ip, mn.protx_hash, mn.registered_height,
-                                         existing_mn.queue_position, existing_mn.db_id))
-                                    db_modified = True
-
-                        # remove from the cache masternodes that no longer exist
-                        for mn_index in reversed(range(len(self.masternodes))):
-                            mn = self.masternodes[mn_index]
-
-                            if not mn.marker:
-                                if self.db_intf.db_active:
-                                    cur.execute("UPDATE MASTERNODES set dmt_active=0, dmt_deactivation_time=?"
-                                                "WHERE ID=?",
-                                                (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), mn.db_id))
-                                    db_modified = True
-                                self.masternodes_by_ident.pop(mn.ident,0)
-                                del self.masternodes[mn_index]
-
-                        app_cache.set_value(f'MasternodesLastReadTime_{self.app_config.dash_network}', int(time.time()))
-
-                    finally:
-                        if db_modified:
+                    full_read_time = int(time.time())
+
+                with self.data_lock:
+                    if self.mn_list_sync_block != prev_sync_block:
+                        # the list has been synchronized by another thread in the meantime
+                        return self.masternodes
+
+                    # the db changes are collected and saved first; the cached data (including the masternode
+                    # objects returned by the diff for the unchanged masternodes) is updated only after the commit,
+                    # so that a failed db write doesn't leave the cache out of sync with the db
+                    payment_queue = self.get_mn_payment_queue(mns, sync_block[0])
+                    now_str = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    new_mns = []
+                    mns_to_update = []  # List[Tuple[<cached masternode>, <masternode read>, <queue position>]]
+                    mn_db_updates = []
+                    mn_db_deactivations = []
+                    read_idents = set()
+
+                    def mn_db_values(mn: Masternode, queue_position: Optional[int]) -> Tuple:
+                        return (mn.ident, mn.status, mn.payee, mn.lastseen, mn.activeseconds, mn.lastpaidtime,
+                                mn.lastpaidblock, mn.ip, mn.protx_hash, mn.registered_height, queue_position)
+
+                    for mn in mns:
+                        read_idents.add(mn.ident)
+                        queue_position = payment_queue.get_position(mn.ident)
+                        # check if newly-read masternode already exists in the cache
+                        existing_mn = self.masternodes_by_ident.get(mn.ident)
+                        if not existing_mn:
+                            # the object isn't cached yet, so it can be modified here
+                            mn.queue_position = queue_position
+                            new_mns.append(mn)
+                        else:
+                            values = mn_db_values(mn, queue_position)
+                            if values != mn_db_values(existing_mn, existing_mn.queue_position):
+                                mns_to_update.append((existing_mn, mn, queue_position))
+                                if existing_mn.db_id is not None:
+                                    mn_db_updates.append(values + (existing_mn.db_id,))
+
+                    # masternodes that no longer exist
+                    mns_to_remove = [mn for mn in self.masternodes if mn.ident not in read_idents]
+                    for mn in mns_to_remove:
+                        if mn.db_id is not None:
+                            mn_db_deactivations.append((now_str, mn.db_id))
+
+                    db_id_by_ident = {}
+                    if self.db_intf.db_active and (new_mns or mn_db_updates or mn_db_deactivations):
+                        cur = self.db_intf.get_cursor()
+                        try:
+                            if new_mns:
+                                cur.executemany(
+                                    "INSERT INTO MASTERNODES(ident, status, payee, last_seen,"
+                                    " active_seconds, last_paid_time, last_paid_block, ip, protx_hash, "
+                                    " registered_height, dmt_active, dmt_create_time, queue_position) "
+                                    "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                                    [(mn.ident, mn.status, mn.payee, mn.lastseen,
+                                      mn.activeseconds, mn.lastpaidtime, mn.lastpaidblock, mn.ip, mn.protx_hash,
+                                      mn.registered_height, 1, now_str, mn.queue_position) for mn in new_mns])
+
+                                # read db ids of the inserted records
+                                cur.execute("CREATE TEMPORARY TABLE IF NOT EXISTS temp_mn_idents(ident TEXT PRIMARY KEY)")
+                                cur.execute("DELETE FROM temp_mn_idents")
+                                cur.executemany("INSERT OR IGNORE INTO temp_mn_idents(ident) VALUES (?)",
+                                                [(mn.ident,) for mn in new_mns])
+                                cur.execute("SELECT m.ident, m.id FROM MASTERNODES m JOIN temp_mn_idents t "
+                                            "ON t.ident=m.ident WHERE m.dmt_active=1")
+                                for ident, db_id in cur.fetchall():
+                                    db_id_by_ident[ident] = db_id
+
+                            if mn_db_updates:
+                                cur.executemany(
+                                    "UPDATE MASTERNODES set ident=?, status=?, payee=?, last_seen=?, "
+                                    "active_seconds=?, last_paid_time=?, last_paid_block=?, ip=?, protx_hash=?, "
+                                    "registered_height=?, queue_position=? WHERE id=?", mn_db_updates)
+
+                            if mn_db_deactivations:
+                                cur.executemany("UPDATE MASTERNODES set dmt_active=0, dmt_deactivation_time=? "
+                                                "WHERE ID=?", mn_db_deactivations)
                             self.db_intf.commit()
-                        if cur is not None:
+                        except Exception:
+                            self.db_intf.rollback()
+                            raise
+                        finally:
                             self.db_intf.release_cursor()
 
+                    # the db changes have been saved, now update the cache
+                    for mn in new_mns:
+                        mn.db_id = db_id_by_ident.get(mn.ident)
+                    for existing_mn, mn, queue_position in mns_to_update:
+                        existing_mn.status = mn.status
+                        existing_mn.payee = mn.payee
+                        existing_mn.lastseen = mn.lastseen
+                        existing_mn.activeseconds = mn.activeseconds
+                        existing_mn.lastpaidtime = mn.lastpaidtime
+                        existing_mn.lastpaidblock = mn.lastpaidblock
+                        existing_mn.ip = mn.ip
+                        existing_mn.protx_hash = mn.protx_hash
+                        existing_mn.registered_height = mn.registered_height
+                        existing_mn.queue_position = queue_position
+
+                    # the list and the dicts are replaced (not modified), so the lists returned by the previous
+                    # calls can still be iterated by other threads
+                    removed_idents = set(mn.ident for mn in mns_to_remove)
+                    masternodes = [mn for mn in self.masternodes if mn.ident not in removed_idents]
+                    masternodes.extend(new_mns)
+                    self.masternodes = masternodes
+                    self.masternodes_by_ident = {mn.ident: mn for mn in masternodes}
+                    self.masternodes_by_ip_port = {mn.ip: mn for mn in masternodes}
+                    self.payment_queue = payment_queue
+
+                    if full_read_time is not None:
+                        self.mn_list_full_read_time = full_read_time
+                    app_cache.set_value(f'MasternodesLastReadTime_{self.app_config.dash_network}', int(time.time()))
+                    self.mn_list_sync_block = sync_block
+                    app_cache.set_value(f'MasternodesSyncBlock_{self.app_config.dash_network}', list(sync_block))
+                    app_cache.set_value(f'MasternodesFullReadTime_{self.app_config.dash_network}',
+                                        self.mn_list_full_read_time)
+
                     return self.masternodes
             else:
                 mns = self.proxy.masternodelist(*args)
@@ -1180,13 +1548,14 @@ class DashdInterface(WndUtils):
         if self.open():
             cur_mempool_txes = self.proxy.getrawmempool()
 
-            txes_to_purge = []
-            for tx_hash in self.mempool_txes:
-                if tx_hash not in cur_mempool_txes:
-                    txes_to_purge.append(tx_hash)
+            with self.data_lock:
+                txes_to_purge = []
+                for tx_hash in self.mempool_txes:
+                    if tx_hash not in cur_mempool_txes:
+                        txes_to_purge.append(tx_hash)
 
-            for tx_hash in txes_to_purge:
-                del self.mempool_txes[tx_hash]
+                for tx_hash in txes_to_purge:
+                    del self.mempool_txes[tx_hash]
 
             return cur_mempool_txes
         else:
@@ -1194,18 +1563,16 @@ class DashdInterface(WndUtils):
 
     @control_rpc_call
     def getrawtransaction(self, txid, verbose, skip_cache=False):
-
-        def check_if_tx_confirmed(tx_json):
-            # cached transaction will not be accepted if the transaction stored in cache file was not confirmed
-            if tx_json.get('confirmations'):
-                return True
-            return False
-
         if self.open():
-            tx_json = json_cache_wrapper(self.proxy.getrawtransaction, self, 'tx-' + str(verbose) + '-' + txid,
-                                         skip_cache=skip_cache, accept_cache_data_fun=check_if_tx_confirmed)\
-                (txid, verbose)
-
+            tx_cache = self.app_config.tx_cache_db
+            if not skip_cache:
+                # transactions are cached only if confirmed, so the data read from cache needs no further checks
+                tx_json = tx_cache.get_tx(txid, verbose)
+                if tx_json is not None:
+                    return tx_json
+
+            tx_json = self.proxy.getrawtransaction(txid, verbose)
+            tx_cache.save_tx(txid, verbose, tx_json)
             return tx_json
         else:
             raise Exception('Not connected')
@@ -1213,16 +1580,24 @@ class DashdInterface(WndUtils):
     @control_rpc_call
     def getblockhash(self, blockid, skip_cache=False):
         if self.open():
-            return json_cache_wrapper(self.proxy.getblockhash, self, 'blockhash-' + str(blockid),
-                                      skip_cache=skip_cache)(blockid)
+            tx_cache = self.app_config.tx_cache_db
+            bhash = None if skip_cache else tx_cache.get_block_hash(blockid)
+            if bhash is None:
+                bhash = self.proxy.getblockhash(blockid)
+                tx_cache.save_block_hashes([(blockid, bhash)])
+            return bhash
         else:
             raise Exception('Not connected')
 
     @control_rpc_call
     def getblockheader(self, blockhash, skip_cache=False):
         if self.open():
-            return json_cache_wrapper(self.proxy.getblockheader, self, 'blockheader-' + str(blockhash),
-                                      skip_cache=skip_cache)(blockhash)
+            tx_cache = self.app_config.tx_cache_db
+            header = None if skip_cache else tx_cache.get_block_header(blockhash)
+            if header is None:
+                header = self.proxy.getblockheader(blockhash)
+                tx_cache.save_block_headers([(blockhash, header)])
+            return header
         else:
             raise Exception('Not connected')
 
@@ -1304,6 +1679,7 @@ class DashdInterface(WndUtils):
         else:
             raise Exception('Not connected')
 
+    @control_rpc_call
     def protx(self, *args):
         if self.open():
             return self.proxy.protx(*args)
@@ -1331,6 +1707,103 @@ class DashdInterface(WndUtils):
         else:
             raise Exception('Not connected')
 
+    def rpc_call_batch(self, encrypt_rpc_arguments: bool, allow_switching_conns: bool,
+                       calls: List[Tuple]) -> List[Any]:
+        """
+        Executes a list of RPC calls using JSON-RPC batch requests, so that (up to RPC_BATCH_MAX_CALLS) calls take
+        a single network round trip.
+        :param calls: list of tuples: (command, arg1, arg2, ...)
+        :return: list of results in the order of the calls; a call that failed on the node side is represented by
+            a JSONRPCException object (the caller should check it with isinstance), connection errors are raised
+            as in the case of the rpc_call method
+        """
+        def call_batch(self, calls_chunk):
+            if encrypt_rpc_arguments:
+                calls_chunk = [(c[0],) + self.encrypt_rpc_args(c[0], tuple(c[1:])) for c in calls_chunk]
+            return self.get_thread_rpc_connection().batch(calls_chunk)
+
+        ret = []
+        if calls:
+            if self.open():
+                fun = control_rpc_call(call_batch, allow_switching_conns=allow_switching_conns)
+                for idx in range(0, len(calls), RPC_BATCH_MAX_CALLS):
+                    ret.extend(fun(self, calls[idx: idx + RPC_BATCH_MAX_CALLS]))
+            else:
+                raise Exception('Not connected')
+        return ret
+
+    def getrawtransactions(self, txids: List[str], verbose, skip_cache=False) -> Dict[str, Union[Dict, Exception]]:
+        """
+        Batch version of getrawtransaction: transactions not found in the cache are fetched from the network
+        using JSON-RPC batch requests.
+        :return: dict txid -> transaction data or a JSONRPCException object if the call for the txid failed
+        """
+        tx_cache = self.app_config.tx_cache_db
+        txids = list(dict.fromkeys(txids))
+        ret = {} if skip_cache else tx_cache.get_txs(txids, verbose)
+        txids_to_fetch = [txid for txid in txids if txid not in ret]
+
+        if txids_to_fetch:
+            results = self.rpc_call_batch(False, True, [('getrawtransaction', txid, verbose)
+                                                        for txid in txids_to_fetch])
+            to_save = []
+            for txid, tx_json in zip(txids_to_fetch, results):
+                ret[txid] = tx_json
+                if not isinstance(tx_json, Exception):
+                    to_save.append((txid, tx_json))
+            tx_cache.save_txs(to_save, verbose)
+        return ret
+
+    def getblockheaders_by_height(self, block_heights: List[int], skip_cache=False) -> \
+            Dict[int, Union[Dict, Exception]]:
+        """
+        Returns block headers for a list of block heights, resolving block hashes and headers missing in the cache
+        with two JSON-RPC batch requests.
+        :return: dict block height -> block header or a JSONRPCException object if a call for the block failed
+        """
+        tx_cache = self.app_config.tx_cache_db
+        ret = {}
+        hash_by_height = {}
+        heights_to_fetch = []
+        for height in block_heights:
+            if height in hash_by_height or height in heights_to_fetch:
+                continue
+            bhash = None if skip_cache else tx_cache.get_block_hash(height)
+            if bhash is not None:
+                hash_by_height[height] = bhash
+            else:
+                heights_to_fetch.append(height)
+
+        if heights_to_fetch:
+            results = self.rpc_call_batch(False, True, [('getblockhash', height) for height in heights_to_fetch])
+            to_save = []
+            for height, bhash in zip(heights_to_fetch, results):
+                if isinstance(bhash, Exception):
+                    ret[height] = bhash
+                else:
+                    hash_by_height[height] = bhash
+                    to_save.append((height, bhash))
+            tx_cache.save_block_hashes(to_save)
+
+        headers_to_fetch = []
+        for height, bhash in hash_by_height.items():
+            header = None if skip_cache else tx_cache.get_block_header(bhash)
+            if header is not None:
+                ret[height] = header
+            else:
+                headers_to_fetch.append(height)
+
+        if headers_to_fetch:
+            results = self.rpc_call_batch(False, True, [('getblockheader', hash_by_height[height])
+                                                        for height in headers_to_fetch])
+            to_save = []
+            for height, header in zip(headers_to_fetch, results):
+                ret[height] = header
+                if not isinstance(header, Exception):
+                    to_save.append((hash_by_height[height], header))
+            tx_cache.save_block_headers(to_save)
+        return ret
+
     @control_rpc_call
     def listaddressbalances(self, minfee):
         if self.open():
@@ -1363,10 +1836,12 @@ class DashdInterface(WndUtils):
             cur_mempool_txes = self.getrawmempool()
             if len(cur_mempool_txes) < 200:
                 for tx_hash in cur_mempool_txes:
-                    tx = self.mempool_txes.get(tx_hash)
+                    with self.data_lock:
+                        tx = self.mempool_txes.get(tx_hash)
                     if not tx:
                         tx = self.getrawtransaction(tx_hash, True, skip_cache=True)
-                        self.mempool_txes[tx_hash] = tx
+                        with self.data_lock:
+                            self.mempool_txes[tx_hash] = tx
                     protx = tx.get('proUpRegTx')
                     if not protx:
                         protx = tx.get('proUpRevTx')
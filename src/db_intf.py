@@ -3,17 +3,38 @@
 # Author: Bertrand256
 # Created on: 2017-10
 import os
-
+import pathlib
 import sqlite3
 import logging
 import threading
-from typing import List
+from typing import List, Optional, Tuple
 import thread_utils
 
 
 log = logging.getLogger('dmt.db_intf')
 
 
+class ReadSessionContext(threading.local):
+    """ Per-thread state of read-only database sessions. """
+
+    def __init__(self):
+        self.conn: Optional[sqlite3.Connection] = None
+        self.generation = 0
+        self.depth = 0
+
+
+# pragmas applied to each database connection: WAL journaling lets readers work concurrently with a writer
+DB_CONN_PRAGMAS = [
+    'pragma journal_mode=WAL',
+    'pragma labels.journal_mode=WAL',
+    'pragma synchronous=NORMAL',
+    'pragma cache_size=-16000',  # 16 MB
+    'pragma mmap_size=67108864',  # 64 MB
+    'pragma temp_store=MEMORY'
+]
+DB_CONN_CACHED_STATEMENTS = 256
+
+
 class DBCache(object):
     """Purpose: coordinating access to a database cache (sqlite) from multiple threads.
 
@@ -23,19 +44,38 @@ class DBCache(object):
         1. get_cursor call locks the cache database to be used by the calling thread only
         2. subsequent get_cursor calls by the same thread require the same number of release_cursor calls;
            this is useful if you need multiple cursors to perform the required operations in one thread
+        3. the database connection is kept open between sessions (so prepared statements can be reused);
+           changes not committed when the last cursor is released are rolled back
     """
 
     def __init__(self):
         self.db_cache_file_name = ''
         self.db_labels_file_name = ''
         self.db_active = False
-        self.lock = thread_utils.EnhRLock(stackinfo_skip_lines=1)
+        self.lock = thread_utils.EnhRLock(stackinfo_skip_lines=1, name='db_cache')
         self.depth = 0
         self.db_conn = None
+        self.read_ctx = ReadSessionContext()
+        self.read_conns_lock = threading.Lock()
+        # read-only connections of all threads, along with the threads owning them
+        self.read_conns: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self.read_conns_generation = 1  # incremented when the read-only connections are closed
 
     def is_active(self):
         return self.db_active
 
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_cache_file_name, check_same_thread=False,
+                               cached_statements=DB_CONN_CACHED_STATEMENTS)
+        try:
+            conn.execute(f"attach database '{self.db_labels_file_name}' as labels")
+            for pragma in DB_CONN_PRAGMAS:
+                conn.execute(pragma)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
     def open(self, db_cache_file_name):
         if not db_cache_file_name:
             raise Exception('Invalid database cache file name value.')
@@ -48,15 +88,10 @@ class DBCache(object):
             self.lock.acquire()
             try:
                 if self.db_conn is None:
-                    self.db_conn = sqlite3.connect(self.db_cache_file_name)
-                    db_conn2 = sqlite3.connect(self.db_labels_file_name)
-                    db_conn2.close()
-                    self.db_conn.execute(f"attach database '{self.db_labels_file_name}' as labels")
+                    self.db_conn = self._connect()
 
                 self.create_structures()
                 self.db_active = True
-                self.db_conn.close()
-                self.db_conn = None
                 self.depth = 0
 
             except Exception as e:
@@ -68,9 +103,19 @@ class DBCache(object):
             raise Exception('Database cache already active.')
 
     def close(self):
-        if self.depth > 0:
-            log.error('Database not closed yet. Depth: ' + str(self.depth))
-        self.db_active = False
+        with self.lock:
+            if self.depth > 0:
+                log.error('Database not closed yet. Depth: ' + str(self.depth))
+            self.db_active = False
+            if self.db_conn is not None and self.depth == 0:
+                self.db_conn.close()
+                self.db_conn = None
+        with self.read_conns_lock:
+            # read-only connections are opened for a specific file; they will be recreated after reopening
+            for _, conn in self.read_conns:
+                self._close_read_conn(conn)
+            self.read_conns.clear()
+            self.read_conns_generation += 1
 
     def get_cursor(self):
         if self.db_active:
@@ -78,8 +123,12 @@ class DBCache(object):
             self.lock.acquire()
             self.depth += 1
             if self.db_conn is None:
-                self.db_conn = sqlite3.connect(self.db_cache_file_name)
-                self.db_conn.execute(f"attach database '{self.db_labels_file_name}' as labels")
+                try:
+                    self.db_conn = self._connect()
+                except Exception:
+                    self.depth -= 1
+                    self.lock.release()
+                    raise
             log.debug('Acquired db cache session (%d)' % self.depth)
             return self.db_conn.cursor()
         else:
@@ -93,9 +142,9 @@ class DBCache(object):
                     raise Exception('Cursor not acquired by this thread.')
                 self.depth -= 1
                 try:
-                    if self.depth == 0:
-                        self.db_conn.close()
-                        self.db_conn = None
+                    if self.depth == 0 and self.db_conn.in_transaction:
+                        # the connection is not closed here anymore, so discard the uncommitted changes explicitly
+                        self.db_conn.rollback()
                 finally:
                     self.lock.release()
                 log.debug('Released db cache session (%d)' % self.depth)
@@ -104,6 +153,95 @@ class DBCache(object):
         else:
             log.warning('Cannot release database session if db_active is False.')
 
+    def _connect_read_only(self) -> sqlite3.Connection:
+        main_uri = pathlib.Path(self.db_cache_file_name).absolute().as_uri() + '?mode=ro'
+        labels_uri = pathlib.Path(self.db_labels_file_name).absolute().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(main_uri, uri=True, check_same_thread=False, isolation_level=None,
+                               cached_statements=DB_CONN_CACHED_STATEMENTS)
+        try:
+            conn.execute("attach database ? as labels", (labels_uri,))
+            conn.execute('pragma temp_store=MEMORY')
+            conn.execute('pragma cache_size=-8000')
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def get_read_cursor(self):
+        """
+        Returns a cursor of the calling thread's read-only connection. All queries executed until the matching
+        release_read_cursor call see the same database snapshot; thanks to WAL journaling they neither wait for nor
+        block the thread currently writing to the database. Only temporary tables can be modified with the cursor.
+        """
+        if not self.db_active:
+            raise Exception('Database cache not active.')
+
+        ctx = self.read_ctx
+        if ctx.conn is not None and ctx.generation != self.read_conns_generation:
+            # the connection has been closed by reopening the database in the meantime
+            ctx.conn = None
+            ctx.depth = 0
+        if ctx.conn is None:
+            with self.read_conns_lock:
+                self._prune_read_conns()
+                ctx.conn = self._connect_read_only()
+                ctx.generation = self.read_conns_generation
+                self.read_conns.append((threading.current_thread(), ctx.conn))
+
+        if ctx.depth == 0:
+            ctx.conn.execute('begin')
+        ctx.depth += 1
+        return ctx.conn.cursor()
+
+    def release_read_cursor(self):
+        ctx = self.read_ctx
+        if ctx.depth == 0 or ctx.conn is None:
+            raise Exception('Read cursor not acquired by this thread.')
+        ctx.depth -= 1
+        if ctx.depth == 0:
+            try:
+                ctx.conn.execute('rollback')
+            except Exception as e:
+                # the connection could have been closed by the close method called from another thread
+                log.warning('Error while finishing read session: ' + str(e))
+                ctx.conn = None
+
+    @staticmethod
+    def _close_read_conn(conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except Exception as e:
+            log.warning('Error while closing read-only connection: ' + str(e))
+
+    def _prune_read_conns(self):
+        """ Closes read-only connections of the threads that have finished. Call with read_conns_lock acquired. """
+        alive = []
+        for thread, conn in self.read_conns:
+            if thread.is_alive():
+                alive.append((thread, conn))
+            else:
+                self._close_read_conn(conn)
+        self.read_conns = alive
+
+    def release_finished_threads_read_conns(self):
+        """ Closes read-only connections of the threads that have finished. """
+        with self.read_conns_lock:
+            self._prune_read_conns()
+
+    def release_thread_read_conn(self):
+        """
+        Closes the read-only connection of the calling thread. To be called by worker threads before they finish
+        (connections of the finished threads are closed anyway, but only when another connection is being created).
+        """
+        ctx = self.read_ctx
+        if ctx.conn is not None:
+            if ctx.depth > 0:
+                raise Exception('Read cursor still acquired by this thread.')
+            with self.read_conns_lock:
+                self.read_conns = [(t, c) for t, c in self.read_conns if c is not ctx.conn]
+            self._close_read_conn(ctx.conn)
+            ctx.conn = None
+
     def commit(self):
         if self.db_active:
             try:
@@ -149,6 +287,16 @@ class DBCache(object):
             if not self.table_columns_exist('masternodes', ['queue_position']):
                 cur.execute("ALTER TABLE masternodes ADD COLUMN queue_position INTEGER")
 
+            cur.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name='IDX_masternodes_IDENT_ACTIVE'")
+            if not cur.fetchone():
+                # one-off removal of duplicated active masternode records (caused by breaking the app while
+                # saving the masternode list); the unique index prevents creating them again
+                cur.execute("DELETE FROM masternodes WHERE dmt_active=1 AND id NOT IN "
+                            "(SELECT min(id) FROM masternodes WHERE dmt_active=1 GROUP BY ident)")
+                cur.execute("CREATE UNIQUE INDEX IDX_masternodes_IDENT_ACTIVE ON masternodes(ident) "
+                            "WHERE dmt_active=1")
+                self.db_conn.commit()
+
             # create structures for proposals:
             cur.execute("CREATE TABLE IF NOT EXISTS proposals(id INTEGER PRIMARY KEY, name TEXT, payment_start TEXT,"
                         " payment_end TEXT, payment_amount REAL, yes_count INTEGER, absolute_yes_count INTEGER,"
@@ -157,7 +305,8 @@ class DBCache(object):
                         " f_cached_valid INTEGER, f_cached_delete INTEGER, f_cached_funding INTEGER, "
                         " f_cached_endorsed INTEGER, object_type INTEGER, is_valid_reason TEXT, dmt_active INTEGER, "
                         " dmt_create_time TEXT, dmt_deactivation_time TEXT, dmt_voting_last_read_time INTEGER,"
-                        " ext_attributes_loaded INTEGER, owner TEXT, title TEXT, ext_attributes_load_time INTEGER)")
+                        " ext_attributes_loaded INTEGER, owner TEXT, title TEXT, ext_attributes_load_time INTEGER,"
+                        " ext_attributes_etag TEXT, ext_attributes_last_modified TEXT)")
 
             cur.execute("CREATE INDEX IF NOT EXISTS IDX_PROPOSALS_HASH ON PROPOSALS(hash)")
 
@@ -168,6 +317,8 @@ class DBCache(object):
             prop_title_exists = False
             ext_attributes_loaded_exists = False
             ext_attributes_load_time_exists = False
+            ext_attributes_etag_exists = False
+            ext_attributes_last_modified_exists = False
             for col in columns:
                 if col[1] == 'owner':
                     prop_owner_exists = True
@@ -177,8 +328,13 @@ class DBCache(object):
                     ext_attributes_loaded_exists = True
                 elif col[1] == 'ext_attributes_load_time':
                     ext_attributes_load_time_exists = True
+                elif col[1] == 'ext_attributes_etag':
+                    ext_attributes_etag_exists = True
+                elif col[1] == 'ext_attributes_last_modified':
+                    ext_attributes_last_modified_exists = True
                 if prop_owner_exists and prop_title_exists and ext_attributes_loaded_exists and \
-                        ext_attributes_load_time_exists:
+                        ext_attributes_load_time_exists and ext_attributes_etag_exists and \
+                        ext_attributes_last_modified_exists:
                     break
 
             if not ext_attributes_loaded_exists:
@@ -194,6 +350,11 @@ class DBCache(object):
             if not ext_attributes_load_time_exists:
                 # proposal's title from an external source like DashCentral.org
                 cur.execute("ALTER TABLE PROPOSALS ADD COLUMN ext_attributes_load_time INTEGER")
+            if not ext_attributes_etag_exists:
+                # validators of the last response of the external source, used to make the next request conditional
+                cur.execute("ALTER TABLE PROPOSALS ADD COLUMN ext_attributes_etag TEXT")
+            if not ext_attributes_last_modified_exists:
+                cur.execute("ALTER TABLE PROPOSALS ADD COLUMN ext_attributes_last_modified TEXT")
 
             cur.execute("CREATE TABLE IF NOT EXISTS VOTING_RESULTS(id INTEGER PRIMARY KEY, proposal_id INTEGER,"
                         " masternode_ident TEXT, voting_time TEXT, voting_result TEXT,"
@@ -210,6 +371,10 @@ class DBCache(object):
 
             cur.execute("CREATE INDEX IF NOT EXISTS IDX_LIVE_CONFIG_SYMBOL ON LIVE_CONFIG(symbol)")
 
+            # timestamps of the superblocks, used for calculating the budget cycles of proposals
+            cur.execute("CREATE TABLE IF NOT EXISTS SUPERBLOCKS(block_height INTEGER PRIMARY KEY, "
+                        "block_timestamp INTEGER NOT NULL)")
+
             cur.execute("CREATE TABLE IF NOT EXISTS hd_tree(id INTEGER PRIMARY KEY, ident TEXT, label TEXT)")
 
             cur.execute("CREATE INDEX IF NOT EXISTS idx_hd_tree_1 ON hd_tree(ident)")
@@ -238,6 +403,11 @@ class DBCache(object):
             cur.execute("CREATE INDEX IF NOT EXISTS tx_1 ON tx(tx_hash)")
             cur.execute("CREATE INDEX IF NOT EXISTS tx_1 ON tx(block_height)")
 
+            if not self.table_columns_exist('tx', ['processed']):
+                # 1: all inputs and outputs of a confirmed transaction have been processed, so the transaction
+                # doesn't have to be fetched again during subsequent scans
+                cur.execute("ALTER TABLE tx ADD COLUMN processed INTEGER DEFAULT 0")
+
             cur.execute("CREATE TABLE IF NOT EXISTS tx_output(id INTEGER PRIMARY KEY, address_id INTEGER, "
                         "address TEXT, tx_id INTEGER NOT NULL, output_index INTEGER NOT NULL, "
                         "satoshis INTEGER NOT NULL, spent_tx_id INTEGER, spent_input_index INTEGER, "
@@ -258,6 +428,50 @@ class DBCache(object):
             cur.execute("CREATE INDEX IF NOT EXISTS tx_input_4 ON tx_input(src_tx_hash)")
             cur.execute("CREATE INDEX IF NOT EXISTS tx_input_5 ON tx_input(src_tx_id)")
 
+            cur.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='tx_output_balance_ins'")
+            if not cur.fetchone():
+                # balances were previously recomputed from the transaction outputs/inputs after each fetch; from
+                # now on they are maintained by triggers, so bring them in line with the cached data once
+                self.recalculate_address_balances(cur)
+                self.create_balance_triggers(cur)
+                self.db_conn.commit()
+
+            # index of the unspent transaction outputs (maintained by triggers) with all the attributes needed
+            # to list the utxos of an account without joining the address and tx tables
+            cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='utxo'")
+            if not cur.fetchone():
+                cur.execute("CREATE TABLE utxo(id INTEGER PRIMARY KEY, account_id INTEGER, "
+                            "address_id INTEGER NOT NULL, tx_id INTEGER NOT NULL, tx_hash TEXT, "
+                            "output_index INTEGER NOT NULL, satoshis INTEGER NOT NULL, block_height INTEGER, "
+                            "block_timestamp INTEGER, coinbase INTEGER)")
+                cur.execute("CREATE INDEX utxo_1 ON utxo(account_id, block_height)")
+                cur.execute("CREATE INDEX utxo_2 ON utxo(address_id, block_height)")
+                cur.execute("CREATE INDEX utxo_3 ON utxo(tx_id)")
+                self.create_utxo_triggers(cur)
+                self.rebuild_utxo_index(cur)
+                self.db_conn.commit()
+
+            # transaction history entries of the cached addresses (maintained by triggers): one record for each
+            # output received (direction: 1) and for each input spent (direction: -1) by the addresses;
+            # output_id is -1 for the inputs, so all the inputs of a transaction form one (outgoing) history entry
+            cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='tx_summary'")
+            if not cur.fetchone():
+                cur.execute("CREATE TABLE tx_summary(id INTEGER PRIMARY KEY, direction INTEGER NOT NULL, "
+                            "tx_id INTEGER NOT NULL, output_id INTEGER NOT NULL, input_id INTEGER, "
+                            "account_id INTEGER, address_id INTEGER NOT NULL, satoshis INTEGER NOT NULL, "
+                            "block_height INTEGER, block_timestamp INTEGER, coinbase INTEGER)")
+                cur.execute("CREATE INDEX tx_summary_1 ON tx_summary(account_id, block_height, tx_id, direction, "
+                            "output_id)")
+                cur.execute("CREATE INDEX tx_summary_2 ON tx_summary(address_id, block_height, tx_id, direction, "
+                            "output_id)")
+                cur.execute("CREATE INDEX tx_summary_3 ON tx_summary(block_height, tx_id, direction, output_id)")
+                cur.execute("CREATE INDEX tx_summary_4 ON tx_summary(tx_id)")
+                cur.execute("CREATE INDEX tx_summary_5 ON tx_summary(output_id)")
+                cur.execute("CREATE INDEX tx_summary_6 ON tx_summary(input_id)")
+                self.create_tx_summary_triggers(cur)
+                self.rebuild_tx_summary(cur)
+                self.db_conn.commit()
+
             cur.execute('create table if not exists labels.address_label(id INTEGER PRIMARY KEY, key TEXT, label TEXT, '
                         'timestamp INTEGER)')
             cur.execute('create index if not exists labels.address_label_1 on address_label(key)')
@@ -270,6 +484,175 @@ class DBCache(object):
             log.exception('Exception while initializing database.')
             raise
 
+    @staticmethod
+    def create_balance_triggers(cur):
+        """
+        The 'balance' and 'received' fields of the address table are maintained incrementally: the outputs/inputs
+        of a leaf address (xpub_hash is null) change its values by their amounts and changes of leaf addresses
+        are propagated to their bip44 account (grandparent) record.
+        """
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_output_balance_ins AFTER INSERT ON tx_output "
+                    "WHEN new.address_id IS NOT NULL BEGIN "
+                    "update address set received=received+new.satoshis, balance=balance+new.satoshis "
+                    "where id=new.address_id; END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_output_balance_del AFTER DELETE ON tx_output "
+                    "WHEN old.address_id IS NOT NULL BEGIN "
+                    "update address set received=received-old.satoshis, balance=balance-old.satoshis "
+                    "where id=old.address_id; END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_output_balance_upd AFTER UPDATE OF address_id, satoshis "
+                    "ON tx_output WHEN old.address_id IS NOT new.address_id OR old.satoshis<>new.satoshis BEGIN "
+                    "update address set received=received-old.satoshis, balance=balance-old.satoshis "
+                    "where id=old.address_id; "
+                    "update address set received=received+new.satoshis, balance=balance+new.satoshis "
+                    "where id=new.address_id; END")
+
+        # tx_input.satoshis values are negative
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_input_balance_ins AFTER INSERT ON tx_input "
+                    "WHEN new.src_address_id IS NOT NULL BEGIN "
+                    "update address set balance=balance+ifnull(new.satoshis,0) where id=new.src_address_id; END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_input_balance_del AFTER DELETE ON tx_input "
+                    "WHEN old.src_address_id IS NOT NULL BEGIN "
+                    "update address set balance=balance-ifnull(old.satoshis,0) where id=old.src_address_id; END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_input_balance_upd AFTER UPDATE OF src_address_id, satoshis "
+                    "ON tx_input WHEN old.src_address_id IS NOT new.src_address_id OR "
+                    "ifnull(old.satoshis,0)<>ifnull(new.satoshis,0) BEGIN "
+                    "update address set balance=balance-ifnull(old.satoshis,0) where id=old.src_address_id; "
+                    "update address set balance=balance+ifnull(new.satoshis,0) where id=new.src_address_id; END")
+
+        # propagation of the leaf address balances to the account level
+        cur.execute("CREATE TRIGGER IF NOT EXISTS address_balance_upd AFTER UPDATE OF balance, received ON address "
+                    "WHEN new.xpub_hash IS NULL AND new.parent_id IS NOT NULL AND "
+                    "(old.balance<>new.balance OR old.received<>new.received) BEGIN "
+                    "update address set balance=balance+(new.balance-old.balance), "
+                    "received=received+(new.received-old.received) "
+                    "where id=(select parent_id from address where id=new.parent_id); END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS address_balance_parent_upd AFTER UPDATE OF parent_id ON address "
+                    "WHEN new.xpub_hash IS NULL AND old.parent_id IS NOT new.parent_id BEGIN "
+                    "update address set balance=balance-old.balance, received=received-old.received "
+                    "where id=(select parent_id from address where id=old.parent_id); "
+                    "update address set balance=balance+new.balance, received=received+new.received "
+                    "where id=(select parent_id from address where id=new.parent_id); END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS address_balance_del AFTER DELETE ON address "
+                    "WHEN old.xpub_hash IS NULL AND old.parent_id IS NOT NULL BEGIN "
+                    "update address set balance=balance-old.balance, received=received-old.received "
+                    "where id=(select parent_id from address where id=old.parent_id); END")
+
+    @staticmethod
+    def create_utxo_triggers(cur):
+        """
+        Keeps the utxo table in sync with the unspent outputs of the tx_output table (only outputs assigned to the
+        cached addresses are indexed); utxo.id is equal to the id of the related tx_output record.
+        """
+        # inserts the tx_output record identified by 'id' into the utxo table if it's unspent
+        utxo_insert_sql = \
+            "insert or replace into utxo(id, account_id, address_id, tx_id, tx_hash, output_index, satoshis, " \
+            "block_height, block_timestamp, coinbase) " \
+            "select o.id, ca.parent_id, o.address_id, o.tx_id, tx.tx_hash, o.output_index, o.satoshis, " \
+            "tx.block_height, tx.block_timestamp, tx.coinbase from tx_output o join tx on tx.id=o.tx_id " \
+            "left join address a on a.id=o.address_id left join address ca on ca.id=a.parent_id " \
+            "where o.id={id} and o.address_id is not null and (o.spent_tx_id is null or o.spent_input_index is null);"
+
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_output_utxo_ins AFTER INSERT ON tx_output BEGIN " +
+                    utxo_insert_sql.format(id='new.id') + " END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_output_utxo_upd AFTER UPDATE OF address_id, satoshis, "
+                    "spent_tx_id, spent_input_index ON tx_output BEGIN "
+                    "delete from utxo where id=old.id; " + utxo_insert_sql.format(id='new.id') + " END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_output_utxo_del AFTER DELETE ON tx_output BEGIN "
+                    "delete from utxo where id=old.id; END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_utxo_upd AFTER UPDATE OF block_height, block_timestamp ON tx "
+                    "BEGIN update utxo set block_height=new.block_height, block_timestamp=new.block_timestamp "
+                    "where tx_id=new.id; END")
+
+        # an address (or a change-level node) has been assigned to another parent
+        cur.execute("CREATE TRIGGER IF NOT EXISTS address_utxo_upd AFTER UPDATE OF parent_id ON address "
+                    "WHEN old.parent_id IS NOT new.parent_id BEGIN "
+                    "update utxo set account_id=(select ca.parent_id from address a join address ca on "
+                    "ca.id=a.parent_id where a.id=utxo.address_id) "
+                    "where address_id=new.id or address_id in (select id from address where parent_id=new.id); END")
+
+    @staticmethod
+    def rebuild_utxo_index(cur):
+        cur.execute("delete from utxo")
+        cur.execute("insert into utxo(id, account_id, address_id, tx_id, tx_hash, output_index, satoshis, "
+                    "block_height, block_timestamp, coinbase) "
+                    "select o.id, ca.parent_id, o.address_id, o.tx_id, tx.tx_hash, o.output_index, o.satoshis, "
+                    "tx.block_height, tx.block_timestamp, tx.coinbase from tx_output o join tx on tx.id=o.tx_id "
+                    "left join address a on a.id=o.address_id left join address ca on ca.id=a.parent_id "
+                    "where o.address_id is not null and (o.spent_tx_id is null or o.spent_input_index is null)")
+
+    @staticmethod
+    def create_tx_summary_triggers(cur):
+        """
+        Keeps the tx_summary table in sync with the outputs/inputs of the cached addresses.
+        """
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_output_summary_ins AFTER INSERT ON tx_output BEGIN " +
+                    DBCache.tx_summary_outputs_insert_sql('o.id=new.id') + "; END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_output_summary_upd AFTER UPDATE OF address_id, satoshis "
+                    "ON tx_output BEGIN delete from tx_summary where output_id=old.id; " +
+                    DBCache.tx_summary_outputs_insert_sql('o.id=new.id') + "; END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_output_summary_del AFTER DELETE ON tx_output BEGIN "
+                    "delete from tx_summary where output_id=old.id; END")
+
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_input_summary_ins AFTER INSERT ON tx_input BEGIN " +
+                    DBCache.tx_summary_inputs_insert_sql('i.id=new.id') + "; END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_input_summary_upd AFTER UPDATE OF src_address_id, satoshis "
+                    "ON tx_input BEGIN delete from tx_summary where input_id=old.id; " +
+                    DBCache.tx_summary_inputs_insert_sql('i.id=new.id') + "; END")
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_input_summary_del AFTER DELETE ON tx_input BEGIN "
+                    "delete from tx_summary where input_id=old.id; END")
+
+        cur.execute("CREATE TRIGGER IF NOT EXISTS tx_summary_upd AFTER UPDATE OF block_height, block_timestamp ON tx "
+                    "BEGIN update tx_summary set block_height=new.block_height, "
+                    "block_timestamp=new.block_timestamp where tx_id=new.id; END")
+
+        cur.execute("CREATE TRIGGER IF NOT EXISTS address_summary_upd AFTER UPDATE OF parent_id ON address "
+                    "WHEN old.parent_id IS NOT new.parent_id BEGIN "
+                    "update tx_summary set account_id=(select ca.parent_id from address a join address ca on "
+                    "ca.id=a.parent_id where a.id=tx_summary.address_id) "
+                    "where address_id=new.id or address_id in (select id from address where parent_id=new.id); END")
+
+    @staticmethod
+    def tx_summary_outputs_insert_sql(condition: str) -> str:
+        return "insert into tx_summary(direction, tx_id, output_id, input_id, account_id, address_id, satoshis, " \
+               "block_height, block_timestamp, coinbase) " \
+               "select 1, o.tx_id, o.id, null, ca.parent_id, o.address_id, o.satoshis, tx.block_height, " \
+               "tx.block_timestamp, tx.coinbase from tx_output o join tx on tx.id=o.tx_id " \
+               "left join address a on a.id=o.address_id left join address ca on ca.id=a.parent_id " \
+               "where o.address_id is not null and " + condition
+
+    @staticmethod
+    def tx_summary_inputs_insert_sql(condition: str) -> str:
+        return "insert into tx_summary(direction, tx_id, output_id, input_id, account_id, address_id, satoshis, " \
+               "block_height, block_timestamp, coinbase) " \
+               "select -1, i.tx_id, -1, i.id, ca.parent_id, i.src_address_id, ifnull(i.satoshis,0), " \
+               "tx.block_height, tx.block_timestamp, 0 from tx_input i join tx on tx.id=i.tx_id " \
+               "left join address a on a.id=i.src_address_id left join address ca on ca.id=a.parent_id " \
+               "where i.src_address_id is not null and " + condition
+
+    @staticmethod
+    def rebuild_tx_summary(cur):
+        cur.execute("delete from tx_summary")
+        cur.execute(DBCache.tx_summary_outputs_insert_sql('1=1'))
+        cur.execute(DBCache.tx_summary_inputs_insert_sql('1=1'))
+
+    @staticmethod
+    def recalculate_address_balances(cur):
+        """
+        Full recomputation of the address and account balances from the transaction outputs/inputs. Used to
+        initialize the incrementally maintained values and as a consistency-check.
+        """
+        cur.execute("update address set "
+                    "received=(select ifnull(sum(o.satoshis),0) from tx_output o where o.address_id=address.id), "
+                    "balance=(select ifnull(sum(o.satoshis),0) from tx_output o where o.address_id=address.id) + "
+                    "(select ifnull(sum(i.satoshis),0) from tx_input i where i.src_address_id=address.id) "
+                    "where xpub_hash is null")
+        cur.execute("update address set "
+                    "balance=(select ifnull(sum(a.balance),0) from address ca join address a on a.parent_id=ca.id "
+                    "where ca.parent_id=address.id), "
+                    "received=(select ifnull(sum(a.received),0) from address ca join address a on a.parent_id=ca.id "
+                    "where ca.parent_id=address.id) "
+                    "where xpub_hash is not null and parent_id is null")
+
     def table_columns_exist(self, table_name, column_names: List[str]):
         cur = self.db_conn.cursor()
         try:
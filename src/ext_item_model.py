@@ -3,9 +3,9 @@
 # Author: Bertrand256
 # Created on: 2018-07
 import logging
-from PyQt5.QtCore import Qt, pyqtSlot, QSortFilterProxyModel, QAbstractTableModel, QVariant
+from PyQt5.QtCore import Qt, pyqtSlot, QSortFilterProxyModel, QAbstractTableModel, QVariant, QModelIndex
 from PyQt5.QtWidgets import QTableView, QWidget, QAbstractItemView, QTreeView
-from typing import List, Optional, Any, Dict, Generator
+from typing import List, Optional, Any, Dict, Generator, Callable, Tuple
 
 import thread_utils
 from columns_cfg_dlg import ColumnsConfigDlg
@@ -16,6 +16,8 @@ from wnd_utils import WndUtils
 
 log = logging.getLogger('dmt.ext_item_model')
 
+FETCH_PAGE_SIZE = 200
+
 
 class TableModelColumn(AttrsProtected):
     def __init__(self, name, caption, visible, initial_width: int = None, additional_attrs: Optional[List[str]] = None):
@@ -262,6 +264,15 @@ class ExtSortFilterTableModel(ColumnedItemModelMixin, QAbstractTableModel, Attrs
             self.enable_filter_proxy_model(self)
         self.data_lock = thread_utils.EnhRLock()
 
+        # incremental loading of data (canFetchMore/fetchMore): fetch_source is a function returning the page of
+        # at most max_count data items following the item passed in the first argument (None for the first page)
+        self.fetch_source: Optional[Callable[[Any, int], List[Any]]] = None
+        self.fetch_last_item: Any = None
+        self.fetch_page_size = FETCH_PAGE_SIZE
+        # (column name, sort order) corresponding to the order of the items returned by fetch_source; sorting the
+        # view by any other column requires all the items to be loaded
+        self.fetch_sorting: Optional[Tuple[str, int]] = None
+
     def acquire_lock(self):
         self.data_lock.acquire()
 
@@ -291,6 +302,95 @@ class ExtSortFilterTableModel(ColumnedItemModelMixin, QAbstractTableModel, Attrs
         # Reimplement in derived classes. Used by selected_data_items
         pass
 
+    def set_view(self, view: QAbstractItemView):
+        super().set_view(view)
+        if self.proxy_model:
+            self.get_view_horizontal_header().sortIndicatorChanged.connect(self.on_view_sort_indicator_changed)
+
+    def on_view_sort_indicator_changed(self, logical_index, order):
+        if self.fetch_source and not self.is_fetch_sorting_active():
+            self.fetch_all()
+
+    def is_fetch_sorting_active(self) -> bool:
+        """ Returns True if the view is sorted the same way as the items provided by fetch_source. """
+        if self.proxy_model and self.fetch_sorting:
+            col = self.col_by_index(self.proxy_model.sortColumn())
+            if col:
+                return (col.name, self.proxy_model.sortOrder()) == self.fetch_sorting
+            return False
+        return True
+
+    def is_data_item_loaded(self, item: Any) -> bool:
+        # Reimplement in derived classes. Used to skip the fetched items added to the model in the meantime
+        return False
+
+    def append_data_items(self, items: List[Any]):
+        # Reimplement in derived classes: appends the items read from fetch_source to the model's data. The model
+        # signals are emitted by the caller
+        pass
+
+    def set_fetch_source(self, fetch_source: Optional[Callable[[Any, int], List[Any]]]):
+        """
+        Sets the source of the model data and reads its first page (all the data, if the view is sorted differently
+        than the source); the remaining pages are read on demand of the view (fetchMore). Has to be called between
+        beginResetModel and endResetModel.
+        """
+        self.fetch_source = fetch_source
+        self.fetch_last_item = None
+        if fetch_source:
+            while self.fetch_source:
+                self.append_data_items([item for item in self._fetch_page() if not self.is_data_item_loaded(item)])
+                if self.is_fetch_sorting_active():
+                    break
+
+    def _fetch_page(self) -> List[Any]:
+        source = self.fetch_source
+        try:
+            items = source(self.fetch_last_item, self.fetch_page_size)
+        except Exception:
+            self.fetch_source = None
+            raise
+        if self.fetch_source is source:
+            if len(items) < self.fetch_page_size:
+                self.fetch_source = None  # no more data
+            if items:
+                self.fetch_last_item = items[-1]
+        else:
+            items = []  # the data source has been changed in the meantime
+        return items
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self.fetch_source is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.fetch_source:
+            return
+        # the page is read under the model lock as well, so that a data source being replaced by a background
+        # thread in the meantime (set_fetch_source) doesn't add its items to the new data
+        with self:
+            if not self.fetch_source:
+                return
+            try:
+                items = self._fetch_page()
+            except Exception:
+                log.exception('Error while reading data')
+                return
+            items = [item for item in items if not self.is_data_item_loaded(item)]
+            if items:
+                row_count = self.rowCount()
+                self.beginInsertRows(QModelIndex(), row_count, row_count + len(items) - 1)
+                try:
+                    self.append_data_items(items)
+                finally:
+                    self.endInsertRows()
+
+    def fetch_all(self):
+        """ Reads all the remaining pages of data from fetch_source. """
+        while self.fetch_source:
+            self.fetchMore()
+
     def selected_data_items(self) -> Generator[Any, None, None]:
         for row in self.selected_rows():
             d = self.data_by_row_index(row)
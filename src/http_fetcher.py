@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Created on: 2026-10
+import concurrent.futures
+import logging
+import threading
+from typing import Optional, List, Any, Generator, Dict
+import requests
+from requests.adapters import HTTPAdapter
+
+
+log = logging.getLogger('dmt.http_fetcher')
+
+DEFAULT_MAX_REQUESTS = 8  # max number of requests in flight
+DEFAULT_TIMEOUT = 10  # seconds
+DEFAULT_RETRIES = 2
+
+
+class HttpRequest(object):
+    def __init__(self, key: Any, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        :param key: identifies the request (e.g. the object the data is fetched for) in the results
+        :param etag: ETag value of the previous response (sent as If-None-Match)
+        :param last_modified: Last-Modified value of the previous response (sent as If-Modified-Since)
+        """
+        self.key = key
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class HttpResponse(object):
+    def __init__(self, request: HttpRequest):
+        self.request = request
+        self.status_code: Optional[int] = None
+        self.content: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+
+class HttpFetcher(object):
+    """
+    Purpose: fetching a number of resources concurrently, with a bounded number of requests in flight. Connections
+    are kept alive and reused between the requests to the same host and the requests carrying the validators of
+    the previous responses (ETag/Last-Modified) are made conditional, so unchanged resources aren't transferred again.
+    """
+
+    def __init__(self, max_requests: int = DEFAULT_MAX_REQUESTS, timeout: float = DEFAULT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES):
+        self.max_requests = max(max_requests, 1)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.max_requests, max_retries=retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_requests,
+                                                              thread_name_prefix='http_fetch')
+        self.cancel_event = threading.Event()
+
+    def close(self):
+        self.cancel_event.set()
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def _fetch(self, request: HttpRequest) -> HttpResponse:
+        response = HttpResponse(request)
+        if self.cancel_event.is_set():
+            response.error = Exception('Request cancelled')
+            return response
+        headers: Dict[str, str] = {}
+        if request.etag:
+            headers['If-None-Match'] = request.etag
+        if request.last_modified:
+            headers['If-Modified-Since'] = request.last_modified
+        try:
+            r = self.session.get(request.url, headers=headers, timeout=self.timeout)
+            response.status_code = r.status_code
+            if r.status_code == 304:
+                # the resource hasn't changed, so the validators sent in the request stay valid
+                response.etag = r.headers.get('ETag', request.etag)
+                response.last_modified = r.headers.get('Last-Modified', request.last_modified)
+            else:
+                r.raise_for_status()
+                response.content = r.content
+                response.etag = r.headers.get('ETag')
+                response.last_modified = r.headers.get('Last-Modified')
+        except Exception as e:
+            response.error = e
+        return response
+
+    def fetch(self, requests_list: List[HttpRequest]) -> Generator[HttpResponse, None, None]:
+        """
+        Executes the requests concurrently and yields the responses in the order of their completion. Errors are
+        not raised but returned in the 'error' attribute of the response. Closing the generator before its end
+        cancels the requests not yet started.
+        """
+        futures = [self.executor.submit(self._fetch, req) for req in requests_list]
+        try:
+            for fut in concurrent.futures.as_completed(futures):
+                yield fut.result()
+        finally:
+            for fut in futures:
+                fut.cancel()
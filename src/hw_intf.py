@@ -5,6 +5,7 @@
 import hashlib
 import sqlite3
 import threading
+from decimal import Decimal
 from functools import partial
 from typing import Optional, Tuple, List, ByteString, Callable, Dict
 import sys
@@ -306,6 +307,40 @@ def get_hw_firmware_version(hw_session: HwSessionInfo):
         return hw_session.hw_client.getFirmwareVersion().get('version')
 
 
+def prefetch_prev_txes(hw_session: HwSessionInfo, utxos_to_spend: List[UtxoType]) -> Dict[str, Dict]:
+    """
+    Reads (in batches) all previous transactions of the utxos being spent and verifies that the utxo amounts
+    match the outputs of those transactions. Transactions taken from the cache that fail the verification are
+    read once again from the network.
+    :return: dict txid -> transaction data (verbose format of getrawtransaction)
+    """
+    def verify(txs: Dict[str, Dict]) -> List[str]:
+        """ Returns list of txids not passing the verification. """
+        invalid = []
+        for utxo in utxos_to_spend:
+            tx = txs.get(utxo.txid)
+            if isinstance(tx, Exception):
+                raise tx
+            outputs = tx.get('vout', []) if tx else []
+            if utxo.output_index < 0 or utxo.output_index >= len(outputs) or \
+               round(Decimal(str(outputs[utxo.output_index].get('value'))) * 100000000) != utxo.satoshis:
+                if utxo.txid not in invalid:
+                    invalid.append(utxo.txid)
+        return invalid
+
+    txids = list(dict.fromkeys([utxo.txid for utxo in utxos_to_spend]))
+    txs = hw_session.dashd_intf.getrawtransactions(txids, 1)
+    invalid_txids = verify(txs)
+    if invalid_txids:
+        logging.warning('Previous transactions read from cache do not match the utxos, reading them from the network: '
+                    + ', '.join(invalid_txids))
+        txs.update(hw_session.dashd_intf.getrawtransactions(invalid_txids, 1, skip_cache=True))
+        invalid_txids = verify(txs)
+        if invalid_txids:
+            raise Exception('Utxo data does not match the previous transaction(s): ' + ', '.join(invalid_txids))
+    return txs
+
+
 @control_hw_call
 def sign_tx(hw_session: HwSessionInfo, utxos_to_spend: List[UtxoType],
             tx_outputs: List[TxOutputType], tx_fee):
@@ -316,28 +351,30 @@ def sign_tx(hw_session: HwSessionInfo, utxos_to_spend: List[UtxoType],
     :param tx_outputs: destination addresses. Fields: 0: dest Dash address. 1: the output value in satoshis,
         2: the bip32 path of the address if the output is the change address or None otherwise
     :param tx_fee: transaction fee
-    :param rawtransactions: dict mapping txid to rawtransaction
     :return: tuple (serialized tx, total transaction amount in satoshis)
     """
     def sign(ctrl):
         ctrl.dlg_config_fun(dlg_title="Confirm transaction signing.", show_progress_bar=False)
+        ctrl.display_msg_fun('<b>Reading previous transactions...</b>')
+        prev_txes = prefetch_prev_txes(hw_session, utxos_to_spend)
+
         ctrl.display_msg_fun('<b>Click the confirmation button on your hardware wallet<br>'
                              'and wait for the transaction to be signed...</b>')
 
         if hw_session.app_config.hw_type == HWType.trezor:
             import hw_intf_trezor as trezor
 
-            return trezor.sign_tx(hw_session, utxos_to_spend, tx_outputs, tx_fee)
+            return trezor.sign_tx(hw_session, utxos_to_spend, tx_outputs, tx_fee, prev_txes)
 
         elif hw_session.app_config.hw_type == HWType.keepkey:
             import hw_intf_keepkey as keepkey
 
-            return keepkey.sign_tx(hw_session, utxos_to_spend, tx_outputs, tx_fee)
+            return keepkey.sign_tx(hw_session, utxos_to_spend, tx_outputs, tx_fee, prev_txes)
 
         elif hw_session.app_config.hw_type == HWType.ledger_nano_s:
             import hw_intf_ledgernano as ledger
 
-            return ledger.sign_tx(hw_session, utxos_to_spend, tx_outputs, tx_fee)
+            return ledger.sign_tx(hw_session, utxos_to_spend, tx_outputs, tx_fee, prev_txes)
 
         else:
             logging.error('Invalid HW type: ' + str(hw_session.app_config.hw_type))
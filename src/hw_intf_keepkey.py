@@ -214,15 +214,21 @@ def connect_keepkey(passphrase_encoding: Optional[str] = 'NFC',
 
 class MyTxApiInsight(TxApiInsight):
 
-    def __init__(self, network, url, dashd_inf, cache_dir, zcash=None):
+    def __init__(self, network, url, dashd_inf, cache_dir, zcash=None,
+                 prefetched_txes: Optional[Dict[str, Dict]] = None):
         TxApiInsight.__init__(self, network, url, zcash)
         self.dashd_inf = dashd_inf
         self.cache_dir = cache_dir
         self.skip_cache = False
+        self.prefetched_txes = prefetched_txes if prefetched_txes is not None else {}
 
     def fetch_json(self, url, resource, resourceid):
         if resource == 'tx':
             try:
+                if not self.skip_cache:
+                    j = self.prefetched_txes.get(resourceid)
+                    if j:
+                        return j
                 j = self.dashd_inf.getrawtransaction(resourceid, 1, skip_cache=self.skip_cache)
                 return j
             except Exception as e:
@@ -281,13 +287,14 @@ class MyTxApiInsight(TxApiInsight):
 
 
 def sign_tx(hw_session: HwSessionInfo, utxos_to_spend: List[wallet_common.UtxoType],
-            tx_outputs: List[wallet_common.TxOutputType], tx_fee):
+            tx_outputs: List[wallet_common.TxOutputType], tx_fee, prev_txes: Optional[Dict[str, Dict]] = None):
     """
     Creates a signed transaction.
     :param hw_session:
     :param utxos_to_spend: list of utxos to send
     :param tx_outputs: list of transaction outputs
     :param tx_fee: transaction fee
+    :param prev_txes: previous transactions of the utxos already read from the network (txid -> tx data)
     :return: tuple (serialized tx, total transaction amount in satoshis)
     """
 
@@ -296,7 +303,8 @@ def sign_tx(hw_session: HwSessionInfo, utxos_to_spend: List[wallet_common.UtxoTy
         insight_network += '_testnet'
     dash_network = hw_session.app_config.dash_network
 
-    tx_api = MyTxApiInsight(insight_network, '', hw_session.dashd_intf, hw_session.app_config.tx_cache_dir)
+    tx_api = MyTxApiInsight(insight_network, '', hw_session.dashd_intf, hw_session.app_config.tx_cache_dir,
+                            prefetched_txes=prev_txes)
     client = hw_session.hw_client
     client.set_tx_api(tx_api)
     inputs = []
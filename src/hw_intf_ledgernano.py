@@ -4,7 +4,7 @@ from bitcoin import compress, bin_hash160
 from btchip.btchip import *
 from btchip.btchipComm import getDongle
 from btchip.btchipUtils import compress_public_key
-from typing import List
+from typing import List, Optional, Dict
 
 import dash_utils
 from common import CancelException
@@ -340,7 +340,7 @@ def load_device_by_mnemonic(mnemonic_words: str, pin: str, passphrase: str, seco
 
 @process_ledger_exceptions
 def sign_tx(hw_session: HwSessionInfo, utxos_to_spend: List[wallet_common.UtxoType],
-            tx_outputs: List[wallet_common.TxOutputType], tx_fee):
+            tx_outputs: List[wallet_common.TxOutputType], tx_fee, prev_txes: Optional[Dict[str, Dict]] = None):
     client = hw_session.hw_client
     rawtransactions = {}
     decodedtransactions = {}
@@ -373,7 +373,9 @@ def sign_tx(hw_session: HwSessionInfo, utxos_to_spend: List[wallet_common.UtxoTy
     # read previous transactins
     for utxo in utxos_to_spend:
         if utxo.txid not in rawtransactions:
-            tx = hw_session.dashd_intf.getrawtransaction(utxo.txid, 1, skip_cache=False)
+            tx = prev_txes.get(utxo.txid) if prev_txes else None
+            if not tx:
+                tx = hw_session.dashd_intf.getrawtransaction(utxo.txid, 1, skip_cache=False)
             if tx and tx.get('hex'):
                 tx_raw = tx.get('hex')
             else:
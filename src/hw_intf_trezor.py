@@ -332,17 +332,22 @@ def json_to_tx(coin, data):
 
 class MyTxApiInsight(TxApi):
 
-    def __init__(self, network, url, dashd_inf, cache_dir):
+    def __init__(self, network, url, dashd_inf, cache_dir, prefetched_txes: Optional[Dict[str, Dict]] = None):
         TxApi.__init__(self, network)
         self.dashd_inf = dashd_inf
         self.cache_dir = cache_dir
         self.skip_cache = False
+        self.prefetched_txes = prefetched_txes if prefetched_txes is not None else {}
 
     def fetch_json(self, *path, **params):
         if path:
             if len(path) >= 2:
                 if path[0] == 'tx':
                     try:
+                        if not self.skip_cache:
+                            j = self.prefetched_txes.get(path[1])
+                            if j:
+                                return j
                         j = self.dashd_inf.getrawtransaction(path[1], 1, skip_cache=self.skip_cache)
                         return j
                     except Exception as e:
@@ -376,13 +381,14 @@ class MyTxApiInsight(TxApi):
 
 
 def sign_tx(hw_session: HwSessionInfo, utxos_to_spend: List[wallet_common.UtxoType],
-            tx_outputs: List[wallet_common.TxOutputType], tx_fee):
+            tx_outputs: List[wallet_common.TxOutputType], tx_fee, prev_txes: Optional[Dict[str, Dict]] = None):
     """
     Creates a signed transaction.
     :param hw_session:
     :param utxos_to_spend: list of utxos to send
     :param tx_outputs: list of transaction outputs
     :param tx_fee: transaction fee
+    :param prev_txes: previous transactions of the utxos already read from the network (txid -> tx data)
     :return: tuple (serialized tx, total transaction amount in satoshis)
     """
     def load_prev_txes(tx_api, skip_cache: bool = False):
@@ -406,7 +412,7 @@ def sign_tx(hw_session: HwSessionInfo, utxos_to_spend: List[wallet_common.UtxoTy
     coin['bitcore'].clear()
     coin['bitcore'].append(url)
 
-    tx_api = MyTxApiInsight(coin, '', hw_session.dashd_intf, hw_session.app_config.tx_cache_dir)
+    tx_api = MyTxApiInsight(coin, '', hw_session.dashd_intf, hw_session.app_config.tx_cache_dir, prev_txes)
     client = hw_session.hw_client
     inputs = []
     outputs = []
@@ -1238,6 +1238,7 @@ class MainWindow(QMainWindow, WndUtils, ui_main_dlg.Ui_MainWindow):
 
                 finally:
                     if bip44_wallet:
+                        bip44_wallet.close()
                         del bip44_wallet
             else:
                 if file_name:
@@ -1470,7 +1471,6 @@ class MainWindow(QMainWindow, WndUtils, ui_main_dlg.Ui_MainWindow):
             else:
                 mn_info = self.dashd_intf.masternodes_by_ip_port.get(ip_port)
 
-            block_height = self.dashd_intf.getblockcount()
             dmn_tx = self.get_deterministic_tx(masternode)
             if dmn_tx:
                 dmn_tx_state = dmn_tx.get('state')
@@ -1484,9 +1484,9 @@ class MainWindow(QMainWindow, WndUtils, ui_main_dlg.Ui_MainWindow):
             if mn_info:
                 mn_ident = mn_info.ident
                 mn_ip_port = mn_info.ip
-                if mn_info.queue_position is not None:
-                    next_payment_block = block_height + mn_info.queue_position + 1
-                    next_payout_ts = int(time.time()) + (mn_info.queue_position * 2.5 * 60)
+                payment_queue = self.dashd_intf.payment_queue
+                next_payment_block = payment_queue.get_projected_payment_block(mn_ident)
+                next_payout_ts = payment_queue.get_projected_payment_time(mn_ident)
             else:
                 if dmn_tx_state:
                     mn_ident = str(dmn_tx.get('collateralHash')) + '-' + str(dmn_tx.get('collateralIndex'))
@@ -890,10 +890,13 @@ class WdgMasternodeDetails(QWidget, ui_masternode_details.Ui_WdgMasternodeDetail
         bip44_wallet = Bip44Wallet(self.app_config.hw_coin_name, self.main_dlg.hw_session,
                                    self.app_config.db_intf, self.dashd_intf, self.app_config.dash_network)
 
-        utxos = WndUtils.run_thread_dialog(
-            self.get_collateral_tx_address_thread,
-            (bip44_wallet, check_break_scanning, self.edtCollateralAddress.text()),
-            True, force_close_dlg_callback=do_break_scanning)
+        try:
+            utxos = WndUtils.run_thread_dialog(
+                self.get_collateral_tx_address_thread,
+                (bip44_wallet, check_break_scanning, self.edtCollateralAddress.text()),
+                True, force_close_dlg_callback=do_break_scanning)
+        finally:
+            bip44_wallet.close()
 
         if utxos:
             if len(utxos) == 1 and \
@@ -3,18 +3,18 @@
 # Author: Bertrand256
 # Created on: 2017-05
 
+import bisect
 import datetime
 import json
 import logging
 import sys
-from typing import List, Tuple, Optional, Callable, Dict, Any
-from urllib.error import URLError
+from typing import List, Tuple, Optional, Callable, Dict, Any, Generator
 import random
 import re
-import sqlite3
 import threading
 import time
 import codecs
+import concurrent.futures
 from functools import partial
 import bitcoin
 from PyQt5 import QtWidgets, QtGui
@@ -26,8 +26,7 @@ from PyQt5.QtGui import QColor, QPainter, QPen, QBrush, QDesktopServices
 from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QMessageBox, QTableView, QAbstractItemView, QItemDelegate, \
     QStyledItemDelegate
 from math import floor
-import urllib.request
-import ssl
+import requests
 import app_cache
 import app_utils
 import base58
@@ -37,6 +36,7 @@ from app_config import MasternodeConfig, InputKeyType
 from common import AttrsProtected
 from dashd_intf import DashdIndexException, Masternode
 from ext_item_model import ExtSortFilterTableModel, TableModelColumn
+from http_fetcher import HttpFetcher, HttpRequest
 from ui import ui_proposals
 from wnd_utils import WndUtils, CloseDialogException
 
@@ -48,6 +48,25 @@ PROPOSALS_CACHE_VALID_SECONDS = 3600
 # Number of seconds after which voting will be reloaded for active proposals:
 VOTING_RELOAD_TIME = 3600
 
+# Number of proposals for which votes are requested in a single RPC batch request
+VOTES_RPC_BATCH_SIZE = 4
+
+# Max number of the vote batch requests in flight (further limited by the RPC connection pool size)
+VOTES_FETCH_MAX_REQUESTS = 4
+
+# Parameters of the requests for the proposals' external attributes (title, owner)
+EXT_ATTRIBUTES_MAX_REQUESTS = 8
+EXT_ATTRIBUTES_REQUEST_TIMEOUT = 10
+EXT_ATTRIBUTES_REQUEST_RETRIES = 2
+
+# Minimum number of confirmations of a superblock to have its timestamp saved in the db cache
+SUPERBLOCK_TIMESTAMP_MIN_CONFIRMATIONS = 10
+
+# pattern of the vote strings returned by 'gobject getcurrentvotes': v12.2 (CTxIn(COutPoint(hash, index)...) and
+# v12.3+ (hash-index) format of the masternode collateral outpoint
+VOTE_STR_PATTERN = re.compile(r'CTxIn\(COutPoint\(([A-Fa-f0-9]+)\s*,\s*(\d+).+:(\d+):(\w+)|'
+                              r'([A-Fa-f0-9]+)-(\d+):(\d+):(\w+)')
+
 VOTE_CODE_YES = '1'
 VOTE_CODE_NO = '2'
 VOTE_CODE_ABSTAIN = '3'
@@ -149,6 +168,8 @@ class Proposal(AttrsProtected):
         self.vote_columns_by_mn_ident = vote_columns_by_mn_ident
         self.votes_by_masternode_ident = {}  # list of tuples: vote_timestamp, vote_result
         self.ext_attributes_loaded = False
+        self.ext_attributes_etag: Optional[str] = None  # validators of the last response of the external source
+        self.ext_attributes_last_modified: Optional[str] = None
         self.user_masternodes: List[VotingMasternode] = user_masternodes
 
         # voting_status:
@@ -366,6 +387,7 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
 
         self.mn_count = None
         self.block_timestamps: Dict[int, int] = {}
+        self.superblock_timestamps_loaded = False  # whether the timestamps saved in the db cache have been loaded
         self.governanceinfo = {}
         self.budget_cycle_days = 28.8
         self.cur_block_height = 0
@@ -646,8 +668,12 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
                     cur = self.db_intf.get_cursor()
                     try:
                         cur.execute("update PROPOSALS set title=null, owner=null, ext_attributes_loaded=0, "
-                                    "ext_attributes_load_time=0")
+                                    "ext_attributes_load_time=0, ext_attributes_etag=null, "
+                                    "ext_attributes_last_modified=null")
                         self.db_intf.commit()
+                        for prop in self.proposals:
+                            prop.ext_attributes_etag = None
+                            prop.ext_attributes_last_modified = None
                         if self.read_external_attibutes(self.proposals):
                             WndUtils.call_in_main_thread(display_data)
 
@@ -1117,54 +1143,101 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
             self.errorMsg("Couldn't read governance info from the Dash network. "
                       "Some features may not work correctly because of this. Details: " + str(e))
 
-    def get_block_timestamp(self, superblock: int):
-        ts = self.block_timestamps.get(superblock)
+    def load_superblock_timestamps(self):
+        """ Loads the superblock timestamps saved in the db cache. """
+        if not self.superblock_timestamps_loaded:
+            self.superblock_timestamps_loaded = True
+            if self.db_intf.is_active():
+                cur = self.db_intf.get_cursor()
+                try:
+                    cur.execute("SELECT block_height, block_timestamp FROM SUPERBLOCKS")
+                    for height, ts in cur.fetchall():
+                        self.block_timestamps.setdefault(height, ts)
+                finally:
+                    self.db_intf.release_cursor()
+
+    def fetch_block_timestamps(self, heights: List[int]):
+        """
+        Fetches timestamps of the blocks missing in the cache in a single batch. The superblocks' timestamps are
+        saved in the db cache.
+        """
+        self.load_superblock_timestamps()
+        heights = [h for h in heights if h not in self.block_timestamps]
+        if heights:
+            superblocks_fetched = []
+            for height, bh in self.dashd_intf.getblockheaders_by_height(heights).items():
+                if isinstance(bh, Exception):
+                    raise bh
+                self.block_timestamps[height] = bh['time']
+                if self.is_superblock(height) and \
+                   height <= self.cur_block_height - SUPERBLOCK_TIMESTAMP_MIN_CONFIRMATIONS:
+                    superblocks_fetched.append((height, bh['time']))
+
+            if superblocks_fetched and self.db_intf.is_active():
+                cur = self.db_intf.get_cursor()
+                try:
+                    cur.executemany("INSERT OR REPLACE INTO SUPERBLOCKS(block_height, block_timestamp) VALUES(?,?)",
+                                    superblocks_fetched)
+                    self.db_intf.commit()
+                finally:
+                    self.db_intf.release_cursor()
+
+    def is_superblock(self, height: int) -> bool:
+        return bool(self.superblock_cycle and self.last_superblock and height > 0 and
+                    (self.last_superblock - height) % self.superblock_cycle == 0)
+
+    def get_block_timestamp(self, height: int):
+        self.load_superblock_timestamps()
+        ts = self.block_timestamps.get(height)
         if ts is None:
-            bhash = self.dashd_intf.getblockhash(superblock)
-            bh = self.dashd_intf.getblockheader(bhash)
-            ts = bh['time']
-            self.block_timestamps[superblock] = ts
+            self.fetch_block_timestamps([height])
+            ts = self.block_timestamps[height]
         return ts
 
+    def get_superblock_timestamps(self, min_height: int) -> Tuple[List[int], List[int]]:
+        """
+        Returns heights and timestamps (both in ascending order) of the superblocks from the one at min_height up to
+        the last superblock. The timestamps missing in the cache are fetched in a single batch.
+        """
+        heights = list(range(self.last_superblock, max(min_height, 1) - 1, -self.superblock_cycle))
+        heights.reverse()
+        self.fetch_block_timestamps(heights)
+        return heights, [self.block_timestamps[h] for h in heights]
+
+    def find_superblock_before(self, timestamp: int) -> int:
+        """
+        Returns the last superblock mined before the given timestamp, which must be earlier than the timestamp of
+        the last superblock.
+        """
+        cycle_duration = self.superblock_cycle * 2.5 * 60
+        # estimate the number of the superblock cycles back from the average block time; if the estimate turns
+        # out too small (the blocks were mined faster), the range is extended
+        cycles_back = int((self.last_superblock_time - timestamp) / cycle_duration) + 2
+        while True:
+            if self.finishing:
+                raise CloseDialogException
+            min_height = self.last_superblock - cycles_back * self.superblock_cycle
+            heights, timestamps = self.get_superblock_timestamps(min_height)
+            idx = bisect.bisect_left(timestamps, timestamp)
+            if idx > 0:
+                return heights[idx - 1]
+            if min_height <= 0:
+                raise Exception('Could not find the superblock for timestamp %s' % str(timestamp))
+            cycles_back *= 2
+
     def find_prev_superblock(self, timestamp: int):
         if timestamp < self.last_superblock_time:
-            superblock = self.last_superblock
-            while True:
-                prev_sb_ts = self.get_block_timestamp(superblock - self.superblock_cycle)
-                if timestamp > prev_sb_ts:
-                    return superblock - self.superblock_cycle
-                else:
-                    superblock -= self.superblock_cycle
+            return self.find_superblock_before(timestamp)
         else:
-            superblock = self.last_superblock
-            sb_ts = self.last_superblock_time
-            while True:
-                if sb_ts + (self.superblock_cycle * 2.5 * 60) > timestamp:
-                    return superblock
-                else:
-                    superblock += self.superblock_cycle
-                    sb_ts += (self.superblock_cycle * 2.5 * 60)
+            cycles = int((timestamp - self.last_superblock_time) / (self.superblock_cycle * 2.5 * 60))
+            return self.last_superblock + cycles * self.superblock_cycle
 
     def find_next_superblock(self, timestamp: int):
         if timestamp < self.last_superblock_time:
-            superblock = self.last_superblock
-            while True:
-                if self.finishing:
-                    raise CloseDialogException
-                prev_sb_ts = self.get_block_timestamp(superblock - self.superblock_cycle)
-                if timestamp > prev_sb_ts:
-                    return superblock
-                else:
-                    superblock -= self.superblock_cycle
+            return self.find_superblock_before(timestamp) + self.superblock_cycle
         else:
-            superblock = self.last_superblock
-            sb_ts = self.last_superblock_time
-            while True:
-                if sb_ts + (self.superblock_cycle * 2.5 * 60) > timestamp:
-                    return superblock + self.superblock_cycle
-                else:
-                    superblock += self.superblock_cycle
-                    sb_ts += (self.superblock_cycle * 2.5 * 60)
+            cycles = int((timestamp - self.last_superblock_time) / (self.superblock_cycle * 2.5 * 60))
+            return self.last_superblock + (cycles + 1) * self.superblock_cycle
 
     def refresh_filter(self):
         self.propsModel.invalidateFilter()
@@ -1246,7 +1319,7 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
                                 " f_cached_valid, f_cached_delete, f_cached_funding, f_cached_endorsed, object_type,"
                                 " is_valid_reason, dmt_active, dmt_create_time, dmt_deactivation_time, id,"
                                 " dmt_voting_last_read_time, owner, title, ext_attributes_loaded, "
-                                "ext_attributes_load_time "
+                                "ext_attributes_load_time, ext_attributes_etag, ext_attributes_last_modified "
                                 "FROM PROPOSALS where dmt_active=1"
                             )
 
@@ -1299,6 +1372,8 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
                                 prop.set_value('owner', row[26])
                                 prop.set_value('title', row[27])
                                 prop.ext_attributes_loaded = True if row[28] else False
+                                prop.ext_attributes_etag = row[30]
+                                prop.ext_attributes_last_modified = row[31]
 
                                 ext_attributes_load_time = 0 if not row[29] else row[29]
                                 if prop.ext_attributes_loaded:
@@ -1417,66 +1492,63 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
         begin_time = time.time()
         network_duration = 0
         modified_ext_attributes = False
-        ssl._create_default_https_context = ssl._create_unverified_context
-        url_err_retries = 2
 
         try:
             url = self.app_config.dash_central_proposal_api
             if url:
                 exceptions_occurred = False
-                for idx, prop in enumerate(proposals):
-                    if self.finishing:
-                        raise CloseDialogException
-                    self.display_message("Reading proposal external attributes (%d/%d), please wait..." %
-                                         (idx+1, len(proposals)))
-
+                requests_list = []
+                for prop in proposals:
                     prop.modified = False
-                    try:
-                        prop.marker = False
+                    prop.marker = False
+                    requests_list.append(
+                        HttpRequest(prop, url.replace('%HASH%', prop.get_value('hash')),
+                                    prop.ext_attributes_etag, prop.ext_attributes_last_modified))
+
+                network_tm_begin = time.time()
+                with HttpFetcher(EXT_ATTRIBUTES_MAX_REQUESTS, EXT_ATTRIBUTES_REQUEST_TIMEOUT,
+                                 EXT_ATTRIBUTES_REQUEST_RETRIES) as fetcher:
+                    for idx, response in enumerate(fetcher.fetch(requests_list)):
+                        if self.finishing:
+                            raise CloseDialogException
+                        self.display_message("Reading proposal external attributes (%d/%d), please wait..." %
+                                             (idx+1, len(proposals)))
+
+                        prop = response.request.key
                         hash = prop.get_value('hash')
-                        cur_url = url.replace('%HASH%', hash)
-                        network_tm_begin = time.time()
-                        contents = None
-                        for url_try in range(0, url_err_retries+1):
-                            try:
-                                response = urllib.request.urlopen(cur_url, context=ssl._create_unverified_context())
-                                contents = response.read()
-                                break
-                            except URLError:
-                                if url_try >= url_err_retries:
-                                    raise
-                                log.info('URLError, retrying...')
-
-                        network_duration += time.time() - network_tm_begin
-                        if contents is not None:
-                            contents = json.loads(contents.decode('utf-8'))
-                        else:
-                            contents = ''
-                        prop.marker = True  # network operation went OK
-                        p = contents.get('proposal')
-                        if p is not None:
-                            user_name = p.get('owner_username')
-                            if user_name:
-                                prop.set_value('owner', user_name)
-                            title = p.get('title')
-                            if title:
-                                prop.set_value('title', title)
-                        else:
-                            err = contents.get('error_type')
-                            if err is not None:
-                                log.error('Error returned for proposal "' + hash + '": ' + err)
+                        try:
+                            if response.error:
+                                raise response.error
+                            prop.marker = True  # network operation went OK
+                            prop.ext_attributes_etag = response.etag
+                            prop.ext_attributes_last_modified = response.last_modified
+                            if response.not_modified:
+                                continue
+
+                            contents = json.loads(response.content.decode('utf-8'))
+                            p = contents.get('proposal')
+                            if p is not None:
+                                user_name = p.get('owner_username')
+                                if user_name:
+                                    prop.set_value('owner', user_name)
+                                title = p.get('title')
+                                if title:
+                                    prop.set_value('title', title)
                             else:
-                                log.error('Empty "proposal" attribute for proposal: ' + hash)
-                    except CloseDialogException:
-                        raise
+                                err = contents.get('error_type')
+                                if err is not None:
+                                    log.error('Error returned for proposal "' + hash + '": ' + err)
+                                else:
+                                    log.error('Empty "proposal" attribute for proposal: ' + hash)
 
-                    except URLError as e:
-                        exceptions_occurred = True
-                        log.warning(str(e))
+                        except requests.RequestException as e:
+                            exceptions_occurred = True
+                            log.warning(str(e))
 
-                    except Exception as e:
-                        exceptions_occurred = True
-                        log.error(str(e))
+                        except Exception as e:
+                            exceptions_occurred = True
+                            log.error(str(e))
+                network_duration = time.time() - network_tm_begin
 
                 if not self.finishing:
                     cur = self.db_intf.get_cursor()
@@ -1489,17 +1561,19 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
                                 if prop.modified:
                                     cur.execute(
                                         'UPDATE PROPOSALS set owner=?, title=?, ext_attributes_loaded=1, '
-                                        'ext_attributes_load_time=? where id=?',
+                                        'ext_attributes_load_time=?, ext_attributes_etag=?, '
+                                        'ext_attributes_last_modified=? where id=?',
                                         (prop.get_value('owner'), prop.get_value('title'), int(time.time()),
-                                         prop.db_id))
+                                         prop.ext_attributes_etag, prop.ext_attributes_last_modified, prop.db_id))
                                     modified_ext_attributes = True
                                 elif not prop.ext_attributes_loaded:
-                                    # ext attributes loaded but empty; set ext_attributes_loaded to 1 to avoid reading
-                                    # the same information the next time
+                                    # ext attributes loaded but empty or not modified since the last time; set
+                                    # ext_attributes_loaded to 1 to avoid reading the same information the next time
                                     cur.execute(
-                                        'UPDATE PROPOSALS set ext_attributes_loaded=1, ext_attributes_load_time=? '
-                                        'where id=?',
-                                        (int(time.time()), prop.db_id))
+                                        'UPDATE PROPOSALS set ext_attributes_loaded=1, ext_attributes_load_time=?, '
+                                        'ext_attributes_etag=?, ext_attributes_last_modified=? where id=?',
+                                        (int(time.time()), prop.ext_attributes_etag,
+                                         prop.ext_attributes_last_modified, prop.db_id))
                                 prop.ext_attributes_loaded = True
 
                         self.db_intf.commit()
@@ -1562,6 +1636,23 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
             time_diff = time.time() - begin_time
             log.info('Voting data read from database time: %s seconds' % str(time_diff))
 
+    @staticmethod
+    def parse_vote_str(vote_str: str) -> Optional[Tuple[str, int, str]]:
+        """
+        Parses the vote string returned by 'gobject getcurrentvotes'.
+        :return: tuple (masternode ident, voting timestamp, voting result) or None if the string couldn't be parsed
+        """
+        match = VOTE_STR_PATTERN.search(vote_str)
+        if match:
+            groups = match.groups()
+            if groups[0] is None:
+                groups = groups[4:]  # v12.3+ format
+            voting_result = groups[3]
+            if voting_result:
+                voting_result = voting_result.upper()
+            return groups[0] + '-' + groups[1], int(groups[2]), voting_result
+        return None
+
     def read_voting_from_network_thread(self, ctrl, force_reload_all, proposals):
         self.read_voting_from_network(force_reload_all, proposals)
         WndUtils.call_in_main_thread(self.display_budget_summary)
@@ -1607,65 +1698,86 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
                         db_oper_count = 0
                         network_duration = 0.0
 
-                        for row_idx, prop in enumerate(proposals):
+                        def fetch_votes_chunk(chunk: List[Proposal]) -> Tuple[List[Proposal], List[Any]]:
+                            try:
+                                results = self.dashd_intf.rpc_call_batch(
+                                    False, False, [('gobject', 'getcurrentvotes', p.get_value('hash')) for p in chunk])
+                            except Exception as e:
+                                results = [e] * len(chunk)
+                            return chunk, results
+
+                        def fetch_votes() -> Generator[Tuple[Proposal, Any], None, None]:
+                            """
+                            Fetches votes of the proposals concurrently (in chunks of VOTES_RPC_BATCH_SIZE proposals
+                            per batch request, with a limited number of requests in flight) and yields them
+                            as they arrive.
+                            """
+                            nonlocal network_duration
+                            chunks = [proposals[idx: idx + VOTES_RPC_BATCH_SIZE]
+                                      for idx in range(0, len(proposals), VOTES_RPC_BATCH_SIZE)]
+                            chunks.reverse()
+                            max_in_flight = max(min(VOTES_FETCH_MAX_REQUESTS, self.dashd_intf.get_max_rpc_connections()),
+                                                1)
+                            with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight,
+                                                                       thread_name_prefix='votes_fetch') as executor:
+                                pending = set()
+                                try:
+                                    while chunks or pending:
+                                        while chunks and len(pending) < max_in_flight:
+                                            pending.add(executor.submit(fetch_votes_chunk, chunks.pop()))
+                                        tm_begin = time.time()
+                                        done, pending = concurrent.futures.wait(
+                                            pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                                        network_duration += (time.time() - tm_begin)
+                                        for fut in done:
+                                            chunk, results = fut.result()
+                                            for p, res in zip(chunk, results):
+                                                yield p, res
+                                finally:
+                                    for fut in pending:
+                                        fut.cancel()
+
+                        for row_idx, (prop, votes) in enumerate(fetch_votes()):
                             try:
                                 if self.finishing:
                                     raise CloseDialogException
 
                                 self.display_message('Reading voting data %d of %d' % (row_idx+1, len(proposals)))
-                                tm_begin = time.time()
-                                try:
-                                    votes = self.dashd_intf.rpc_call(False, False, 'gobject', 'getcurrentvotes',
-                                                                     prop.get_value('hash'))
-                                except Exception:
-                                    log.exception('Exception occurred while calling getvotes')
+                                if isinstance(votes, Exception):
+                                    log.error('Exception occurred while calling getvotes for proposal %s: %s',
+                                              prop.get_value('hash'), str(votes))
                                     errors += 1
                                     continue
-                                network_duration += (time.time() - tm_begin)
 
-                                for v_key in votes:
+                                # hashes of the proposal's votes existing in the db cache
+                                votes_existing: Dict[str, Tuple[int, str]] = {}
+                                if cur:
+                                    tm_begin = time.time()
+                                    cur.execute("SELECT id, hash, masternode_ident from VOTING_RESULTS "
+                                                "WHERE proposal_id=?", (prop.db_id,))
+                                    for vote_id, vote_hash, masternode_ident in cur.fetchall():
+                                        votes_existing[vote_hash] = (vote_id, masternode_ident)
+                                    db_oper_duration += (time.time() - tm_begin)
+                                    db_oper_count += 1
+
+                                # only votes not having their records in the DB are parsed; if the db cache is not
+                                # active, all the votes are treated as new to have them displayed on the grid
+                                for v_key in votes.keys() - votes_existing.keys():
                                     try:
                                         if self.finishing:
                                             raise CloseDialogException
 
                                         v = votes[v_key]
-                                        match = re.search("CTxIn\(COutPoint\(([A-Fa-f0-9]+)\s*\,\s*(\d+).+\:(\d+)\:(\w+)", v)  # v12.2
-                                        if not match or len(match.groups()) != 4:
-                                            match = re.search("([A-Fa-f0-9]+)\-(\d+)\:(\d+)\:(\w+)", v)  # v12.3
-
-                                        if match and len(match.groups()) == 4:
-                                            mn_ident = match.group(1) + '-' + match.group(2)
-                                            voting_timestamp = int(match.group(3))
+                                        vote_data = self.parse_vote_str(v)
+                                        if vote_data:
+                                            mn_ident, voting_timestamp, voting_result = vote_data
                                             voting_time = datetime.datetime.fromtimestamp(voting_timestamp)
-                                            voting_result = match.group(4)
-                                            if voting_result:
-                                                voting_result = voting_result.upper()
                                             mn = self.masternodes_by_ident.get(mn_ident)
 
                                             if voting_timestamp > cur_vote_max_date:
                                                 cur_vote_max_date = voting_timestamp
 
-                                            # check if vote exists in the database
-                                            if cur:
-                                                tm_begin = time.time()
-                                                cur.execute("SELECT id, proposal_id from VOTING_RESULTS "
-                                                            "WHERE hash=?", (v_key,))
-
-                                                found = False
-                                                for row in cur.fetchall():
-                                                    if row[1] == prop.db_id:
-                                                        found = True
-                                                        break
-
-                                                db_oper_duration += (time.time() - tm_begin)
-                                                db_oper_count += 1
-                                                if not found:
-                                                    votes_added.append((prop, mn, voting_time, voting_result, mn_ident, v_key))
-                                            else:
-                                                # no chance to check whether record exists in the DB, so assume it's not
-                                                # to have it displayed on the grid
-                                                votes_added.append((prop, mn, voting_time, voting_result, mn_ident, v_key))
-
+                                            votes_added.append((prop, mn, voting_time, voting_result, mn_ident, v_key))
                                         else:
                                             log.warning('Proposal %s, parsing unsuccessful for voting: %s' %
                                                             (prop.get_value('hash'), v))
@@ -1679,28 +1791,21 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
 
                                 # remove all votes from the db cache that no longer exist on the network
                                 try:
-                                    tm_begin = time.time()
-                                    votes_to_remove: List[Tuple[int, str]] = []
-                                    cur.execute("SELECT id, hash, masternode_ident from VOTING_RESULTS "
-                                                "WHERE proposal_id=?", (prop.db_id,))
-
-                                    for vote_id, vote_hash, masternode_ident in cur.fetchall():
-                                        if vote_hash not in votes:
-                                            votes_to_remove.append((vote_id, masternode_ident))
-
-                                    for vote_id, masternode_ident in votes_to_remove:
-                                        cur.execute('DELETE from VOTING_RESULTS where id=?', (vote_id,))
-                                        db_oper_count += 1
-                                        mn = self.masternodes_by_ident.get(masternode_ident)
-                                        if mn:
-                                            prop.remove_vote(masternode_ident)
-
+                                    votes_to_remove = [votes_existing[h] for h in votes_existing.keys() - votes.keys()]
                                     if votes_to_remove:
+                                        tm_begin = time.time()
+                                        cur.executemany('DELETE from VOTING_RESULTS where id=?',
+                                                        [(vote_id,) for vote_id, _ in votes_to_remove])
+                                        db_modified = True
+                                        for vote_id, masternode_ident in votes_to_remove:
+                                            mn = self.masternodes_by_ident.get(masternode_ident)
+                                            if mn:
+                                                prop.remove_vote(masternode_ident)
+
                                         log.info('Removed %s old votes from db cache for proposal %s',
                                                  len(votes_to_remove), prop.db_id)
-
-                                    db_oper_duration += (time.time() - tm_begin)
-                                    db_oper_count += 1
+                                        db_oper_duration += (time.time() - tm_begin)
+                                        db_oper_count += 1
                                 except Exception:
                                     log.exception('Couldn\'t remove old votes from db cache')
 
@@ -1716,34 +1821,23 @@ class ProposalsDlg(QDialog, ui_proposals.Ui_ProposalsDlg, wnd_utils.WndUtils):
                                                                                         db_oper_count))
 
                         # save voting results to the database cache
+                        if cur and votes_added:
+                            tm_begin = time.time()
+                            recs = [(prop.db_id, mn_ident, voting_time, voting_result, hash)
+                                    for prop, mn, voting_time, voting_result, mn_ident, hash in votes_added]
+                            # votes that are assigned in the db to another (inactive) instance of the same proposal
+                            # are corrected first; the remaining ones are inserted
+                            cur.executemany("UPDATE VOTING_RESULTS set proposal_id=?, masternode_ident=?,"
+                                            " voting_time=?, voting_result=? WHERE hash=?", recs)
+                            cur.executemany("INSERT OR IGNORE INTO VOTING_RESULTS(proposal_id, masternode_ident,"
+                                            " voting_time, voting_result, hash) VALUES(?,?,?,?,?)", recs)
+                            db_modified = True
+                            db_oper_duration += (time.time() - tm_begin)
+
                         for prop, mn, voting_time, voting_result, mn_ident, hash in votes_added:
                             if self.finishing:
                                 raise CloseDialogException
 
-                            if cur:
-                                tm_begin = time.time()
-                                try:
-                                    cur.execute("INSERT INTO VOTING_RESULTS(proposal_id, masternode_ident,"
-                                                " voting_time, voting_result, hash) VALUES(?,?,?,?,?)",
-                                                (prop.db_id,
-                                                 mn_ident,
-                                                 voting_time,
-                                                 voting_result,
-                                                 hash))
-                                except sqlite3.IntegrityError as e:
-                                    if e.args and e.args[0].find('UNIQUE constraint failed') >= 0:
-                                        # this vote is assigned to the same proposal but inactive one; correct this
-                                        cur.execute("UPDATE VOTING_RESULTS"
-                                            " set proposal_id=?, masternode_ident=?,"
-                                            " voting_time=?, voting_result=? WHERE hash=?",
-                                            (prop.db_id,
-                                             mn_ident,
-                                             voting_time,
-                                             voting_result,
-                                             hash))
-                                db_modified = True
-                                db_oper_duration += (time.time() - tm_begin)
-
                             if mn_ident in self.vote_columns_by_mn_ident:
                                 prop.apply_vote(mn_ident, voting_time, voting_result)
 
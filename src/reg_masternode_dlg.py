@@ -148,6 +148,7 @@ class RegMasternodeDlg(QDialog, ui_reg_masternode_dlg.Ui_RegMasternodeDlg, WndUt
         self.finishing = True
         if self.wait_for_confirmation_timer_id is not None:
             self.killTimer(self.wait_for_confirmation_timer_id)
+        self.bip44_wallet.close()
         self.save_cache_settings()
 
     def restore_cache_settings(self):
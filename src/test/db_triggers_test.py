@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Checks whether the address balances, the utxo index and the transaction history maintained by the db triggers
+# match the values computed from scratch after each kind of change made by the wallet.
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from db_intf import DBCache
+
+
+def create_schema(cur):
+    # the subset of the db cache schema (see DBCache.create_structures) used by the wallet
+    cur.execute("CREATE TABLE address(id INTEGER PRIMARY KEY, xpub_hash TEXT, parent_id INTEGER, "
+                "address_index INTEGER, address TEXT, path TEXT, tree_id INTEGER, balance INTEGER DEFAULT 0 NOT NULL, "
+                "received INTEGER DEFAULT 0 NOT NULL, is_change INTEGER, "
+                "last_scan_block_height INTEGER DEFAULT 0 NOT NULL, label TEXT, status INTEGER DEFAULT 0)")
+    cur.execute("CREATE TABLE tx(id INTEGER PRIMARY KEY, tx_hash TEXT, block_height INTEGER, "
+                "block_timestamp INTEGER, coinbase INTEGER, processed INTEGER DEFAULT 0)")
+    cur.execute("CREATE TABLE tx_output(id INTEGER PRIMARY KEY, address_id INTEGER, address TEXT, "
+                "tx_id INTEGER NOT NULL, output_index INTEGER NOT NULL, satoshis INTEGER NOT NULL, "
+                "spent_tx_id INTEGER, spent_input_index INTEGER, script_type TEXT)")
+    cur.execute("CREATE TABLE tx_input(id INTEGER PRIMARY KEY, src_address TEXT, src_address_id INTEGER, "
+                "tx_id INTEGER NOT NULL, input_index INTEGER NOT NULL, satoshis INTEGER DEFAULT 0, src_tx_hash TEXT, "
+                "src_tx_id INTEGER, src_tx_output_index INTEGER, coinbase INTEGER DEFAULT 0 NOT NULL)")
+    cur.execute("CREATE TABLE utxo(id INTEGER PRIMARY KEY, account_id INTEGER, address_id INTEGER NOT NULL, "
+                "tx_id INTEGER NOT NULL, tx_hash TEXT, output_index INTEGER NOT NULL, satoshis INTEGER NOT NULL, "
+                "block_height INTEGER, block_timestamp INTEGER, coinbase INTEGER)")
+    cur.execute("CREATE TABLE tx_summary(id INTEGER PRIMARY KEY, direction INTEGER NOT NULL, "
+                "tx_id INTEGER NOT NULL, output_id INTEGER NOT NULL, input_id INTEGER, account_id INTEGER, "
+                "address_id INTEGER NOT NULL, satoshis INTEGER NOT NULL, block_height INTEGER, "
+                "block_timestamp INTEGER, coinbase INTEGER)")
+
+
+class DbTriggersTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.cur = self.conn.cursor()
+        create_schema(self.cur)
+        DBCache.create_balance_triggers(self.cur)
+        DBCache.create_utxo_triggers(self.cur)
+        DBCache.create_tx_summary_triggers(self.cur)
+
+        # two bip44 accounts, each having a receiving and a change node with leaf addresses
+        self.acc1 = self.add_address('xpub1', None, 0)
+        self.acc1_recv = self.add_address('xpub1/0', self.acc1, 0)
+        self.acc1_change = self.add_address('xpub1/1', self.acc1, 1)
+        self.addr1 = self.add_address(None, self.acc1_recv, 0, 'addr1')
+        self.addr2 = self.add_address(None, self.acc1_recv, 1, 'addr2')
+        self.addr3 = self.add_address(None, self.acc1_change, 0, 'addr3')
+
+        self.acc2 = self.add_address('xpub2', None, 1)
+        self.acc2_recv = self.add_address('xpub2/0', self.acc2, 0)
+        self.addr4 = self.add_address(None, self.acc2_recv, 0, 'addr4')
+
+    def tearDown(self):
+        self.conn.close()
+
+    def add_address(self, xpub_hash, parent_id, address_index, address=None) -> int:
+        self.cur.execute("insert into address(xpub_hash, parent_id, address_index, address, tree_id) "
+                         "values(?,?,?,?,1)", (xpub_hash, parent_id, address_index, address))
+        return self.cur.lastrowid
+
+    def add_tx(self, tx_hash, block_height, coinbase=0) -> int:
+        self.cur.execute("insert into tx(tx_hash, block_height, block_timestamp, coinbase) values(?,?,?,?)",
+                         (tx_hash, block_height, 1500000000 + block_height, coinbase))
+        return self.cur.lastrowid
+
+    def add_output(self, tx_id, output_index, address_id, satoshis, address=None) -> int:
+        self.cur.execute("insert into tx_output(address_id, address, tx_id, output_index, satoshis) "
+                         "values(?,?,?,?,?)", (address_id, address, tx_id, output_index, satoshis))
+        return self.cur.lastrowid
+
+    def spend_output(self, output_id, tx_id, input_index) -> int:
+        """ Adds the input spending an output the way Bip44Wallet does (input satoshis are negative). """
+        self.cur.execute("select address_id, satoshis, tx_id, output_index from tx_output where id=?", (output_id,))
+        address_id, satoshis, src_tx_id, src_output_index = self.cur.fetchone()
+        self.cur.execute("insert into tx_input(tx_id, input_index, src_address_id, satoshis, src_tx_id, "
+                         "src_tx_output_index) values(?,?,?,?,?,?)",
+                         (tx_id, input_index, address_id, -satoshis, src_tx_id, src_output_index))
+        input_id = self.cur.lastrowid
+        self.cur.execute("update tx_output set spent_tx_id=?, spent_input_index=? where id=?",
+                         (tx_id, input_index, output_id))
+        return input_id
+
+    def delete_tx(self, tx_id):
+        """ The same sequence as used by Bip44Wallet while purging unconfirmed transactions. """
+        self.cur.execute("update tx_output set spent_tx_id=null, spent_input_index=null where spent_tx_id=?",
+                         (tx_id,))
+        self.cur.execute("delete from tx_output where tx_id=?", (tx_id,))
+        self.cur.execute("delete from tx_input where tx_id=?", (tx_id,))
+        self.cur.execute("delete from tx where id=?", (tx_id,))
+
+    def get_balances(self, cur):
+        cur.execute("select id, balance, received from address order by id")
+        return cur.fetchall()
+
+    def get_utxos(self, cur):
+        cur.execute("select id, account_id, address_id, tx_id, tx_hash, output_index, satoshis, block_height, "
+                    "block_timestamp, coinbase from utxo order by id")
+        return cur.fetchall()
+
+    def get_tx_summary(self, cur):
+        # ids of the records differ between the incremental and the full versions
+        cur.execute("select direction, tx_id, output_id, input_id, account_id, address_id, satoshis, block_height, "
+                    "block_timestamp, coinbase from tx_summary order by tx_id, direction, output_id, input_id")
+        return cur.fetchall()
+
+    def assert_consistent(self):
+        """
+        Compares the values maintained by the triggers with the ones computed from scratch on a copy of the db.
+        """
+        ref_conn = sqlite3.connect(':memory:')
+        try:
+            self.conn.commit()  # backup waits for the pending transaction otherwise
+            self.conn.backup(ref_conn)
+            ref_cur = ref_conn.cursor()
+            ref_cur.execute("select name from sqlite_master where type='trigger'")
+            for name, in ref_cur.fetchall():
+                ref_cur.execute(f"drop trigger {name}")
+            DBCache.recalculate_address_balances(ref_cur)
+            DBCache.rebuild_utxo_index(ref_cur)
+            DBCache.rebuild_tx_summary(ref_cur)
+
+            self.assertEqual(self.get_balances(ref_cur), self.get_balances(self.cur))
+            self.assertEqual(self.get_utxos(ref_cur), self.get_utxos(self.cur))
+            self.assertEqual(self.get_tx_summary(ref_cur), self.get_tx_summary(self.cur))
+        finally:
+            ref_conn.close()
+
+    def get_balance(self, address_id):
+        self.cur.execute("select balance, received from address where id=?", (address_id,))
+        return self.cur.fetchone()
+
+    def receive_funds(self):
+        tx1 = self.add_tx('tx1', 100)
+        out1 = self.add_output(tx1, 0, self.addr1, 5000)
+        out2 = self.add_output(tx1, 1, self.addr2, 3000)
+        self.add_output(tx1, 2, None, 7000, 'foreign')
+        return tx1, out1, out2
+
+    def test_receive(self):
+        self.receive_funds()
+        self.add_output(self.add_tx('cb', 101, coinbase=1), 0, self.addr4, 1000)
+        self.assert_consistent()
+        self.assertEqual((8000, 8000), self.get_balance(self.acc1))
+        self.assertEqual((1000, 1000), self.get_balance(self.acc2))
+
+    def test_spend(self):
+        tx1, out1, out2 = self.receive_funds()
+        tx2 = self.add_tx('tx2', 0)  # unconfirmed
+        self.spend_output(out1, tx2, 0)
+        self.add_output(tx2, 0, None, 4000, 'foreign')
+        self.add_output(tx2, 1, self.addr3, 900)  # change
+        self.assert_consistent()
+        self.assertEqual((3900, 8900), self.get_balance(self.acc1))
+
+    def test_confirm(self):
+        tx1, out1, out2 = self.receive_funds()
+        tx2 = self.add_tx('tx2', 0)
+        self.spend_output(out2, tx2, 0)
+        self.add_output(tx2, 0, self.addr4, 2900)
+        self.cur.execute("update tx set block_height=?, block_timestamp=? where id=?", (105, 1500000105, tx2))
+        self.assert_consistent()
+
+    def test_purge_unconfirmed(self):
+        tx1, out1, out2 = self.receive_funds()
+        tx2 = self.add_tx('tx2', 0)
+        self.spend_output(out1, tx2, 0)
+        self.spend_output(out2, tx2, 1)
+        self.add_output(tx2, 0, self.addr3, 7900)
+        self.assert_consistent()
+        self.delete_tx(tx2)
+        self.assert_consistent()
+        self.assertEqual((8000, 8000), self.get_balance(self.acc1))
+
+    def test_assign_address_later(self):
+        # outputs/inputs saved before the address was known to the wallet are assigned to it afterwards
+        tx1 = self.add_tx('tx1', 100)
+        out = self.add_output(tx1, 0, None, 5000, 'addr1')
+        tx2 = self.add_tx('tx2', 101)
+        self.cur.execute("insert into tx_input(tx_id, input_index, src_address, satoshis, src_tx_id, "
+                         "src_tx_output_index) values(?,?,?,?,?,?)", (tx2, 0, 'addr1', -5000, tx1, 0))
+        self.cur.execute("update tx_output set spent_tx_id=?, spent_input_index=? where id=?", (tx2, 0, out))
+        self.assert_consistent()
+        self.cur.execute("update tx_input set src_address_id=? where src_address_id is null and src_address=?",
+                         (self.addr1, 'addr1'))
+        self.cur.execute("update tx_output set address_id=? where address_id is null and address=?",
+                         (self.addr1, 'addr1'))
+        self.assert_consistent()
+        self.assertEqual((0, 5000), self.get_balance(self.acc1))
+
+    def test_move_address(self):
+        self.receive_funds()
+        self.cur.execute("update address set parent_id=? where id=?", (self.acc2_recv, self.addr2))
+        self.assert_consistent()
+        self.assertEqual((5000, 5000), self.get_balance(self.acc1))
+        self.assertEqual((3000, 3000), self.get_balance(self.acc2))
+
+    def test_remove_address(self):
+        tx1, out1, out2 = self.receive_funds()
+        tx2 = self.add_tx('tx2', 101)
+        self.spend_output(out1, tx2, 0)
+        self.add_output(tx2, 0, self.addr2, 4500)
+        self.assert_consistent()
+        # the same sequence as used by Bip44Wallet.remove_address
+        self.cur.execute("delete from tx_output where address_id=?", (self.addr1,))
+        self.cur.execute("delete from tx_input where src_address_id=?", (self.addr1,))
+        self.assert_consistent()
+
+    def test_remove_account(self):
+        tx1, out1, out2 = self.receive_funds()
+        tx2 = self.add_tx('tx2', 101)
+        self.spend_output(out1, tx2, 0)
+        self.add_output(tx2, 0, self.addr4, 4500)
+        self.assert_consistent()
+        # the same sequence as used by Bip44Wallet.remove_account: unassign the outputs/inputs, delete the leaves
+        self.cur.execute("update tx_output set address_id=null where address_id in (select a.id from address a "
+                         "join address a1 on a1.id=a.parent_id join address a2 on a2.id=a1.parent_id where a2.id=?)",
+                         (self.acc1,))
+        self.cur.execute("update tx_input set src_address_id=null where src_address_id in (select a.id from "
+                         "address a join address a1 on a1.id=a.parent_id join address a2 on a2.id=a1.parent_id "
+                         "where a2.id=?)", (self.acc1,))
+        self.assert_consistent()
+        self.cur.execute("delete from address where parent_id in (select a1.id from address a1 where a1.parent_id=?)",
+                         (self.acc1,))
+        self.cur.execute("delete from address where parent_id=?", (self.acc1,))
+        self.cur.execute("delete from address where id=?", (self.acc1,))
+        self.assert_consistent()
+        self.assertEqual((4500, 4500), self.get_balance(self.acc2))
+
+    def test_delete_leaf_with_balance(self):
+        self.receive_funds()
+        self.cur.execute("delete from address where id=?", (self.addr2,))
+        self.cur.execute("select balance, received from address where id=?", (self.acc1,))
+        self.assertEqual((5000, 5000), self.cur.fetchone())
+
+
+if __name__ == '__main__':
+    unittest.main()
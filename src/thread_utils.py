@@ -4,12 +4,16 @@
 # Created on: 2017-10
 
 import logging
+import sys
 import threading
 import time
 import traceback
 from typing import Dict, Tuple, Optional, List
 
-SAVE_CALL_STACK = True
+# if True, the full call stack is saved on each lock acquisition (diagnostics only - it's expensive); otherwise
+# only the caller's file name and line number are saved and the call stack of a thread waiting for a lock is
+# extracted only when a deadlock is detected
+SAVE_CALL_STACK = False
 
 
 class LockCaller():
@@ -21,6 +25,15 @@ class LockCaller():
         self.time = time.time()
 
 
+class LockStats():
+    """ Lock contention counters. """
+    def __init__(self):
+        self.acquire_count = 0
+        self.contention_count = 0  # number of acquisitions which had to wait for another thread
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+
 def clean_call_stack(stack):
     """ Clean traceback call stack from entries related to the debugger used in the development. """
     call_stack = []
@@ -34,12 +47,17 @@ class EnhRLock():
     lock_list = []
     int_lock = threading.Lock()
 
-    def __init__(self, stackinfo_skip_lines=0):
+    def __init__(self, stackinfo_skip_lines=0, name: Optional[str] = None):
         self.__lock = threading.RLock()
         self.waiters = []
         self.blocker = None
         self.depth = 0
         self.stackinfo_skip_lines = stackinfo_skip_lines
+        if not name:
+            f = sys._getframe(1)
+            name = f'{f.f_code.co_filename}:{f.f_lineno}'
+        self.name = name
+        self.stats = LockStats()
         try:
             self.int_lock.acquire()
             self.lock_list.append(self)
@@ -59,29 +77,46 @@ class EnhRLock():
     def __exit__(self, type, value, traceback):
         self.release()
 
-    def acquire(self):
-        stack = traceback.extract_stack()
-        if len(stack) >= 2 + self.stackinfo_skip_lines:
-            calling_filename, calling_line_number, _, _ = stack[-2 - self.stackinfo_skip_lines]
+    def _get_caller(self, thread) -> LockCaller:
+        if SAVE_CALL_STACK:  # used in diagnostics
+            stack = traceback.extract_stack()
+            if len(stack) >= 3 + self.stackinfo_skip_lines:
+                calling_filename, calling_line_number, _, _ = stack[-3 - self.stackinfo_skip_lines]
+            else:
+                calling_filename, calling_line_number = '', ''
+            return LockCaller(thread, calling_filename, calling_line_number, clean_call_stack(stack))
         else:
-            calling_filename, calling_line_number = '', ''
+            try:
+                f = sys._getframe(2 + self.stackinfo_skip_lines)
+                calling_filename, calling_line_number = f.f_code.co_filename, f.f_lineno
+            except ValueError:
+                calling_filename, calling_line_number = '', ''
+            return LockCaller(thread, calling_filename, calling_line_number, [])
 
+    def acquire(self):
         thread = threading.currentThread()
-
-        if SAVE_CALL_STACK:  # used in diagnostics
-            call_stack = clean_call_stack(stack)
+        stats = self.stats
+
+        if not self.__lock.acquire(blocking=False):
+            # the lock is owned by another thread
+            waiter = self._get_caller(thread)
+            self.waiters.append(waiter)
+            t = time.time()
+            self.__lock.acquire()
+            wait_time = time.time() - t
+            self.waiters.remove(waiter)
+            stats.contention_count += 1
+            stats.total_wait_time += wait_time
+            if wait_time > stats.max_wait_time:
+                stats.max_wait_time = wait_time
         else:
-            call_stack = []
-
-        waiter = LockCaller(thread, calling_filename, calling_line_number, call_stack)
-        self.waiters.append(waiter)
-        self.__lock.acquire()
+            waiter = None
 
+        stats.acquire_count += 1
         self.depth += 1
-        self.waiters.remove(waiter)
-        del waiter
-
-        self.blocker = LockCaller(thread, calling_filename, calling_line_number, call_stack)
+        if self.depth == 1:
+            self.blocker = waiter if waiter is not None else self._get_caller(thread)
+            self.blocker.time = time.time()
 
     def release(self):
         if self.blocker is not None and self.blocker.thread != threading.currentThread():
@@ -91,6 +126,22 @@ class EnhRLock():
             self.blocker = None
         self.__lock.release()
 
+    def get_stats(self) -> LockStats:
+        return self.stats
+
+    @staticmethod
+    def get_contention_stats() -> List[Tuple[str, LockStats]]:
+        """
+        :return: list of tuples (lock name, lock stats) of all existing locks, the most contended first
+        """
+        EnhRLock.int_lock.acquire()
+        try:
+            ret = [(lock.name, lock.stats) for lock in EnhRLock.lock_list]
+        finally:
+            EnhRLock.int_lock.release()
+        ret.sort(key=lambda x: x[1].total_wait_time, reverse=True)
+        return ret
+
     def is_thread_waiting_for_me(self, checked_thread):
         my_thread = threading.currentThread()
         threading.main_thread()
@@ -107,6 +158,12 @@ class EnhRLock():
                 for waiter in lock.waiters:
                     if waiter.thread == checked_thread and \
                        lock.blocker is not None and lock.blocker.thread == threading.currentThread():
+                        if not waiter.call_stack:
+                            # the waiting thread is blocked inside acquire, so its current stack is the stack
+                            # of the lock call
+                            frame = sys._current_frames().get(checked_thread.ident)
+                            if frame is not None:
+                                waiter.call_stack = clean_call_stack(traceback.extract_stack(frame))
                         return waiter, lock.blocker
             return None
         finally:
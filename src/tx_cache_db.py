@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Created on: 2026-10
+import decimal
+import glob
+import json
+import os
+import re
+import sqlite3
+import logging
+import threading
+from typing import Optional, Any, Dict, List, Tuple
+from bitcoinrpc.authproxy import EncodeDecimal
+
+
+log = logging.getLogger('dmt.tx_cache_db')
+
+TX_CACHE_DB_FILE_NAME = 'tx_cache.db'
+
+# pattern of the cache file names used by the previous, one-file-per-rpc-call cache implementation
+JSON_CACHE_FILE_PATTERN = re.compile(r'^insight_dash_(testnet_)?(tx-(\w+)-([0-9a-fA-F]{64})|blockhash-(\d+)|'
+                                     r'blockheader-([0-9a-fA-F]{64}))\.json$')
+JSON_CACHE_IMPORT_COMMIT_EVERY = 1000
+
+
+class TxCacheDB(object):
+    """
+    Purpose: single-file store for the results of the immutable (or practically immutable) rpc calls:
+    getrawtransaction, getblockhash and getblockheader. Data is kept in the form returned by the rpc node:
+    raw transaction hex strings and block hashes are stored as is, verbose transactions and block headers as
+    compact JSON texts which are decoded only when requested.
+    """
+
+    def __init__(self):
+        self.db_file_name = ''
+        self.db_conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.RLock()
+
+    def is_active(self):
+        return self.db_conn is not None
+
+    def open(self, db_file_name: str):
+        if not db_file_name:
+            raise Exception('Invalid transaction cache file name value.')
+        with self.lock:
+            if self.db_conn is not None:
+                raise Exception('Transaction cache already active.')
+            self.db_file_name = db_file_name
+            self.db_conn = sqlite3.connect(db_file_name, check_same_thread=False)
+            try:
+                self.db_conn.execute('pragma journal_mode=WAL')
+                self.db_conn.execute('pragma synchronous=NORMAL')
+                self.create_structures()
+            except Exception:
+                self.db_conn.close()
+                self.db_conn = None
+                raise
+
+    def close(self):
+        with self.lock:
+            if self.db_conn is not None:
+                self.db_conn.close()
+                self.db_conn = None
+
+    def create_structures(self):
+        cur = self.db_conn.cursor()
+        cur.execute('CREATE TABLE IF NOT EXISTS tx(txid TEXT NOT NULL, verbose INTEGER NOT NULL, '
+                    'data TEXT NOT NULL, PRIMARY KEY(txid, verbose)) WITHOUT ROWID')
+        cur.execute('CREATE TABLE IF NOT EXISTS block_hash(height INTEGER PRIMARY KEY, hash TEXT NOT NULL)')
+        cur.execute('CREATE TABLE IF NOT EXISTS block_header(hash TEXT PRIMARY KEY, data TEXT NOT NULL) '
+                    'WITHOUT ROWID')
+        cur.execute('CREATE TABLE IF NOT EXISTS settings(name TEXT PRIMARY KEY, value TEXT)')
+        self.db_conn.commit()
+
+    @staticmethod
+    def _encode(data: Any) -> str:
+        return json.dumps(data, default=EncodeDecimal, separators=(',', ':'))
+
+    @staticmethod
+    def _decode(data: str) -> Any:
+        return json.loads(data, parse_float=decimal.Decimal)
+
+    @staticmethod
+    def _is_tx_cacheable(verbose: int, tx_data: Any) -> bool:
+        # the verbose tx data of an unconfirmed transaction will change after including it in a block
+        return not verbose or bool(isinstance(tx_data, dict) and tx_data.get('confirmations'))
+
+    def get_tx(self, txid: str, verbose) -> Optional[Any]:
+        verbose = 1 if verbose else 0
+        with self.lock:
+            if self.db_conn is None:
+                return None
+            row = self.db_conn.execute('select data from tx where txid=? and verbose=?', (txid, verbose)).fetchone()
+        if row:
+            return self._decode(row[0]) if verbose else row[0]
+        return None
+
+    def get_txs(self, txids: List[str], verbose) -> Dict[str, Any]:
+        """
+        Returns dict txid -> transaction data for these of the txids that exist in the cache.
+        """
+        verbose = 1 if verbose else 0
+        rows = []
+        with self.lock:
+            if self.db_conn is not None:
+                cur = self.db_conn.cursor()
+                for idx in range(0, len(txids), 500):
+                    chunk = txids[idx: idx + 500]
+                    cur.execute(f'select txid, data from tx where verbose=? and txid in '
+                                f'({",".join(["?"] * len(chunk))})', [verbose] + chunk)
+                    rows.extend(cur.fetchall())
+        return {txid: (self._decode(data) if verbose else data) for txid, data in rows}
+
+    def save_txs(self, txs: List[Tuple[str, Any]], verbose):
+        """
+        :param txs: list of tuples (txid, transaction data)
+        """
+        verbose = 1 if verbose else 0
+        recs = [(txid, verbose, self._encode(tx_data) if verbose else tx_data) for txid, tx_data in txs
+                if self._is_tx_cacheable(verbose, tx_data)]
+        if recs:
+            with self.lock:
+                if self.db_conn is not None:
+                    try:
+                        self.db_conn.executemany('insert or replace into tx(txid, verbose, data) values(?,?,?)', recs)
+                        self.db_conn.commit()
+                    except Exception:
+                        log.exception('Cannot save transaction data to the cache')
+
+    def save_tx(self, txid: str, verbose, tx_data: Any):
+        self.save_txs([(txid, tx_data)], verbose)
+
+    def get_block_hash(self, height: int) -> Optional[str]:
+        with self.lock:
+            if self.db_conn is None:
+                return None
+            row = self.db_conn.execute('select hash from block_hash where height=?', (height,)).fetchone()
+        return row[0] if row else None
+
+    def save_block_hashes(self, hashes: List[Tuple[int, str]]):
+        """
+        :param hashes: list of tuples (block height, block hash)
+        """
+        if hashes:
+            with self.lock:
+                if self.db_conn is not None:
+                    try:
+                        self.db_conn.executemany('insert or replace into block_hash(height, hash) values(?,?)', hashes)
+                        self.db_conn.commit()
+                    except Exception:
+                        log.exception('Cannot save block hashes to the cache')
+
+    def get_block_header(self, block_hash: str) -> Optional[Dict]:
+        with self.lock:
+            if self.db_conn is None:
+                return None
+            row = self.db_conn.execute('select data from block_header where hash=?', (block_hash,)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def save_block_headers(self, headers: List[Tuple[str, Dict]]):
+        """
+        :param headers: list of tuples (block hash, block header)
+        """
+        if headers:
+            recs = [(block_hash, self._encode(header)) for block_hash, header in headers]
+            with self.lock:
+                if self.db_conn is not None:
+                    try:
+                        self.db_conn.executemany('insert or replace into block_header(hash, data) values(?,?)', recs)
+                        self.db_conn.commit()
+                    except Exception:
+                        log.exception('Cannot save block headers to the cache')
+
+    def import_json_cache_files(self, dirs: List[str], testnet: bool):
+        """
+        One-off migration of the cache files created by the previous cache implementation (one json file per
+        rpc-call result) into the database. Successfully imported files are removed.
+        :param dirs: list of directories to be searched for the json cache files
+        :param testnet: True if importing into the testnet cache (the testnet and mainnet files differ in
+            the name prefix)
+        """
+        with self.lock:
+            if self.db_conn is None:
+                return
+            row = self.db_conn.execute("select value from settings where name='json_cache_imported'").fetchone()
+            if row and row[0] == '1':
+                return
+
+            files_imported = []
+            files_to_remove = []
+            cur = self.db_conn.cursor()
+
+            def commit():
+                self.db_conn.commit()
+                files_to_remove.extend(files_imported)
+                files_imported.clear()
+
+            for dir in dirs:
+                for file_name in glob.glob(os.path.join(dir, 'insight_dash_*.json')):
+                    match = JSON_CACHE_FILE_PATTERN.match(os.path.basename(file_name))
+                    if not match or bool(match.group(1)) != testnet:
+                        continue
+                    try:
+                        with open(file_name) as fp:
+                            data = fp.read()
+                        if match.group(4):
+                            verbose = 0 if match.group(3) in ('0', 'False') else 1
+                            if verbose:
+                                if not self._is_tx_cacheable(verbose, self._decode(data)):
+                                    files_imported.append(file_name)
+                                    continue
+                            else:
+                                data = json.loads(data)
+                            cur.execute('insert or replace into tx(txid, verbose, data) values(?,?,?)',
+                                        (match.group(4), verbose, data))
+                        elif match.group(5):
+                            cur.execute('insert or replace into block_hash(height, hash) values(?,?)',
+                                        (int(match.group(5)), json.loads(data)))
+                        else:
+                            cur.execute('insert or replace into block_header(hash, data) values(?,?)',
+                                        (match.group(6), data))
+                        files_imported.append(file_name)
+                    except Exception as e:
+                        log.warning('Cannot import the cache file %s: %s', file_name, str(e))
+
+                    if len(files_imported) >= JSON_CACHE_IMPORT_COMMIT_EVERY:
+                        commit()
+
+            cur.execute("insert or replace into settings(name, value) values('json_cache_imported', '1')")
+            commit()
+
+        if files_to_remove:
+            log.info('Imported %d json cache files into the transaction cache database', len(files_to_remove))
+        for file_name in files_to_remove:
+            try:
+                os.remove(file_name)
+            except Exception as e:
+                log.warning('Cannot remove the cache file %s: %s', file_name, str(e))
@@ -4,6 +4,7 @@
 # Created on: 2018-09
 import base64
 import bisect
+import threading
 import bitcoin
 from bip32utils import BIP32Key, Base58
 from typing import Optional, List, Callable, Tuple, Dict, ByteString, Union
@@ -400,6 +401,9 @@ class Bip44AccountType(AttrsProtected, Bip44Entry):
         self.addresses: List[Bip44AddressType] = []
         self.status: int = 0  # 0: default, 1: force show (used when received = 0), 2: force hide (used when received > 0)
         self.view_fresh_addresses_count = 1  # how many unused addresses will be shown in GUI
+        self.__address_index_by_id: Dict[int, int] = {}
+        # the receiving and change chains of an account can be scanned in parallel threads
+        self.__addresses_lock = threading.RLock()
 
         # timestamp of the last balance/received verification, based on the child addresses:
         self.last_verify_balance_ts = 0
@@ -485,31 +489,33 @@ class Bip44AccountType(AttrsProtected, Bip44Entry):
             [3]: The Bip44AddressType ref (for an existing address it's a ref to an existing object, not
                 the one passed as an argument)
         """
-        is_new = False
-        updated = False
-        address.bip44_account = self
-        if not address.bip32_path:
-            if self.bip32_path and address.address_index is not None:
-                if address.is_change:
-                    change = 1
+        with self.__addresses_lock:
+            is_new = False
+            updated = False
+            address.bip44_account = self
+            if not address.bip32_path:
+                if self.bip32_path and address.address_index is not None:
+                    if address.is_change:
+                        change = 1
+                    else:
+                        change = 0
+                    address.bip32_path = f"{self.bip32_path}/{change}/{address.address_index}"
+
+            addr_index = self.address_index_by_id(address.id)
+            if addr_index is None:
+                if not insert_index:
+                    addr_index = self.get_address_insert_index(address)
                 else:
-                    change = 0
-                address.bip32_path = f"{self.bip32_path}/{change}/{address.address_index}"
+                    addr_index = insert_index
 
-        addr_index = self.address_index_by_id(address.id)
-        if addr_index is None:
-            if not insert_index:
-                addr_index = self.get_address_insert_index(address)
+                self.addresses.insert(addr_index, address)
+                self.__reindex_addresses(addr_index)
+                addr = address
+                is_new = True
             else:
-                addr_index = insert_index
-
-            self.addresses.insert(addr_index, address)
-            addr = address
-            is_new = True
-        else:
-            addr = self.addresses[addr_index]
-            updated = addr.update_from(address)
-        return is_new, updated, addr_index, addr
+                addr = self.addresses[addr_index]
+                updated = addr.update_from(address)
+            return is_new, updated, addr_index, addr
 
     def get_address_insert_index(self, address) -> int:
         if self.addresses and address < self.addresses[-1]:
@@ -524,29 +530,34 @@ class Bip44AccountType(AttrsProtected, Bip44Entry):
         else:
             return None
 
+    def __reindex_addresses(self, start_index: int = 0):
+        for idx in range(start_index, len(self.addresses)):
+            self.__address_index_by_id[self.addresses[idx].id] = idx
+
     def address_by_id(self, id):
-        for a in self.addresses:
-            if a.id == id:
-                return a
-        return None
+        with self.__addresses_lock:
+            idx = self.__address_index_by_id.get(id)
+            if idx is not None:
+                return self.addresses[idx]
+            return None
 
     def address_index_by_id(self, id):
-        for idx, a in enumerate(self.addresses):
-            if a.id == id:
-                return idx
-        return None
+        return self.__address_index_by_id.get(id)
 
     def remove_address_by_id(self, id: int):
-        index = self.address_index_by_id(id)
-        if index is not None:
-            del self.addresses[index]
-            return True
-        return False
+        with self.__addresses_lock:
+            index = self.address_index_by_id(id)
+            if index is not None:
+                return self.remove_address_by_index(index)
+            return False
 
     def remove_address_by_index(self, index: int):
-        if 0 <= index < len(self.addresses):
-            del self.addresses[index]
-            return True
-        return False
+        with self.__addresses_lock:
+            if 0 <= index < len(self.addresses):
+                del self.__address_index_by_id[self.addresses[index].id]
+                del self.addresses[index]
+                self.__reindex_addresses(index)
+                return True
+            return False
 
 
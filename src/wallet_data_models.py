@@ -11,7 +11,7 @@ from PyQt5.QtGui import QColor, QFont, QDesktopServices
 from PyQt5.QtWidgets import QTreeView, QTableView
 from PyQt5 import QtGui
 from more_itertools import consecutive_groups
-from typing import Optional, List, Tuple, Dict
+from typing import Optional, List, Dict, Any, Iterable
 import app_utils
 import thread_utils
 import wnd_utils
@@ -30,6 +30,40 @@ FILTER_OPER_LTEQ = 2
 FILTER_OPER_EQ = 3
 
 
+def reindex_rows(items: List, row_by_id: Dict[int, int], start_row: int = 0):
+    """ Updates the id -> row index mapping of the data items, starting from the given row. """
+    for row in range(start_row, len(items)):
+        row_by_id[items[row].id] = row
+
+
+def remove_rows_by_ids(model: QAbstractItemModel, items: List, item_by_id: Dict[int, Any],
+                       row_by_id: Dict[int, int], ids: Iterable[int]):
+    """
+    Removes the data items of the given ids from the model, emitting one pair of the model signals for each range
+    of consecutive rows.
+    """
+    rows = sorted({row_by_id[id] for id in ids if id in row_by_id}, reverse=True)
+    if rows:
+        for group in consecutive_groups(rows, ordering=lambda x: -x):
+            l = list(group)
+            model.beginRemoveRows(QModelIndex(), l[-1], l[0])  # items are sorted in reversed order
+            try:
+                for item in items[l[-1]: l[0] + 1]:
+                    del item_by_id[item.id]
+                    del row_by_id[item.id]
+                del items[l[-1]: l[0] + 1]
+            finally:
+                model.endRemoveRows()
+        reindex_rows(items, row_by_id, rows[-1])
+
+
+def emit_rows_changed(model: QAbstractItemModel, rows: Iterable[int]):
+    """ Emits the dataChanged signal for each range of consecutive rows. """
+    for group in consecutive_groups(sorted(set(rows))):
+        l = list(group)
+        model.dataChanged.emit(model.index(l[0], 0), model.index(l[-1], model.columnCount() - 1))
+
+
 class MnAddressItem(object):
     def __init__(self):
         self.masternode: MasternodeConfig = None
@@ -127,6 +161,10 @@ class AccountListModel(ExtSortFilterTableModel):
             TableModelColumn('address', 'Address', True, 100)
         ], False, True)
         self.accounts: List[Bip44AccountType] = []
+        self.__account_index_by_id: Dict[int, int] = {}
+        # for each account: the numbers of unused (received == 0) addresses directly preceding the account's
+        # addresses; used to determine the window of fresh addresses shown in the view
+        self.__prev_unused_addr_counts: Dict[int, List[int]] = {}
         self.__data_modified = False
         self.show_zero_balance_addresses = False
         self.show_not_used_addresses = False
@@ -150,7 +188,7 @@ class AccountListModel(ExtSortFilterTableModel):
             if isinstance(node, Bip44AccountType):
                 return QModelIndex()
             else:
-                acc_idx = self.accounts.index(node.bip44_account)
+                acc_idx = self.account_index_by_id(node.bip44_account.id)
                 return self.createIndex(acc_idx, 0, node.bip44_account)
         except Exception as e:
             log.exception('Exception while getting parent of index')
@@ -213,7 +251,11 @@ class AccountListModel(ExtSortFilterTableModel):
             if row >=0 and row < len(self.accounts):
                 self.beginRemoveRows(parent, row, row + count)
                 for row_offs in range(count):
+                    acc = self.accounts[row - row_offs]
+                    self.__account_index_by_id.pop(acc.id, None)
+                    self.__prev_unused_addr_counts.pop(acc.id, None)
                     del self.accounts[row - row_offs]
+                self.__reindex_accounts(row - count + 1)
                 self.endRemoveRows()
             return True
         else:
@@ -223,22 +265,46 @@ class AccountListModel(ExtSortFilterTableModel):
                 self.beginRemoveRows(parent, row, row + count)
                 for row_offs in range(count):
                     removed = max(removed, acc.remove_address_by_index(row - row_offs))
+                self.__prev_unused_addr_counts.pop(acc.id, None)
                 self.endRemoveRows()
             return removed
 
-    def filterAcceptsRow(self, source_row, source_parent):
-        def count_prev_zero_received(acc: Bip44AccountType, start_index: int):
+    def __reindex_accounts(self, start_index: int = 0):
+        for idx in range(max(start_index, 0), len(self.accounts)):
+            self.__account_index_by_id[self.accounts[idx].id] = idx
+
+    def get_prev_unused_addr_count(self, acc: Bip44AccountType, addr_index: int) -> int:
+        """
+        Returns the number of unused (received == 0) addresses directly preceding the address at the given index.
+        """
+        counts = self.__prev_unused_addr_counts.get(acc.id)
+        if counts is None or len(counts) != len(acc.addresses):
+            counts = []
             cnt = 0
-            index = start_index
-            while index >= 0:
-                a = acc.address_by_index(index)
-                if not a.received:
-                    cnt += 1
-                else:
-                    break
-                index -= 1
-            return cnt
+            for a in acc.addresses:
+                counts.append(cnt)
+                cnt = cnt + 1 if not a.received else 0
+            self.__prev_unused_addr_counts[acc.id] = counts
+        return counts[addr_index]
+
+    def update_prev_unused_addr_counts(self, acc: Bip44AccountType, addr_index: int):
+        """
+        Updates the numbers of preceding unused addresses after the 'received' value of the address at the given
+        index has changed. Only the entries affected by the change are recalculated.
+        """
+        counts = self.__prev_unused_addr_counts.get(acc.id)
+        if counts is not None:
+            if len(counts) != len(acc.addresses):
+                del self.__prev_unused_addr_counts[acc.id]
+            else:
+                for idx in range(addr_index + 1, len(counts)):
+                    prev_addr = acc.addresses[idx - 1]
+                    cnt = counts[idx - 1] + 1 if not prev_addr.received else 0
+                    if cnt == counts[idx]:
+                        break
+                    counts[idx] = cnt
 
+    def filterAcceptsRow(self, source_row, source_parent):
         try:
             will_show = True
             if source_parent.isValid():
@@ -252,7 +318,7 @@ class AccountListModel(ExtSortFilterTableModel):
                                 will_show = True
                             else:
                                 if not addr.is_change:
-                                    prev_cnt = count_prev_zero_received(acc, source_row - 1)
+                                    prev_cnt = self.get_prev_unused_addr_count(acc, source_row)
                                     if prev_cnt < acc.view_fresh_addresses_count:
                                         will_show = True
                         elif addr.balance == 0:
@@ -283,16 +349,13 @@ class AccountListModel(ExtSortFilterTableModel):
         self.invalidateFilter()
 
     def account_by_id(self, id: int) -> Optional[Bip44AccountType]:
-        for a in self.accounts:
-            if a.id == id:
-                return a
+        idx = self.__account_index_by_id.get(id)
+        if idx is not None:
+            return self.accounts[idx]
         return None
 
     def account_index_by_id(self, id: int) -> Optional[int]:
-        for idx, a in enumerate(self.accounts):
-            if a.id == id:
-                return idx
-        return None
+        return self.__account_index_by_id.get(id)
 
     def account_by_bip44_index(self, bip44_index: int) -> Optional[Bip44AccountType]:
         for a in self.accounts:
@@ -311,9 +374,11 @@ class AccountListModel(ExtSortFilterTableModel):
             insert_idx = bisect.bisect_right(idxs, account.address_index)
             self.beginInsertRows(QModelIndex(), insert_idx, insert_idx)
             self.accounts.insert(insert_idx, account_loc)
+            self.__reindex_accounts(insert_idx)
             self.endInsertRows()
         else:
             existing_account.copy_from(account)
+            self.__prev_unused_addr_counts.pop(existing_account.id, None)
 
     def add_account_address(self, account: Bip44AccountType, address: Bip44AddressType):
         account_idx = self.account_index_by_id(account.id)
@@ -328,6 +393,13 @@ class AccountListModel(ExtSortFilterTableModel):
                 addr_idx = account_loc.get_address_insert_index(addr_loc)
                 self.beginInsertRows(acc_index, addr_idx, addr_idx)
                 account_loc.add_address(addr_loc, addr_idx)
+                counts = self.__prev_unused_addr_counts.get(account_loc.id)
+                if counts is not None:
+                    if addr_idx == len(counts):
+                        # the most common case: appending a new address to the end of the list
+                        counts.append(counts[-1] + 1 if counts and not account_loc.addresses[-2].received else 0)
+                    else:
+                        del self.__prev_unused_addr_counts[account_loc.id]
                 self.endInsertRows()
 
     def account_data_changed(self, account: Bip44AccountType):
@@ -349,7 +421,13 @@ class AccountListModel(ExtSortFilterTableModel):
             if addr_idx is not None:
                 addr_loc = account.address_by_index(addr_idx)
                 if addr_loc != address:
+                    received = addr_loc.received
                     addr_loc.update_from(address)
+                    if received != addr_loc.received:
+                        self.update_prev_unused_addr_counts(account, addr_idx)
+                else:
+                    # the object has been modified in place, so the previous value of 'received' is unknown
+                    self.__prev_unused_addr_counts.pop(account.id, None)
                 addr_index = self.index(addr_idx, 0, parent=acc_index)
                 self.__data_modified = True
                 self.dataChanged.emit(addr_index, addr_index)
@@ -358,13 +436,19 @@ class AccountListModel(ExtSortFilterTableModel):
         if 0 <= index < len(self.accounts):
             self.__data_modified = True
             self.beginRemoveRows(QModelIndex(), index, index)
+            acc = self.accounts[index]
+            del self.__account_index_by_id[acc.id]
+            self.__prev_unused_addr_counts.pop(acc.id, None)
             del self.accounts[index]
+            self.__reindex_accounts(index)
             self.endRemoveRows()
 
     def clear_accounts(self):
         log.debug('Clearing accounts')
         self.__data_modified = True
         self.accounts.clear()
+        self.__account_index_by_id.clear()
+        self.__prev_unused_addr_counts.clear()
 
     def get_first_unused_bip44_account_index(self):
         """ Get first unused not yet visible account index. """
@@ -395,7 +479,9 @@ class UtxoTableModel(ExtSortFilterTableModel):
         self.hide_collateral_utxos = True
         self.utxos: List[UtxoType] = []
         self.utxo_by_id: Dict[int, UtxoType] = {}
+        self.row_by_utxo_id: Dict[int, int] = {}
         self.block_height = None
+        self.fetch_sorting = ('confirmations', Qt.AscendingOrder)
 
         self.mn_by_collateral_tx: Dict[str, MasternodeConfig] = {}
         self.mn_by_collateral_address: Dict[str, MasternodeConfig] = {}
@@ -477,11 +563,13 @@ class UtxoTableModel(ExtSortFilterTableModel):
 
     def add_utxo(self, utxo: UtxoType, insert_pos = None):
         if not utxo.id in self.utxo_by_id:
+            self.utxo_by_id[utxo.id] = utxo
             if insert_pos is None:
                 self.utxos.append(utxo)
+                self.row_by_utxo_id[utxo.id] = len(self.utxos) - 1
             else:
                 self.utxos.insert(insert_pos, utxo)
-            self.utxo_by_id[utxo.id] = utxo
+                reindex_rows(self.utxos, self.row_by_utxo_id, insert_pos)
             ident = utxo.txid + '-' + str(utxo.output_index)
             if ident in self.mn_by_collateral_tx:
                 utxo.is_collateral = True
@@ -492,53 +580,46 @@ class UtxoTableModel(ExtSortFilterTableModel):
     def clear_utxos(self):
         self.utxos.clear()
         self.utxo_by_id.clear()
+        self.row_by_utxo_id.clear()
+
+    def is_data_item_loaded(self, item: UtxoType) -> bool:
+        return item.id in self.utxo_by_id
+
+    def append_data_items(self, items: List[UtxoType]):
+        for utxo in items:
+            self.add_utxo(utxo)
 
-    def update_utxos(self, utxos_to_add: List[UtxoType], utxos_to_update: List[UtxoType], utxos_to_delete: List[Tuple[int, int]]):
+    def update_utxos(self, utxos_to_add: List[UtxoType], utxos_to_update: List[UtxoType], utxos_to_delete: List[int]):
         if utxos_to_delete:
-            row_indexes_to_remove = []
-            for utxo_id in utxos_to_delete:
-                utxo = self.utxo_by_id.get(utxo_id)
-                if utxo:
-                    utxo_index = self.utxos.index(utxo)
-                    if utxo_index not in row_indexes_to_remove:
-                        row_indexes_to_remove.append(utxo_index)
-                    del self.utxo_by_id[utxo_id]
-            row_indexes_to_remove.sort(reverse=True)
-
-            for group in consecutive_groups(row_indexes_to_remove, ordering=lambda x: -x):
-                l = list(group)
-                self.beginRemoveRows(QModelIndex(), l[-1], l[0]) # items are sorted in reversed order
-                del self.utxos[l[-1]: l[0]+1]
-                self.endRemoveRows()
+            remove_rows_by_ids(self, self.utxos, self.utxo_by_id, self.row_by_utxo_id, utxos_to_delete)
 
         if utxos_to_add:
-            # in the model, the rows are sorted by the number of confirmations in the descending order, so put
-            # the new ones in the right place
+            # the view is sorted by the proxy model (by the number of confirmations by default), so the new utxos
+            # are appended to the end of the list
 
             # filter out the already existing utxos
-            utxos_to_add_verified = []
+            utxos_to_add_verified = {}
             for utxo in utxos_to_add:
                 if utxo.id not in self.utxo_by_id:
-                    utxos_to_add_verified.append(utxo)
+                    utxos_to_add_verified[utxo.id] = utxo
 
-            utxos_to_add_verified.sort(key=lambda x: x.block_height, reverse=True)
-            row_idx = 0
-            self.beginInsertRows(QModelIndex(), row_idx, row_idx + len(utxos_to_add_verified) - 1)
-            try:
-                for index, utxo in enumerate(utxos_to_add_verified):
-                    if utxo.id not in self.utxo_by_id:
-                        self.add_utxo(utxo, index)
-            finally:
-                self.endInsertRows()
+            if utxos_to_add_verified:
+                row_idx = len(self.utxos)
+                self.beginInsertRows(QModelIndex(), row_idx, row_idx + len(utxos_to_add_verified) - 1)
+                try:
+                    for utxo in utxos_to_add_verified.values():
+                        self.add_utxo(utxo)
+                finally:
+                    self.endInsertRows()
 
         if utxos_to_update:
+            rows = []
             for utxo_new in utxos_to_update:
                 utxo = self.utxo_by_id.get(utxo_new.id)
                 if utxo:
                     utxo.block_height = utxo_new.block_height  # block_height is the only field that can be updated
-                    utxo_index = self.utxos.index(utxo)
-                    ui_index = self.index(utxo_index, 0)
-                    self.dataChanged.emit(ui_index, ui_index)
+                    rows.append(self.row_by_utxo_id[utxo.id])
+            emit_rows_changed(self, rows)
 
     def lessThan(self, col_index, left_row_index, right_row_index):
         col = self.col_by_index(col_index)
@@ -611,6 +692,7 @@ class TransactionTableModel(ExtSortFilterTableModel):
         self.txes: List[TxType] = []
         self.txes_by_id: Dict[int, TxType] = {}
         self.tx_explorer_url = tx_explorer_url
+        self.fetch_sorting = ('confirmations', Qt.AscendingOrder)
         self.__current_block_height = None
         self.__data_modified = False
 
@@ -748,6 +830,13 @@ class TransactionTableModel(ExtSortFilterTableModel):
         self.txes_by_id.clear()
         self.txes.clear()
 
+    def is_data_item_loaded(self, item: TxType) -> bool:
+        return item.id in self.txes_by_id
+
+    def append_data_items(self, items: List[TxType]):
+        for tx in items:
+            self.add_tx(tx)
+
     def lessThan(self, col_index, left_row_index, right_row_index):
         col = self.col_by_index(col_index)
         if col:
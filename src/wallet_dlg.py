@@ -328,6 +328,7 @@ class WalletDlg(QDialog, ui_wallet_dlg.Ui_WalletDlg, WndUtils):
         self.allow_fetch_transactions = False
         self.enable_synch_with_main_thread = False
         self.stop_threads()
+        self.bip44_wallet.close()
         self.save_cache_settings()
 
     def restore_cache_settings(self):
@@ -531,6 +532,7 @@ class WalletDlg(QDialog, ui_wallet_dlg.Ui_WalletDlg, WndUtils):
         sel = self.utxoTableView.selectionModel()
         sel_modified = False
         s = QItemSelection()
+        self.utxo_table_model.fetch_all()
         with self.utxo_table_model:
             for row_idx, utxo in enumerate(self.utxo_table_model.utxos):
                 index = self.utxo_table_model.index(row_idx, 0)
@@ -567,7 +569,6 @@ class WalletDlg(QDialog, ui_wallet_dlg.Ui_WalletDlg, WndUtils):
                 except CancelException:
                     return
 
-                bip32_to_address = {}  # for saving addresses read from HW by BIP32 path
                 total_satoshis_inputs = 0
                 coinbase_locked_exist = False
 
@@ -588,16 +589,18 @@ class WalletDlg(QDialog, ui_wallet_dlg.Ui_WalletDlg, WndUtils):
                     if utxo.coinbase_locked:
                         coinbase_locked_exist = True
 
-                    bip32_path = utxo.bip32_path
-                    if not bip32_path:
+                    if not utxo.bip32_path:
                         self.errorMsg(f'No BIP32 path for UTXO: {utxo.txid}. Cannot continue.')
                         return
 
-                    addr_hw = bip32_to_address.get(bip32_path, None)
-                    if not addr_hw:
-                        addr_hw = self.hw_call_wrapper(hw_intf.get_address)(self.main_ui.hw_session, bip32_path)
-                        bip32_to_address[bip32_path] = addr_hw
+                # addresses are derived in bulk from the account xpubs read from the hw
+                bip32_to_address = self.bip44_wallet.get_addresses_for_bip32_paths(
+                    [utxo.bip32_path for utxo in tx_inputs],
+                    partial(self.hw_call_wrapper(hw_intf.get_address), self.main_ui.hw_session))
 
+                for utxo_idx, utxo in enumerate(tx_inputs):
+                    bip32_path = utxo.bip32_path
+                    addr_hw = bip32_to_address.get(bip32_path)
                     if addr_hw != utxo.address:
                         self.errorMsg("<html style=\"font-weight:normal\">Dash address inconsistency between UTXO "
                                       f"({utxo_idx+1}) and HW path: {bip32_path}.<br><br>"
@@ -1175,25 +1178,54 @@ class WalletDlg(QDialog, ui_wallet_dlg.Ui_WalletDlg, WndUtils):
             raise Exception('Invalid utxo_src_mode')
         return list_utxos
 
-    def get_txs_list_generator(self, only_new) -> Generator[TxType, None, None]:
-        list_txs = None
+    def get_list_src_scope(self) -> Optional[Tuple[Optional[int], Optional[List[int]]]]:
+        """
+        Returns the scope of the utxo/transaction lists for the current selection: tuple (account id, address ids)
+        or None if there is nothing to be listed.
+        """
         if self.utxo_src_mode == MAIN_VIEW_BIP44_ACCOUNTS:
             if self.hw_selected_account_id is not None and self.cur_hd_tree_id:
                 if self.hw_selected_address_id is None:
-                    # list utxos of the whole bip44 account
-                    list_txs = self.bip44_wallet.list_txs(self.hw_selected_account_id, None, only_new)
+                    return self.hw_selected_account_id, None
                 else:
-                    # list utxos of the specific address
-                    list_txs = self.bip44_wallet.list_txs(None, [self.hw_selected_address_id], only_new)
+                    return None, [self.hw_selected_address_id]
         elif self.utxo_src_mode == MAIN_VIEW_MASTERNODE_LIST:
             address_ids = []
             for mni in self.selected_mns:
                 if mni.address and not mni.address.id in address_ids:
                     address_ids.append(mni.address.id)
-            list_txs = self.bip44_wallet.list_txs(None, address_ids, only_new)
+            return None, address_ids
         else:
             raise Exception('Invalid utxo_src_mode')
-        return list_txs
+        return None
+
+    def get_utxo_list_source(self) -> Optional[Callable[[Optional[UtxoType], int], List[UtxoType]]]:
+        """
+        Returns a function reading the consecutive pages of utxos of the current selection; used as the data
+        source of the utxo table model.
+        """
+        scope = self.get_list_src_scope()
+        if scope:
+            account_id, address_ids = scope
+            if account_id is not None:
+                return lambda start_after, max_count: list(self.bip44_wallet.list_utxos_for_account(
+                    account_id, start_after=start_after, max_count=max_count))
+            else:
+                return lambda start_after, max_count: list(self.bip44_wallet.list_utxos_for_addresses(
+                    address_ids, start_after=start_after, max_count=max_count))
+        return None
+
+    def get_txs_list_source(self) -> Optional[Callable[[Optional[TxType], int], List[TxType]]]:
+        """
+        Returns a function reading the consecutive pages of transactions of the current selection; used as
+        the data source of the transaction table model.
+        """
+        scope = self.get_list_src_scope()
+        if scope:
+            account_id, address_ids = scope
+            return lambda start_after, max_count: list(self.bip44_wallet.list_txs(
+                account_id, address_ids, start_after=start_after, max_count=max_count))
+        return None
 
     def display_thread(self, ctrl: CtrlObject):
         self.dt_last_hd_tree_id = None
@@ -1252,36 +1284,28 @@ class WalletDlg(QDialog, ui_wallet_dlg.Ui_WalletDlg, WndUtils):
                             self.dt_last_addr_selection_hash_for_utxo = self.cur_utxo_src_hash
                             subscribe_for_tx_activity_notificatoins()
 
-                            list_utxos_generator = self.get_utxo_list_generator(False)
+                            list_utxos_source = self.get_utxo_list_source()
 
-                            # pause the fetch process to avoid waiting for the data do be displayed
-                            self.allow_fetch_transactions = False
-                            try:
-                                with self.utxo_table_model:
-                                    self.utxo_table_model.beginResetModel()
-                                    self.utxo_table_model.clear_utxos()
-                                    self.utxo_table_model.endResetModel()
-                            finally:
-                                self.allow_fetch_transactions = True
+                            with self.utxo_table_model:
+                                self.utxo_table_model.beginResetModel()
+                                self.utxo_table_model.set_fetch_source(None)
+                                self.utxo_table_model.clear_utxos()
+                                self.utxo_table_model.endResetModel()
 
-                            if list_utxos_generator:
+                            if list_utxos_source:
                                 log.debug('Reading utxos from database')
                                 self.utxo_table_model.set_block_height(self.bip44_wallet.get_block_height())
 
                                 t = time.time()
                                 self.utxo_table_model.beginResetModel()
 
-                                # pause the fetch process to avoid waiting for the data do be displayed
-                                self.allow_fetch_transactions = False
+                                # utxos are read from a db snapshot, so there is no need to pause the fetch process;
+                                # only the first page is read here, the next ones are read on demand of the view
                                 try:
                                     with self.utxo_table_model:
-                                        for utxo in list_utxos_generator:
-                                            if self.finishing:
-                                                break
-                                            self.utxo_table_model.add_utxo(utxo)
+                                        self.utxo_table_model.set_fetch_source(list_utxos_source)
                                 finally:
                                     self.utxo_table_model.endResetModel()
-                                    self.allow_fetch_transactions = True
 
                                 log.debug('Reading of utxos finished, time: %s', time.time() - t)
 
@@ -1290,34 +1314,26 @@ class WalletDlg(QDialog, ui_wallet_dlg.Ui_WalletDlg, WndUtils):
 
                         if self.dt_last_addr_selection_hash_for_txes != self.cur_utxo_src_hash:
 
-                            list_txs_generator = self.get_txs_list_generator(False)
-                            if list_txs_generator:
+                            list_txs_source = self.get_txs_list_source()
+                            if list_txs_source:
                                 subscribe_for_tx_activity_notificatoins()
                                 log.debug('Reading transactions from database')
 
                                 self.dt_last_addr_selection_hash_for_txes = self.cur_utxo_src_hash
 
-                                self.allow_fetch_transactions = False
-                                try:
-                                    with self.tx_table_model:
-                                        self.tx_table_model.beginResetModel()
-                                        self.tx_table_model.clear_txes()
-                                        self.tx_table_model.endResetModel()
-                                finally:
-                                    self.allow_fetch_transactions = True
+                                with self.tx_table_model:
+                                    self.tx_table_model.beginResetModel()
+                                    self.tx_table_model.set_fetch_source(None)
+                                    self.tx_table_model.clear_txes()
+                                    self.tx_table_model.endResetModel()
 
                                 t = time.time()
                                 self.tx_table_model.beginResetModel()
-                                self.allow_fetch_transactions = False
                                 try:
                                     with self.tx_table_model:
-                                        for utxo in list_txs_generator:
-                                            if self.finishing:
-                                                break
-                                            self.tx_table_model.add_tx(utxo)
+                                        self.tx_table_model.set_fetch_source(list_txs_source)
                                 finally:
                                     self.tx_table_model.endResetModel()
-                                    self.allow_fetch_transactions = True
 
                                 log.debug('Reading of transactions finished, time: %s', time.time() - t)
                             else:
@@ -1435,9 +1451,13 @@ class WalletDlg(QDialog, ui_wallet_dlg.Ui_WalletDlg, WndUtils):
                             (self.enable_synch_with_main_thread or
                              threading.current_thread() == threading.main_thread()):
 
-                        with self.utxo_table_model:
-                            WndUtils.call_in_main_thread(self.utxo_table_model.update_utxos, added_utxos,
-                                                         modified_utxos, removed_utxos)
+                        def update_utxos():
+                            # the model lock is acquired in the main thread, since the view can acquire it there
+                            # as well when loading the next page of data (fetchMore)
+                            with self.utxo_table_model:
+                                self.utxo_table_model.update_utxos(added_utxos, modified_utxos, removed_utxos)
+
+                        WndUtils.call_in_main_thread(update_utxos)
 
         except BreakFetchTransactionsException:
             raise